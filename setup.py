@@ -107,15 +107,21 @@ def setup_cython_extension():
         return []
     # see tenpy/tools/optimization.py for details on "TENPY_OPTIMIZE"
     TENPY_OPTIMIZE = int(os.getenv('TENPY_OPTIMIZE', 1))
+    # set TENPY_OPENMP=1 to distribute charge blocks in tensordot on OpenMP threads,
+    # see tenpy/tools/process.py for details
+    TENPY_OPENMP = int(os.getenv('TENPY_OPENMP', 0))
     include_dirs = [numpy.get_include()]
     libs = []
     lib_dirs = []
+    extra_args = ['-fopenmp'] if TENPY_OPENMP else []
 
     extensions = [
         Extension("*", ["tenpy/linalg/*.pyx"],
                   include_dirs=include_dirs,
                   libraries=libs,
                   library_dirs=lib_dirs,
+                  extra_compile_args=extra_args,
+                  extra_link_args=extra_args,
                   language='c++')
     ]
 
@@ -23,6 +23,9 @@ occasionally displayed some convergence issues..
 Which one is preffered in the end is not obvious a priori and might depend on the used model.
 Just try both of them.
 
+For long finite chains, :class:`ParallelTwoSiteDMRGEngine` optimizes segments of the chain in
+parallel, following the real-space parallel DMRG of [Stoudenmire2013]_.
+
 A :class:`Mixer` should be used initially to avoid that the algorithm gets stuck in local energy
 minima, and then slowly turned off in the end. For :class:`SingleSiteDMRGEngine`, using a mixer is
 crucial, as the one-site algorithm cannot increase the MPS bond dimension by itself.
@@ -33,22 +36,28 @@ crucial, as the one-site algorithm cannot increase the MPS bond dimension by its
 # Copyright 2018 TeNPy Developers
 
 import numpy as np
+import copy
+import os
 import time
 import warnings
 
 from ..linalg import np_conserved as npc
 from ..networks.mps import MPSEnvironment
 from ..networks.mpo import MPOEnvironment
-from ..linalg.lanczos import lanczos
+from ..linalg.lanczos import lanczos, davidson
 from ..linalg.sparse import NpcLinearOperator
-from .truncation import truncate, svd_theta
+from .truncation import truncate, svd_theta, random_sketch
 from ..tools.params import get_parameter, unused_parameters
-from ..tools.process import memory_usage
+from ..tools.cache import OutOfCoreList
+from ..tools import io
+from ..tools.process import memory_usage, parallel_map_blocks, get_block_nthreads
 from .mps_sweeps import Sweep, OneSiteH, TwoSiteH
 
 __all__ = [
-    'run', 'DMRGEngine', 'SingleSiteDMRGEngine', 'TwoSiteDMRGEngine', 'Engine', 'EngineCombine',
-    'EngineFracture', 'Mixer', 'SingleSiteMixer', 'TwoSiteMixer', 'DensityMatrixMixer', 'chi_list'
+    'run', 'DMRGEngine', 'SingleSiteDMRGEngine', 'TwoSiteDMRGEngine',
+    'ParallelTwoSiteDMRGEngine', 'Engine', 'EngineCombine', 'EngineFracture', 'Mixer',
+    'SingleSiteMixer', 'ControlledExpansionMixer', 'TwoSiteMixer',
+    'DensityMatrixMixer', 'chi_list'
 ]
 
 
@@ -98,12 +107,14 @@ def run(psi, model, DMRG_params, n=2):
                                  which yields the first excited state (in the same symmetry
                                  sector), and so on.
         -------------- --------- ---------------------------------------------------------------
-        combine        bool      Whether to combine legs into pipes. This combines the virtual and
-                                 physical leg for the left site (when moving right) or right side
+        combine        bool |    Whether to combine legs into pipes. This combines the virtual and
+                       str       physical leg for the left site (when moving right) or right side
                                  (when moving left) into pipes. This reduces the overhead of
                                  calculating charge combinations in the contractions, but one
                                  :meth:`matvec` is formally more expensive,
                                  :math:`O(2 d^3 \chi^3 D)`.
+                                 For ``'auto'``, decide for each update with the cost model of
+                                 :meth:`~tenpy.algorithms.mps_sweeps.Sweep.choose_combine`.
         -------------- --------- ---------------------------------------------------------------
         trunc_params   dict      Truncation parameters as described in
                                  :func:`~tenpy.algorithms.truncation.truncate`
@@ -116,7 +127,17 @@ def run(psi, model, DMRG_params, n=2):
                                  By default (``None``) this feature is disabled.
         -------------- --------- ---------------------------------------------------------------
         lanczos_params dict      Lanczos parameters as described in
-                                 :func:`~tenpy.linalg.lanczos.lanczos`
+                                 :func:`~tenpy.linalg.lanczos.lanczos`.
+                                 The key ``'method'`` selects the eigensolver used in
+                                 :meth:`diag`: ``'lanczos'`` (default) for
+                                 :class:`~tenpy.linalg.lanczos.LanczosGroundState` or
+                                 ``'davidson'`` for :class:`~tenpy.linalg.lanczos.Davidson`.
+        -------------- --------- ---------------------------------------------------------------
+        env_storage    dict |    If not ``None``, keep only the recently used environment
+                       None      tensors in RAM and spill the others to disk, see the parameters
+                                 of :class:`~tenpy.tools.cache.OutOfCoreList`.
+                                 The environment for the next step is prefetched in the
+                                 background during the sweep.
         -------------- --------- ---------------------------------------------------------------
         N_sweeps_check int       Number of sweeps to perform between checking convergence
                                  criteria and giving a status update.
@@ -156,6 +177,18 @@ def run(psi, model, DMRG_params, n=2):
                                  'shelve' the simulation, i.e. stop and return with the flag
                                  ``shelve=True``.
         -------------- --------- ---------------------------------------------------------------
+        checkpoint_    str |     If not ``None``, regularly save the full state of the engine
+        file           None      to this file with :meth:`DMRGEngine.save_checkpoint`,
+                                 from which the run can be resumed with
+                                 :meth:`DMRGEngine.from_checkpoint`.
+                                 A checkpoint is also saved when the simulation is shelved.
+        -------------- --------- ---------------------------------------------------------------
+        checkpoint_    int       Save a checkpoint if at least that many sweeps were performed
+        sweeps                   since the last one. Defaults to `N_sweeps_check`.
+        -------------- --------- ---------------------------------------------------------------
+        checkpoint_    float     Save a checkpoint if at least that many seconds elapsed
+        seconds                  since the last one. Defaults to ``np.inf``.
+        -------------- --------- ---------------------------------------------------------------
         P_tol_to_trunc float     It's reasonable to choose the Lanczos convergence criteria
         P_tol_max                ``'P_tol'`` not many magnitudes lower than the current
         P_tol_min                truncation error. Therefore, if `P_tol_to_trunc` is not
@@ -179,6 +212,10 @@ def run(psi, model, DMRG_params, n=2):
         active_sites   int       The number of active sites to be used by DMRG. If set to 1,
                                  :class:`SingleSiteDMRGEngine` is used. If set to 2, DMRG is handled
                                  by :class:`TwoSiteDMRGEngine`.
+        -------------- --------- ---------------------------------------------------------------
+        n_segments     int |     If not ``None`` (and ``active_sites=2``), use the real-space
+                       None      parallel :class:`ParallelTwoSiteDMRGEngine` with that many
+                                 segments. Only for finite MPS.
         ============== ========= ===============================================================
 
     Returns
@@ -196,7 +233,10 @@ def run(psi, model, DMRG_params, n=2):
     if active_sites == 1:
         engine = SingleSiteDMRGEngine(psi, model, DMRG_params)
     elif active_sites == 2:
-        engine = TwoSiteDMRGEngine(psi, model, DMRG_params)
+        if DMRG_params.get('n_segments', None) is not None:
+            engine = ParallelTwoSiteDMRGEngine(psi, model, DMRG_params)
+        else:
+            engine = TwoSiteDMRGEngine(psi, model, DMRG_params)
     else:
         raise ValueError("For DMRG, can only use 1 or 2 active sites, not {}".format(active_sites))
     E, _ = engine.run()
@@ -289,10 +329,23 @@ class DMRGEngine(Sweep):
         if not self.finite:
             update_env = get_parameter(DMRG_params, 'update_env', N_sweeps_check // 2, 'DMRG')
             norm_tol_iter = get_parameter(DMRG_params, 'norm_tol_iter', 5, 'DMRG')
-        E_old, S_old = np.nan, np.nan  # initial dummy values
-        E, Delta_E, Delta_S = 1., 1., 1.
-
-        self.mixer_activate()
+        checkpoint_file = get_parameter(DMRG_params, 'checkpoint_file', None, 'DMRG')
+        if checkpoint_file is not None:
+            checkpoint_sweeps = get_parameter(DMRG_params, 'checkpoint_sweeps', N_sweeps_check,
+                                              'DMRG')
+            checkpoint_seconds = get_parameter(DMRG_params, 'checkpoint_seconds', np.inf, 'DMRG')
+        run_state = getattr(self, '_run_state', None)  # set by :meth:`from_checkpoint`
+        if run_state is None:
+            E_old, S_old = np.nan, np.nan  # initial dummy values
+            E, Delta_E, Delta_S = 1., 1., 1.
+            self.mixer_activate()
+        else:  # resume: the mixer was restored from the checkpoint
+            E_old, S_old, E, Delta_E, Delta_S, norm_err = [
+                run_state[k] for k in ['E_old', 'S_old', 'E', 'Delta_E', 'Delta_S', 'norm_err']
+            ]
+            start_time = time.time()  # `max_hours` refers to this run
+            self._run_state = None
+        last_checkpoint = (self.sweeps, time.time())
         # loop over sweeps
         while True:
             # check convergence criteria
@@ -310,6 +363,8 @@ class DMRGEngine(Sweep):
             if time.time() - start_time > max_seconds:
                 self.shelve = True
                 warnings.warn("DMRG: maximum time limit reached. Shelve simulation.")
+                if checkpoint_file is not None and last_checkpoint[0] < self.sweeps:
+                    self.save_checkpoint(checkpoint_file, run_state)
                 break
             # --------- the main work --------------
             for i in range(N_sweeps_check - 1):
@@ -381,6 +436,20 @@ class DMRGEngine(Sweep):
                                Eerr=max_E_trunc,
                                norm_err=norm_err))
 
+            run_state = {
+                'E_old': E_old,
+                'S_old': S_old,
+                'E': E,
+                'Delta_E': Delta_E,
+                'Delta_S': Delta_S,
+                'norm_err': norm_err
+            }
+            if checkpoint_file is not None and \
+                    (self.sweeps - last_checkpoint[0] >= checkpoint_sweeps or
+                     time.time() - last_checkpoint[1] >= checkpoint_seconds):
+                self.save_checkpoint(checkpoint_file, run_state)
+                last_checkpoint = (self.sweeps, time.time())
+
         # clean up from mixer
         self.mixer_cleanup()
         # update environment until norm_tol is reached
@@ -416,6 +485,73 @@ class DMRGEngine(Sweep):
             print("=" * 80)
         return E, self.psi
 
+    def save_checkpoint(self, filename, run_state=None):
+        """Save the full state of the engine to `filename` to resume it later.
+
+        The state includes `psi`, the environments (such that they don't need to be recomputed),
+        the mixer, the statistics and the (adapted) parameters.
+        The file is written with :func:`tenpy.tools.io.save`; we first write to a temporary
+        file and then replace `filename`, such that an existing checkpoint is not corrupted if
+        the job gets killed while writing.
+
+        Parameters
+        ----------
+        filename : str
+            The file to write.
+        run_state : dict | None
+            Values of the convergence checks in :meth:`run` needed to resume it.
+        """
+        state = self.__dict__.copy()
+        state.pop('eff_H', None)  # recalculated in :meth:`prepare_update`
+        if run_state is not None:
+            run_state = dict(run_state, time_elapsed=time.time() - self.time0)
+        state['_run_state'] = run_state
+        tmp_filename = filename + '.tmp'
+        io.save({'class': type(self), 'state': state}, tmp_filename)
+        os.replace(tmp_filename, filename)
+
+    @classmethod
+    def from_checkpoint(cls, filename, mmap_threshold=None):
+        """Create an engine from a checkpoint written by :meth:`save_checkpoint`.
+
+        Calling :meth:`run` on the returned engine continues the interrupted run
+        without recomputing the environments. You can adjust the `engine_params`
+        (e.g. `max_sweeps` or `max_hours`) before calling :meth:`run`.
+
+        Parameters
+        ----------
+        filename : str
+            The checkpoint file.
+        mmap_threshold : int | None
+            Given to :func:`tenpy.tools.io.load`: memory map large blocks instead of reading
+            them into RAM.
+
+        Returns
+        -------
+        engine : :class:`DMRGEngine`
+            Instance of the same class as the engine which saved the checkpoint.
+        """
+        data = io.load(filename, mmap_threshold=mmap_threshold)
+        engine_cls = data['class']
+        if not issubclass(engine_cls, cls):
+            raise TypeError("checkpoint of {0!r} is not a {1!r}".format(engine_cls, cls))
+        engine = engine_cls.__new__(engine_cls)
+        engine.__dict__.update(data['state'])
+        # the dictionaries were saved separately: relink them
+        engine.engine_params['lanczos_params'] = engine.lanczos_params
+        engine.engine_params['trunc_params'] = engine.trunc_params
+        storage = engine.engine_params.get('env_storage', None)
+        if storage is not None:  # environments were loaded as lists
+            env = engine.env
+            for key in ['_LP', '_RP']:
+                parts = getattr(env, key)
+                setattr(env, key, OutOfCoreList(len(parts), storage))
+                for i, part in enumerate(parts):
+                    getattr(env, key)[i] = part
+        if engine._run_state is not None:
+            engine.time0 = time.time() - engine._run_state['time_elapsed']
+        return engine
+
     def reset_stats(self):
         """Reset the statistics. Useful if you want to start a new Sweep run.
         """
@@ -427,7 +563,9 @@ class DMRGEngine(Sweep):
             'N_lanczos': [],
             'time': [],
             'err': [],
-            'E_trunc': []
+            'E_trunc': [],
+            'combine': [],
+            'time_update': []
         }
         self.sweep_stats = {
             'sweep': [],
@@ -489,6 +627,8 @@ class DMRGEngine(Sweep):
         self.update_stats['N_lanczos'].append(update_data['N'])
         self.update_stats['err'].append(update_data['err'])
         self.update_stats['time'].append(time.time() - self.time0)
+        self.update_stats['combine'].append(self.combine)
+        self.update_stats['time_update'].append(update_data.get('time_update', None))
         self.trunc_err_list.append(update_data['err'].eps)
         self.E_trunc_list.append(E_trunc)
 
@@ -509,9 +649,15 @@ class DMRGEngine(Sweep):
         theta : :class:`~tenpy.linalg.np_conserved.Array`
             Ground state of the effective Hamiltonian.
         N : int
-            Number of Lanczos iterations used.
+            Number of Lanczos iterations (or applications of `eff_H` for Davidson) used.
         """
-        E, theta, N = lanczos(self.eff_H, theta_guess, self.lanczos_params, theta_ortho)
+        method = get_parameter(self.lanczos_params, 'method', 'lanczos', 'Lanczos')
+        if method == 'lanczos':
+            E, theta, N = lanczos(self.eff_H, theta_guess, self.lanczos_params, theta_ortho)
+        elif method == 'davidson':
+            E, theta, N = davidson(self.eff_H, theta_guess, self.lanczos_params, theta_ortho)
+        else:
+            raise ValueError("Unknown eigensolver method " + repr(method))
         return E, theta, N
 
     def plot_update_stats(self, axes, xaxis='time', yaxis='E', y_exact=None, **kwargs):
@@ -657,6 +803,11 @@ class TwoSiteDMRGEngine(DMRGEngine):
         N_lanczos   Dimension of the Krylov space used in the lanczos diagonalization.
         ----------- -------------------------------------------------------------------
         time        Wallclock time evolved since :attr:`time0` (in seconds).
+        ----------- -------------------------------------------------------------------
+        combine     Whether legs were combined into pipes for the update,
+                    see :meth:`~tenpy.algorithms.mps_sweeps.Sweep.choose_combine`.
+        ----------- -------------------------------------------------------------------
+        time_update Wallclock time used for the update (in seconds).
         =========== ===================================================================
 
     sweep_stats : dict
@@ -704,12 +855,15 @@ class TwoSiteDMRGEngine(DMRGEngine):
         """
         EffectiveH = self.EffectiveH
         env = self.env
-        eff_H = EffectiveH(env, self.i0, self.combine)  # eff_H has attributes LP, RP, W1, W2.
+        combine = self.combine and not self.combine_auto
+        eff_H = EffectiveH(env, self.i0, combine)  # eff_H has attributes LP, RP, W1, W2.
         self.eff_H = eff_H
 
         # make theta
         cutoff = 1.e-16 if self.mixer is None else 1.e-8
         theta = self.psi.get_theta(self.i0, n=2, cutoff=cutoff)  # 'vL', 'p0', 'p1', 'vR'
+        if self.combine_auto:
+            self.choose_combine(eff_H, theta)
         theta_ortho = self.get_theta_ortho()
         if self.combine:
             theta = theta.combine_legs([['vL', 'p0'], ['p1', 'vR']],
@@ -914,6 +1068,175 @@ class TwoSiteDMRGEngine(DMRGEngine):
             self.env.get_RP(i0, store=True)
 
 
+class ParallelTwoSiteDMRGEngine(TwoSiteDMRGEngine):
+    """Real-space parallel two-site DMRG for finite MPS, following [Stoudenmire2013]_.
+
+    The chain is split into :attr:`segments` of (roughly) equal length, which are optimized
+    in parallel. Each call to :meth:`sweep` consists of two stages:
+
+    1. Each segment is swept (to the right and back) independently, with its own copy of the
+       engine returned by :meth:`_make_worker`. The environments at the segment boundaries are
+       the ones stored in :attr:`env`; they contain the tensors of the neighbouring segments
+       from the previous stage, i.e., they are outdated by one stage.
+       The singular values on the bonds between segments are not modified in this stage.
+    2. The bonds between the segments are optimized with a two-site update each.
+
+    Stoudenmire and White store the inverse singular values ``V = 1/S`` on the bonds between
+    segments to glue the segments together. In our :class:`~tenpy.networks.mps.MPS`, the singular
+    values are stored on all bonds and :meth:`~tenpy.networks.mps.MPS.get_B` converts between the
+    canonical forms with (the inverse of) them, which provides exactly this gauge information.
+
+    The segments and the boundary updates are distributed on threads with
+    :func:`~tenpy.tools.process.parallel_map_blocks`; set the number of threads with
+    :func:`~tenpy.tools.process.set_block_nthreads`. The threads share the tensors of
+    :attr:`psi` and :attr:`env` in memory, but each of them only modifies the tensors of its own
+    segment; environments needed by neighbouring segments are calculated in between the stages.
+    Sweeps without optimization are done serially.
+
+    Parameters
+    ----------
+    psi : :class:`~tenpy.networks.mps.MPS`
+        Initial guess for the ground state, which is to be optimized in-place.
+        Needs to be finite.
+    model : :class:`~tenpy.models.MPOModel`
+        The model representing the Hamiltonian for which we want to find the ground state.
+    engine_params : dict
+        Further optional parameters as for :class:`TwoSiteDMRGEngine`
+        (except `env_storage` and `mixer`, which are not supported), and the following.
+
+        ============== ====== ==================================================================
+        key            type   description
+        ============== ====== ==================================================================
+        n_segments     int    Number of segments. Defaults to
+                              :func:`~tenpy.tools.process.get_block_nthreads`.
+                              Reduced such that each segment has at least 4 sites.
+        ============== ====== ==================================================================
+
+    Attributes
+    ----------
+    segments : list of (int, int)
+        For each segment the first site and the site after the last one.
+    """
+
+    def __init__(self, psi, model, engine_params):
+        self._schedule = None  # set for the workers by :meth:`_make_worker`
+        self._env_outdated = False
+        super(ParallelTwoSiteDMRGEngine, self).__init__(psi, model, engine_params)
+        if not self.finite:
+            raise ValueError("real-space parallel DMRG works only for finite MPS")
+        for key in ['env_storage', 'mixer']:
+            if engine_params.get(key, None):
+                raise ValueError("real-space parallel DMRG does not support " + repr(key))
+        n_segments = get_parameter(engine_params, 'n_segments', None, 'Sweep')
+        if n_segments is None:
+            n_segments = get_block_nthreads()
+        L = psi.L
+        n_segments = max(min(int(n_segments), L // 4), 1)
+        bounds = [(k * L) // n_segments for k in range(n_segments + 1)]
+        self.segments = list(zip(bounds[:-1], bounds[1:]))
+
+    def sweep(self, optimize=True, meas_E_trunc=False):
+        """One sweep of all segments in parallel, followed by the updates between segments.
+
+        Parameters and return values as for :meth:`~tenpy.algorithms.mps_sweeps.Sweep.sweep`.
+        For a single segment or ``optimize=False``, this is just a usual (serial) sweep.
+        """
+        if self._schedule is not None or not optimize or len(self.segments) == 1:
+            if self._schedule is None and self._env_outdated:
+                self._reset_env()
+            return super(ParallelTwoSiteDMRGEngine, self).sweep(optimize, meas_E_trunc)
+        self._env_outdated = True
+        self._prepare_segment_envs()
+        # stage 1: sweep the segments
+        workers = []
+        for a, b in self.segments:
+            i0s = list(range(a, b - 2)) + list(range(b - 2, a, -1))
+            move_right = [True] * (b - 2 - a) + [False] * (b - 2 - a)
+            update_LP_RP = [(True, False)] * (b - 2 - a) + [(False, True)] * (b - 2 - a)
+            workers.append(self._make_worker(list(zip(i0s, move_right, update_LP_RP))))
+        args = [(w, a, b, meas_E_trunc) for w, (a, b) in zip(workers, self.segments)]
+        parallel_map_blocks(self._sweep_segment, args, work=[b - a for a, b in self.segments])
+        # stage 2: two-site updates on the bonds between the segments
+        boundary_workers = [
+            self._make_worker([(b - 1, True, (False, False))]) for a, b in self.segments[:-1]
+        ]
+        parallel_map_blocks(lambda w: w.sweep(True, meas_E_trunc),
+                            [(w, ) for w in boundary_workers])
+        # merge the statistics
+        self.E_trunc_list = []
+        self.trunc_err_list = []
+        for w in workers + boundary_workers:
+            for key, values in self.update_stats.items():
+                values.extend(w.update_stats[key])
+            self.E_trunc_list.extend(w.E_trunc_list)
+            self.trunc_err_list.extend(w.trunc_err_list)
+        # count the sweep as in :meth:`~tenpy.algorithms.mps_sweeps.Sweep.sweep`
+        self.sweeps += 1
+        if self.chi_list is not None:
+            new_chi_max = self.chi_list.get(self.sweeps, None)
+            if new_chi_max is not None:
+                self.trunc_params['chi_max'] = new_chi_max
+                if self.verbose >= 1:
+                    print("Setting chi_max =", new_chi_max)
+        if meas_E_trunc:
+            return np.max(self.trunc_err_list), np.max(self.E_trunc_list)
+        else:
+            return np.max(self.trunc_err_list), None
+
+    def get_sweep_schedule(self):
+        """Define the schedule of the sweep; for the workers the part of their segment."""
+        if self._schedule is not None:
+            return self._schedule
+        return super(ParallelTwoSiteDMRGEngine, self).get_sweep_schedule()
+
+    def _make_worker(self, schedule):
+        """Shallow copy of `self` sharing `psi` and `env`, which sweeps with `schedule`."""
+        worker = copy.copy(self)
+        worker._schedule = schedule
+        worker.update_stats = {key: [] for key in self.update_stats}
+        worker.chi_list = None  # `chi_max` is updated only by the main engine
+        return worker
+
+    def _sweep_segment(self, worker, a, b, meas_E_trunc):
+        """Sweep with `worker` and provide the environments for the next boundary updates."""
+        worker.sweep(True, meas_E_trunc)
+        for env in [worker.env] + worker.ortho_to_envs:
+            if b < self.psi.L:
+                env.get_LP(b - 1, store=True)
+            if a > 0:
+                env.get_RP(a, store=True)
+
+    def _prepare_segment_envs(self):
+        """Calculate the environments at the segment boundaries, delete outdated ones.
+
+        The boundary updates changed the outermost tensors of the segments. The environments
+        at the segment boundaries are calculated from the ones stored next to them, which still
+        contain the tensors of the neighbouring segments from before the last stage.
+        """
+        L = self.psi.L
+        for env in [self.env] + self.ortho_to_envs:
+            for a, b in self.segments[1:]:
+                env.get_LP(a, store=True)
+            for a, b in reversed(self.segments[:-1]):
+                env.get_RP(b - 1, store=True)
+            for a, b in self.segments:
+                if a > 0:
+                    for i in range(a + 1, b):
+                        env.del_LP(i)
+                if b < L:
+                    for i in range(a, b - 1):
+                        env.del_RP(i)
+
+    def _reset_env(self):
+        """Delete all outdated environments before a serial sweep."""
+        L = self.psi.L
+        for env in [self.env] + self.ortho_to_envs:
+            for i in range(1, L):
+                env.del_LP(i)
+                env.del_RP(i - 1)
+        self._env_outdated = False
+
+
 class SingleSiteDMRGEngine(DMRGEngine):
     """'Engine' for the single-site DMRG algorithm.
 
@@ -967,6 +1290,11 @@ class SingleSiteDMRGEngine(DMRGEngine):
         N_lanczos   Dimension of the Krylov space used in the lanczos diagonalization.
         ----------- -------------------------------------------------------------------
         time        Wallclock time evolved since :attr:`time0` (in seconds).
+        ----------- -------------------------------------------------------------------
+        combine     Whether legs were combined into pipes for the update,
+                    see :meth:`~tenpy.algorithms.mps_sweeps.Sweep.choose_combine`.
+        ----------- -------------------------------------------------------------------
+        time_update Wallclock time used for the update (in seconds).
         =========== ===================================================================
 
     sweep_stats : dict
@@ -1014,13 +1342,16 @@ class SingleSiteDMRGEngine(DMRGEngine):
         """
         EffectiveH = self.EffectiveH
         env = self.env
-        self.eff_H = eff_H = EffectiveH(env, self.i0, self.combine, self.move_right)
+        combine = self.combine and not self.combine_auto
+        self.eff_H = eff_H = EffectiveH(env, self.i0, combine, self.move_right)
         # eff_H has attributes LP, RP, W.
 
         # make theta
         cutoff = 1.e-16 if self.mixer is None else 1.e-8
         theta = self.psi.get_theta(self.i0, n=1, cutoff=cutoff).replace_label('p0', 'p')
         # 'vL', 'p', 'vR'
+        if self.combine_auto:
+            self.choose_combine(eff_H, theta)
         theta_ortho = self.get_theta_ortho()
         for th_o in theta_ortho:
             th_o.ireplace_label('p0', 'p')
@@ -1367,6 +1698,11 @@ class Engine(NpcLinearOperator):
         N_lanczos   Dimension of the Krylov space used in the lanczos diagonalization.
         ----------- -------------------------------------------------------------------
         time        Wallclock time evolved since :attr:`time0` (in seconds).
+        ----------- -------------------------------------------------------------------
+        combine     Whether legs were combined into pipes for the update,
+                    see :meth:`~tenpy.algorithms.mps_sweeps.Sweep.choose_combine`.
+        ----------- -------------------------------------------------------------------
+        time_update Wallclock time used for the update (in seconds).
         =========== ===================================================================
 
     sweep_stats : dict
@@ -1665,6 +2001,119 @@ class SingleSiteMixer(Mixer):
         return theta, next_B
 
 
+class ControlledExpansionMixer(SingleSiteMixer):
+    """Mixer for single-site DMRG with a cost-controlled subspace expansion.
+
+    The :class:`SingleSiteMixer` expands `theta` by the full term ``LHeff * theta`` (or
+    ``theta * RHeff``), which increases the bond dimension from ``chi`` to ``chi * (1 + D)``
+    before the truncation with the SVD, where ``D`` is the MPO bond dimension.
+    This makes single-site DMRG as expensive as two-site DMRG.
+
+    Instead, following the idea of the controlled bond expansion of [Gleis2023]_, we project the
+    expansion term onto the space *discarded* by the current `theta` and keep only its
+    dominant part in at most `expand_per_sector` new states per charge sector.
+    These are found with a random sketch (see :func:`~tenpy.algorithms.truncation.random_sketch`)
+    without ever building the full expansion term, such that the overall cost scales as
+    ``O(d chi^3 D)`` like the rest of single-site DMRG.
+
+    Parameters
+    ----------
+    mixer_params : dict
+        Parameters as described for :class:`Mixer`, and the following.
+
+        ================= ====== ===========================================================
+        key               type   description
+        ================= ====== ===========================================================
+        expand_per_sector int    Maximum number of new states added to the bond in each
+                                 charge sector.
+        ================= ====== ===========================================================
+
+    Attributes
+    ----------
+    expand_per_sector : int
+        Maximum number of new states added to the bond in each charge sector.
+    """
+
+    def __init__(self, mixer_params):
+        super().__init__(mixer_params)
+        self.expand_per_sector = get_parameter(mixer_params, 'expand_per_sector', 5, 'Mixer')
+
+    def subspace_expand(self, engine, theta, i0, move_right, next_B):
+        """Expand the MPS subspace by the dominant part of the expansion term.
+
+        Parameters and return values are the same as for :meth:`SingleSiteMixer.subspace_expand`.
+        """
+        if not engine.combine:  # Need to get Heff's even if combine=False
+            engine.eff_H.combine_Heff()
+        if move_right:
+            expand = self._expand_right(engine.eff_H.LHeff, theta)
+            if expand is None:
+                return theta, next_B
+            theta = npc.concatenate([theta, expand], axis=1, copy=False)
+            next_B = next_B.extend('vL', expand.legs[1].conj())
+        else:
+            expand = self._expand_left(engine.eff_H.RHeff, theta)
+            if expand is None:
+                return theta, next_B
+            theta = npc.concatenate([theta, expand], axis=0, copy=False)
+            next_B = next_B.extend('vR', expand.legs[0].conj())
+        return theta, next_B
+
+    def _expand_right(self, LHeff, theta):
+        """Dominant part of ``LHeff * theta`` orthogonal to `theta`, legs ``'(vL.p)', 'vR'``.
+
+        Returns ``None`` if there is nothing to expand."""
+        # orthonormal basis of the space kept by theta
+        Q0, _ = npc.qr(theta, inner_labels=['vR', None])
+        # sketch the range of the expansion term P = LHeff * theta with legs (vL.p), (wR.vR)
+        pipe = npc.LegPipe([LHeff.get_leg('wR'), theta.get_leg('vR')], qconj=-1)
+        omega = random_sketch(pipe, self.expand_per_sector)
+        omega = omega.iset_leg_labels(['(wR*.vR*)', 'k']).split_legs(0)
+        Y = npc.tensordot(theta, omega, axes=['vR', 'vR*'])
+        Y = npc.tensordot(LHeff, Y, axes=[['(vR.p*)', 'wR'], ['(vL.p)', 'wR*']])
+        Y.ireplace_label('(vR*.p)', '(vL.p)')
+        # project onto the discarded space
+        Y = Y - npc.tensordot(Q0, npc.tensordot(Q0.conj(), Y, axes=['(vL*.p*)', '(vL.p)']),
+                              axes=['vR', 'vR*'])
+        if npc.norm(Y) < 1.e-12:
+            return None
+        Q, _ = npc.qr(Y, inner_labels=['vR', None])
+        # compress P within the new subspace: Q^dagger P = U_B S_B VH_B
+        B = npc.tensordot(Q.conj(), LHeff, axes=['(vL*.p*)', '(vR*.p)'])
+        B = npc.tensordot(B, theta, axes=['(vR.p*)', '(vL.p)'])
+        B = B.combine_legs(['wR', 'vR'], qconj=-1)
+        U_B, S_B, _ = npc.svd(B, qtotal_LR=[theta.qtotal, None], inner_labels=['vR', 'vL'])
+        expand = npc.tensordot(Q, U_B.iscale_axis(S_B, 'vR'), axes=['vR', 'vR*'])
+        return expand.iscale_prefactor(self.amplitude)
+
+    def _expand_left(self, RHeff, theta):
+        """Dominant part of ``theta * RHeff`` orthogonal to `theta`, legs ``'vL', '(p.vR)'``.
+
+        Returns ``None`` if there is nothing to expand."""
+        # orthonormal rows spanning the space kept by theta: theta^T = Q0^T R
+        Q0, _ = npc.qr(theta.transpose(['(p.vR)', 'vL']), inner_labels=['vL', None])
+        # sketch the rows of the expansion term P = theta * RHeff with legs (vL.wL), (p.vR)
+        pipe = npc.LegPipe([theta.get_leg('vL'), RHeff.get_leg('wL')], qconj=+1)
+        omega = random_sketch(pipe, self.expand_per_sector)
+        omega = omega.iset_leg_labels(['(vL*.wL*)', 'k']).split_legs(0)
+        Y = npc.tensordot(omega, theta, axes=['vL*', 'vL'])
+        Y = npc.tensordot(Y, RHeff, axes=[['wL*', '(p.vR)'], ['wL', '(p*.vL)']])
+        Y.ireplace_label('(p.vL*)', '(p.vR)')
+        # project onto the discarded space
+        Y = Y - npc.tensordot(npc.tensordot(Y, Q0.conj(), axes=['(p.vR)', '(p*.vR*)']), Q0,
+                              axes=['vL*', 'vL'])
+        if npc.norm(Y) < 1.e-12:
+            return None
+        Q, _ = npc.qr(Y.transpose(['(p.vR)', 'k']), inner_labels=['vL', None])
+        # compress P within the new subspace: P Q^* = U_B S_B VH_B
+        B = npc.tensordot(RHeff, Q.conj(), axes=['(p.vL*)', '(p*.vR*)'])
+        B = npc.tensordot(theta, B, axes=['(p.vR)', '(p*.vL)'])
+        B = B.combine_legs(['vL', 'wL'], qconj=+1)
+        _, S_B, VH_B = npc.svd(B, qtotal_LR=[None, theta.qtotal], inner_labels=['vR', 'vL'])
+        expand = npc.tensordot(VH_B.iscale_axis(S_B, 'vL'), Q, axes=['vL*', 'vL'])
+        return expand.iscale_prefactor(self.amplitude)
+
+
 class TwoSiteMixer(SingleSiteMixer):
     """Mixer for two-site DMRG.
 
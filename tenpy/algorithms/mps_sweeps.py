@@ -13,10 +13,10 @@ of the MPS-MPO-MPS network, the latter forming the effective Hamiltonian.
 the :class:`Sweep` class attempts to generalize as many aspects of 'sweeping'
 algorithms as possible. :class:`EffectiveH` and its subclasses implement the
 effective Hamiltonians mentioned above. Currently, effective Hamiltonians for
-1-site and 2-site optimization are implemented.
+1-site and 2-site optimization are implemented, and a 0-site effective Hamiltonian acting on the
+bond matrix, as needed for the backwards evolution in TDVP.
 
 .. todo ::
-    Rebuild TDVP engine as subclasses of sweep
     Do testing
 """
 # Copyright 2018 TeNPy Developers
@@ -31,14 +31,14 @@ from ..networks.mpo import MPOEnvironment
 from ..linalg.sparse import NpcLinearOperator
 from ..tools.params import get_parameter, unused_parameters
 
-__all__ = ['Sweep', 'EffectiveH', 'OneSiteH', 'TwoSiteH']
+__all__ = ['Sweep', 'EffectiveH', 'ZeroSiteH', 'OneSiteH', 'TwoSiteH']
 
 
 class Sweep:
     """Prototype class for a 'sweeping' algorithm.
 
     This is a superclass, intended to cover common procedures in all algorithms that 'sweep'. This
-    includes DMRG, TDVP, TEBD, etc. Only DMRG is currently implemented in this way.
+    includes DMRG, TDVP, TEBD, etc. Only DMRG and TDVP are currently implemented in this way.
 
     Parameters
     ----------
@@ -61,6 +61,10 @@ class Sweep:
         Whether to combine legs into pipes as far as possible. This reduces the overhead of
         calculating charge combinations in the contractions. Makes the two-site DMRG engine
         equivalent to the old `EngineCombine`.
+        If :attr:`combine_auto` is True, this is set in each update by :meth:`choose_combine`.
+    combine_auto : bool
+        True if the engine parameter `combine` was ``'auto'``.
+        In that case, :meth:`choose_combine` decides for each update whether to combine legs.
     E_trunc_list : list
         List of truncation energies throughout a sweep.
     env : :class:`~tenpy.networks.mpo.MPOEnvironment`
@@ -107,6 +111,9 @@ class Sweep:
         self.verbose = get_parameter(engine_params, 'verbose', 1, 'Sweep')
 
         self.combine = get_parameter(engine_params, 'combine', False, 'Sweep')
+        self.combine_auto = (self.combine == 'auto')
+        if self.combine_auto:
+            self.combine = False  # chosen in each update by choose_combine()
         self.finite = self.psi.finite
         self.mixer = None  # means 'ignore mixer'; the mixer is activated in in :meth:`run`.
 
@@ -178,7 +185,8 @@ class Sweep:
                 RP_age = get_parameter(self.engine_params, 'RP_age', 0, 'Sweep')
             if self.engine_params.get('chi_list', None) is not None:
                 warnings.warn("Re-using environment with `chi_list` set! Do you want this?")
-        self.env = MPOEnvironment(self.psi, H, self.psi, LP, RP, LP_age, RP_age)
+        storage = get_parameter(self.engine_params, 'env_storage', None, 'Sweep')
+        self.env = MPOEnvironment(self.psi, H, self.psi, LP, RP, LP_age, RP_age, storage)
 
         # (re)initialize ortho_to_envs
         orthogonal_to = get_parameter(self.engine_params, 'orthogonal_to', [], 'Sweep')
@@ -265,10 +273,15 @@ class Sweep:
         """
         self.E_trunc_list = []
         self.trunc_err_list = []
-        schedule = self.get_sweep_schedule()
+        schedule = list(self.get_sweep_schedule())
+        n = self.EffectiveH.length
 
         # the actual sweep
-        for i0, move_right, update_LP_RP in schedule:
+        for k, (i0, move_right, update_LP_RP) in enumerate(schedule):
+            if k + 1 < len(schedule):  # start loading the environment for the next step
+                i0_next = schedule[k + 1][0]
+                self.env.prefetch_LP(i0_next)
+                self.env.prefetch_RP(i0_next + n - 1)
             self.i0 = i0
             self.move_right = move_right
             self.update_LP_RP = update_LP_RP
@@ -276,6 +289,7 @@ class Sweep:
             if self.verbose >= 10:
                 print("in sweep: i0 =", i0)
             # --------- the main work --------------
+            t_update = time.time()
             theta, theta_ortho = self.prepare_update()
             update_data = self.update_local(theta, theta_ortho, optimize=optimize)
             if update_LP:
@@ -286,6 +300,7 @@ class Sweep:
                 self.update_RP(update_data['VH'])
                 for o_env in self.ortho_to_envs:
                     o_env.get_RP(i0, store=True)
+            update_data['time_update'] = time.time() - t_update
             self.post_update_local(update_data, meas_E_trunc)
 
         if optimize:  # count optimization sweeps
@@ -358,6 +373,45 @@ class Sweep:
             theta_ortho.append(theta)
         return theta_ortho
 
+    def choose_combine(self, eff_H, theta):
+        """Decide whether to combine legs for the current update, if :attr:`combine_auto`.
+
+        Compares the estimated costs of both strategies as given by
+        :meth:`EffectiveH.combine_costs`: the initialization with :meth:`EffectiveH.combine_Heff`
+        pays off if it is compensated by the cheaper :meth:`EffectiveH.matvec` in the expected
+        number of iterations, for which we take the `N_lanczos` of the previous update.
+        If we decide to combine, call :meth:`EffectiveH.combine_Heff`.
+
+        Parameters
+        ----------
+        eff_H : :class:`EffectiveH`
+            The effective Hamiltonian for the current update, initialized with ``combine=False``.
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            The initial guess for the update, with legs not combined.
+
+        Returns
+        -------
+        combine : bool
+            Whether legs should be combined for this update. Also set as :attr:`combine`.
+        """
+        costs = eff_H.combine_costs(theta)
+        N_lanczos = getattr(self, 'update_stats', {}).get('N_lanczos', [])
+        if len(N_lanczos) > 0:
+            N_matvec = N_lanczos[-1]
+        else:
+            N_matvec = self.lanczos_params.get('N_min', 2)
+        total = {}
+        for combine, (flops_init, flops_matvec, memory) in costs.items():
+            total[combine] = flops_init + N_matvec * flops_matvec
+        combine = bool(total[True] < total[False])
+        if self.verbose >= 10:
+            print("choose_combine: costs {0!r} -> combine={1!s}".format(costs, combine))
+        if combine:
+            eff_H.combine = True
+            eff_H.combine_Heff()
+        self.combine = combine
+        return combine
+
     def mixer_cleanup(self):
         """Cleanup the effects of a mixer.
 
@@ -447,6 +501,153 @@ class EffectiveH(NpcLinearOperator):
         """
         raise NotImplementedError("This function should be implemented in derived classes")
 
+    def matvec_batch(self, thetas):
+        """Apply the effective Hamiltonian to each of the `thetas` at once.
+
+        The `thetas` are stacked along an additional leg ``'(batch)'``, such that a single
+        :meth:`matvec` acts on all of them, with larger blocks in each of the contractions.
+        This requires that :meth:`matvec` only uses leg labels, which is the case for the
+        effective Hamiltonians defined here.
+
+        Parameters
+        ----------
+        thetas : list of :class:`~tenpy.linalg.np_conserved.Array`
+            Wave functions with the same legs and charges.
+
+        Returns
+        -------
+        H_thetas : list of :class:`~tenpy.linalg.np_conserved.Array`
+            Result of applying the effective Hamiltonian to each of the `thetas`.
+        """
+        if len(thetas) == 1:
+            return [self.matvec(thetas[0])]
+        labels = thetas[0].get_leg_labels()
+        batch = npc.concatenate(
+            [th.transpose(labels).add_trivial_leg(len(labels), '(batch)') for th in thetas],
+            axis='(batch)')
+        bunch = [False] * len(labels) + [True]
+        _, batch = batch.sort_legcharge(False, bunch)
+        batch = self.matvec(batch)
+        return [batch.take_slice(j, '(batch)') for j in range(len(thetas))]
+
+    def diag(self, qtotal):
+        """Diagonal of the effective Hamiltonian in the basis of the wave functions `theta`.
+
+        The diagonal is calculated directly from the diagonals of `LP`, the MPO tensors and `RP`
+        (i.e. without forming the matrix), and cached for each `qtotal`.
+        This can be used as preconditioner in :class:`~tenpy.linalg.lanczos.Davidson`.
+
+        Parameters
+        ----------
+        qtotal : 1D array
+            The total charge of the wave functions `theta`.
+
+        Returns
+        -------
+        diag : :class:`~tenpy.linalg.np_conserved.Array`
+            The entries ``<theta_i|H|theta_i>`` for the basis states ``theta_i``,
+            with the same legs and labels as the `theta` for :meth:`matvec`.
+        """
+        key = tuple(qtotal)
+        diag = self._diag_cache.get(key, None)
+        if diag is None:
+            diag = self._diag_cache[key] = self._calc_diag(qtotal)
+        return diag.copy()
+
+    def _calc_diag(self, qtotal):
+        """Calculate the diagonal for :meth:`diag`."""
+        raise NotImplementedError("This function should be implemented in derived classes")
+
+    def combine_costs(self, theta):
+        """Estimate the costs of :meth:`matvec` with and without combining legs.
+
+        The estimates are based on the actual block structure of the tensors, see
+        :func:`~tenpy.linalg.np_conserved.tensordot_cost`; none of the contractions is performed.
+        Should be called before :meth:`combine_Heff`.
+
+        Parameters
+        ----------
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            Wave function with the legs *not* combined, i.e., as for ``combine=False``.
+
+        Returns
+        -------
+        costs : dict
+            For ``combine`` in ``[False, True]``, ``costs[combine]`` is a tuple
+            ``(flops_init, flops_matvec, memory)`` with the number of multiply-add operations
+            needed for the initialization (i.e. :meth:`combine_Heff`) and for a single
+            :meth:`matvec`, and the number of entries in the additional tensors
+            (`LHeff` and `RHeff`) to be stored.
+        """
+        raise NotImplementedError("This function should be implemented in derived classes")
+
+
+class ZeroSiteH(EffectiveH):
+    r"""Class defining the zero-site effective Hamiltonian for Lanczos.
+
+    The effective zero-site Hamiltonian acts on the bond matrix `C` between the sites `i0` and
+    ``i0 + 1`` and looks like this::
+
+            |        .---    ---.
+            |        |          |
+            |       LP----------RP
+            |        |          |
+            |        .---    ---.
+
+    where `LP` is the left part strictly left of site ``i0 + 1`` and `RP` the right part strictly
+    right of site `i0`. This is used for the backwards evolution in single-site TDVP.
+
+    Parameters
+    ----------
+    env : :class:`~tenpy.networks.mpo.MPOEnvironment`
+        Environment for contraction ``<psi|H|psi>``.
+    i0 : int
+        Index of the site left of the bond.
+    combine : bool
+        Ignored, there are no legs to be combined.
+    move_right : bool
+        Wheter the the sweep is moving right or left for the next update.
+
+    Attributes
+    ----------
+    length : int
+        Number of (MPS) sites the effective hamiltonian covers.
+    move_right : bool
+        See above.
+    LP : :class:`tenpy.linalg.np_conserved.Array`
+        Left part of the environment.
+    RP : :class:`tenpy.linalg.np_conserved.Array`
+        Right part of the environment.
+    """
+    length = 0
+
+    def __init__(self, env, i0, combine=False, move_right=True):
+        self.LP = env.get_LP(i0 + 1)
+        self.RP = env.get_RP(i0)
+        self.combine = False
+        self.move_right = move_right
+        self._diag_cache = {}
+
+    def matvec(self, theta):
+        """Apply the effective Hamiltonian to `theta`.
+
+        Parameters
+        ----------
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            Bond matrix with labels ``vL, vR``.
+
+        Returns
+        -------
+        theta :class:`~tenpy.linalg.np_conserved.Array`
+            Product of `theta` and the effective Hamiltonian.
+        """
+        labels = theta.get_leg_labels()
+        theta = npc.tensordot(self.LP, theta, axes=['vR', 'vL'])
+        theta = npc.tensordot(theta, self.RP, axes=[['wR', 'vR'], ['wL', 'vL']])
+        theta.ireplace_labels(['vR*', 'vL*'], ['vL', 'vR'])
+        theta.itranspose(labels)  # if necessary, transpose
+        return theta
+
 
 class OneSiteH(EffectiveH):
     r"""Class defining the one-site effective Hamiltonian for Lanczos.
@@ -505,6 +706,7 @@ class OneSiteH(EffectiveH):
         self.W = env.H.get_W(i0)
         self.combine = combine
         self.move_right = move_right
+        self._diag_cache = {}
         if combine:
             self.combine_Heff()
 
@@ -542,6 +744,27 @@ class OneSiteH(EffectiveH):
         theta.itranspose(labels)  # if necessary, transpose
         return theta
 
+    def _calc_diag(self, qtotal):
+        LP = _dense_diagonal(self.LP, ['wR'], 'vR*', 'vR')  # wR, vL
+        W = _dense_diagonal(self.W, ['wL', 'wR'], 'p', 'p*')  # wL, wR, p
+        RP = _dense_diagonal(self.RP, ['wL'], 'vL*', 'vL')  # wL, vR
+        LW = np.tensordot(LP, W, axes=[0, 0])  # vL, wR, p
+        legs = [self.LP.get_leg('vR*'), self.W.get_leg('p'), self.RP.get_leg('vL*')]
+        diag = npc.Array.from_func(np.zeros,
+                                   legs,
+                                   qtotal=qtotal,
+                                   func_kwargs={'dtype': np.result_type(LW, RP)})
+        diag.iset_leg_labels(['vL', 'p', 'vR'])
+        for qindices, block in zip(diag._qdata, diag._data):
+            sl = [leg.get_slice(qi) for leg, qi in zip(legs, qindices)]
+            block[...] = np.tensordot(LW[sl[0], :, sl[1]], RP[:, sl[2]], axes=[1, 0])
+        if self.combine:
+            if self.move_right:
+                diag = diag.combine_legs(['vL', 'p'], pipes=self.pipeL)
+            else:
+                diag = diag.combine_legs(['p', 'vR'], pipes=self.pipeR)
+        return diag
+
     def combine_Heff(self):
         """Combine LP and RP with W to form LHeff and RHeff, depending on the direction.
 
@@ -560,6 +783,32 @@ class OneSiteH(EffectiveH):
                                         pipes=[pipeR, pipeR.conj()],
                                         new_axes=[-1, 0])
 
+    def combine_costs(self, theta):
+        LP, W, RP = self.LP, self.W, self.RP
+        flops_1, res = npc.tensordot_cost(LP, theta, axes=['vR', 'vL'])
+        flops_2, res = npc.tensordot_cost(W, res, axes=[['wL', 'p*'], ['wR', 'p']])
+        flops_3, res = npc.tensordot_cost(res, RP, axes=[['wR', 'vR'], ['wL', 'vL']])
+        costs = {False: (0, flops_1 + flops_2 + flops_3, 0)}
+        # combined: combine_Heff() always calculates both LHeff and RHeff
+        flops_L, _ = npc.tensordot_cost(LP, W, axes=['wR', 'wL'])
+        flops_R, _ = npc.tensordot_cost(W, RP, axes=['wR', 'wL'])
+        pipeL = npc.LegPipe([LP.get_leg('vR*'), W.get_leg('p')], qconj=+1)
+        LHeff = _zeros_structure([pipeL, W.get_leg('wR'), pipeL.conj()],
+                                 ['(vR*.p)', 'wR', '(vR.p*)'])
+        pipeR = npc.LegPipe([W.get_leg('p'), RP.get_leg('vL*')], qconj=-1)
+        RHeff = _zeros_structure([pipeR.conj(), W.get_leg('wL'), pipeR],
+                                 ['(p*.vL)', 'wL', '(p.vL*)'])
+        if self.move_right:
+            theta = _zeros_structure([pipeL, RP.get_leg('vL*')], ['(vL.p)', 'vR'], theta.qtotal)
+            flops_1, res = npc.tensordot_cost(LHeff, theta, axes=['(vR.p*)', '(vL.p)'])
+            flops_2, res = npc.tensordot_cost(res, RP, axes=[['wR', 'vR'], ['wL', 'vL']])
+        else:
+            theta = _zeros_structure([LP.get_leg('vR*'), pipeR], ['vL', '(p.vR)'], theta.qtotal)
+            flops_1, res = npc.tensordot_cost(theta, RHeff, axes=['(p.vR)', '(p*.vL)'])
+            flops_2, res = npc.tensordot_cost(LP, res, axes=[['vR', 'wR'], ['vL', 'wL']])
+        costs[True] = (flops_L + flops_R, flops_1 + flops_2, LHeff.size + RHeff.size)
+        return costs
+
 
 class TwoSiteH(EffectiveH):
     r"""Class defining the two-site effective Hamiltonian for Lanczos.
@@ -627,6 +876,7 @@ class TwoSiteH(EffectiveH):
         self.W2 = env.H.get_W(i0 + 1).replace_labels(['p', 'p*'], ['p1', 'p1*'])
         # 'wL', 'wR', 'p1', 'p1*'
         self.combine = combine
+        self._diag_cache = {}
         if combine:
             self.combine_Heff()
 
@@ -658,6 +908,31 @@ class TwoSiteH(EffectiveH):
         # This is where we would truncate. Separate mode from combine?
         return theta
 
+    def _calc_diag(self, qtotal):
+        LP = _dense_diagonal(self.LP, ['wR'], 'vR*', 'vR')  # wR, vL
+        W1 = _dense_diagonal(self.W1, ['wL', 'wR'], 'p0', 'p0*')  # wL, wR, p0
+        W2 = _dense_diagonal(self.W2, ['wL', 'wR'], 'p1', 'p1*')  # wL, wR, p1
+        RP = _dense_diagonal(self.RP, ['wL'], 'vL*', 'vL')  # wL, vR
+        LW = np.tensordot(LP, W1, axes=[0, 0])  # vL, wR, p0
+        WR = np.tensordot(W2, RP, axes=[1, 0])  # wL, p1, vR
+        legs = [
+            self.LP.get_leg('vR*'),
+            self.W1.get_leg('p0'),
+            self.W2.get_leg('p1'),
+            self.RP.get_leg('vL*')
+        ]
+        diag = npc.Array.from_func(np.zeros,
+                                   legs,
+                                   qtotal=qtotal,
+                                   func_kwargs={'dtype': np.result_type(LW, WR)})
+        diag.iset_leg_labels(['vL', 'p0', 'p1', 'vR'])
+        for qindices, block in zip(diag._qdata, diag._data):
+            sl = [leg.get_slice(qi) for leg, qi in zip(legs, qindices)]
+            block[...] = np.tensordot(LW[sl[0], :, sl[1]], WR[:, sl[2], sl[3]], axes=[1, 0])
+        if self.combine:
+            diag = diag.combine_legs([['vL', 'p0'], ['p1', 'vR']], pipes=[self.pipeL, self.pipeR])
+        return diag
+
     def combine_Heff(self):
         """Combine LP with W1 and RP with W2 to get the effective parts of the
         Hamiltonian with piped legs.
@@ -672,3 +947,68 @@ class TwoSiteH(EffectiveH):
         self.RHeff = RHeff.combine_legs([['p1', 'vL*'], ['p1*', 'vL']],
                                         pipes=[pipeR, pipeR.conj()],
                                         new_axes=[2, 0])
+
+    def combine_costs(self, theta):
+        LP, W1, W2, RP = self.LP, self.W1, self.W2, self.RP
+        flops_1, res = npc.tensordot_cost(LP, theta, axes=['vR', 'vL'])
+        flops_2, res = npc.tensordot_cost(W1, res, axes=[['wL', 'p0*'], ['wR', 'p0']])
+        flops_3, res = npc.tensordot_cost(res, W2, axes=[['wR', 'p1'], ['wL', 'p1*']])
+        flops_4, res = npc.tensordot_cost(res, RP, axes=[['wR', 'vR'], ['wL', 'vL']])
+        costs = {False: (0, flops_1 + flops_2 + flops_3 + flops_4, 0)}
+        flops_L, _ = npc.tensordot_cost(LP, W1, axes=['wR', 'wL'])
+        flops_R, _ = npc.tensordot_cost(RP, W2, axes=['wL', 'wR'])
+        pipeL = npc.LegPipe([LP.get_leg('vR*'), W1.get_leg('p0')], qconj=+1)
+        LHeff = _zeros_structure([pipeL, W1.get_leg('wR'), pipeL.conj()],
+                                 ['(vR*.p0)', 'wR', '(vR.p0*)'])
+        pipeR = npc.LegPipe([W2.get_leg('p1'), RP.get_leg('vL*')], qconj=-1)
+        RHeff = _zeros_structure([pipeR.conj(), W2.get_leg('wL'), pipeR],
+                                 ['(p1*.vL)', 'wL', '(p1.vL*)'])
+        theta = _zeros_structure([pipeL, pipeR], ['(vL.p0)', '(p1.vR)'], theta.qtotal)
+        flops_1, res = npc.tensordot_cost(LHeff, theta, axes=['(vR.p0*)', '(vL.p0)'])
+        flops_2, res = npc.tensordot_cost(res, RHeff, axes=[['wR', '(p1.vR)'], ['wL', '(p1*.vL)']])
+        costs[True] = (flops_L + flops_R, flops_1 + flops_2, LHeff.size + RHeff.size)
+        return costs
+
+
+def _zeros_structure(legs, labels, qtotal=None):
+    """Zero :class:`~tenpy.linalg.np_conserved.Array` with all blocks compatible with `qtotal`.
+
+    The blocks are read-only views of a single zero, such that the array can be used for
+    :func:`~tenpy.linalg.np_conserved.tensordot_cost` without allocating the memory.
+    """
+    zero = np.zeros(())
+    a = npc.Array.from_func(np.broadcast_to, legs, zero.dtype, qtotal, (zero, ), shape_kw='shape')
+    a.iset_leg_labels(labels)
+    return a
+
+
+def _dense_diagonal(a, keep, leg, leg_conj):
+    """Diagonal of `a` in the contractible legs `leg`, `leg_conj` as dense numpy array.
+
+    Only the blocks on the diagonal are considered, such that `a` is never converted to a dense
+    array as a whole.
+
+    Parameters
+    ----------
+    a : :class:`~tenpy.linalg.np_conserved.Array`
+        The array of which we want the diagonal.
+    keep : list of str
+        Labels of all the other legs of `a`.
+    leg, leg_conj : str
+        Labels of the legs for which we take the diagonal.
+
+    Returns
+    -------
+    diag : ndarray
+        Entries ``diag[k0, k1, ..., i] = a[keep[0]=k0, keep[1]=k1, ..., leg=i, leg_conj=i]``.
+    """
+    a = a.transpose(keep + [leg, leg_conj])
+    a.legs[-2].test_contractible(a.legs[-1])
+    diag = np.zeros(a.shape[:-1], a.dtype)
+    n = len(keep)
+    for qindices, block in zip(a._qdata, a._data):
+        if qindices[n] != qindices[n + 1]:
+            continue  # not on the diagonal
+        sl = tuple([l.get_slice(qi) for l, qi in zip(a.legs, qindices[:n + 1])])
+        diag[sl] = np.diagonal(block, axis1=n, axis2=n + 1)
+    return diag
@@ -1,4 +1,4 @@
-"""Time Dependant Variational Principle (TDVP) with MPS (finite version only).
+"""Time Dependant Variational Principle (TDVP) with MPS.
 
 The TDVP MPS algorithm was first proposed by [Haegeman2011]_. However the stability of the
 algorithm was later improved in [Haegeman2016]_, that we are following in this implementation.
@@ -13,20 +13,505 @@ and the two-site algorithm which does allow the bond dimension to grow - but req
     This is still a beta version, use with care.
     The interface might still change.
 
-.. todo ::
-    long-term: Much of the code is similar as in DMRG. To avoid too much duplicated code,
-    we should have a general way to sweep through an MPS and updated one or two sites, used in both
-    cases.
+The :class:`SingleSiteTDVPEngine` and :class:`TwoSiteTDVPEngine` are based on the same
+:class:`~tenpy.algorithms.mps_sweeps.Sweep` and effective Hamiltonians as DMRG and support
+finite and infinite MPS; the old :class:`Engine` is only kept for backwards compatibility.
 """
 
 import numpy as np
+import time
 from tenpy.networks.mpo import MPOEnvironment
 import tenpy.linalg.np_conserved as npc
 from tenpy.tools.params import get_parameter
 from tenpy.linalg.lanczos import LanczosEvolution
-from tenpy.algorithms.truncation import svd_theta
+from tenpy.algorithms.truncation import svd_theta, TruncationError
+from tenpy.algorithms.mps_sweeps import Sweep, ZeroSiteH, OneSiteH, TwoSiteH
+
+__all__ = [
+    'TDVPEngine', 'SingleSiteTDVPEngine', 'TwoSiteTDVPEngine', 'Engine', 'H0_mixed', 'H1_mixed',
+    'H2_mixed'
+]
+
+
+class TDVPEngine(Sweep):
+    """Time dependent variational principle (TDVP) as :class:`~tenpy.algorithms.mps_sweeps.Sweep`.
+
+    This class contains the methods shared by :class:`SingleSiteTDVPEngine` and
+    :class:`TwoSiteTDVPEngine`. One :meth:`~tenpy.algorithms.mps_sweeps.Sweep.sweep`
+    performs a single time step `dt` with the symmetric second-order integrator of
+    [Haegeman2016]_: a sweep to the right evolving each site (or pair of sites) forward by
+    ``dt/2`` and the bond (or site) in between backwards, followed by the same sweep to the left.
+    The two forward evolutions at the right end of the chain use the same effective Hamiltonian,
+    so they are combined into a single evolution by `dt`.
+
+    In contrast to the old :class:`Engine`, the environments are kept in :attr:`env`
+    and only the parts invalidated by an update are recalculated, and the forward evolution uses
+    the effective Hamiltonians of :mod:`~tenpy.algorithms.mps_sweeps`, including the option to
+    `combine` legs (also ``'auto'``). The matrix exponentials are calculated with
+    :class:`~tenpy.linalg.lanczos.LanczosEvolution`.
+
+    For infinite MPS, each sweep goes through the sites of the unit cell only, keeping the
+    environments `LP` left of site 0 and `RP` right of site ``L-1`` fixed.
+    At the ends of the unit cell, these environments are updated with the new tensors,
+    similar as in iDMRG. This neglects the evolution of the neighbouring unit cells during a
+    single time step and is thus only an approximation for (translation invariant)
+    infinite systems.
 
-__all__ = ['Engine', 'H0_mixed', 'H1_mixed', 'H2_mixed']
+    Parameters
+    ----------
+    psi : :class:`~tenpy.networks.mps.MPS`
+        Initial state to be time evolved. Modified in place.
+    model : :class:`~tenpy.models.model.MPOModel`
+        The model representing the Hamiltonian for the time evolution.
+    engine_params : dict
+        Further optional parameters as described in the following table, in addition to the
+        ones of :class:`~tenpy.algorithms.mps_sweeps.Sweep` (e.g. `combine`).
+        Use ``verbose>0`` to print the used parameters during runtime.
+
+        ============== ========= ===============================================================
+        key            type      description
+        ============== ========= ===============================================================
+        start_time     float     Initial value for :attr:`evolved_time`
+        -------------- --------- ---------------------------------------------------------------
+        dt             float     Time step. Use a complex `dt` for imaginary time evolution.
+        -------------- --------- ---------------------------------------------------------------
+        N_steps        int       Number of time steps `dt` performed in :meth:`run`.
+        -------------- --------- ---------------------------------------------------------------
+        trunc_params   dict      Truncation parameters as described in
+                                 :func:`~tenpy.algorithms.truncation.truncate`.
+                                 Only used by :class:`TwoSiteTDVPEngine`.
+        -------------- --------- ---------------------------------------------------------------
+        lanczos_params dict      Lanczos parameters as described in
+                                 :class:`~tenpy.linalg.lanczos.LanczosEvolution`.
+                                 By default, we set ``'adaptive': True``.
+        ============== ========= ===============================================================
+
+    Attributes
+    ----------
+    evolved_time : float | complex
+        Indicating how long `psi` has been evolved, ``psi = exp(-i * evolved_time * H) psi(t=0)``.
+    dt : float | complex
+        The time step.
+    N_steps : int
+        Number of time steps performed in :meth:`run`.
+    N_matvec : int
+        Total number of applications of effective Hamiltonians so far.
+    eff_H : :class:`~tenpy.algorithms.mps_sweeps.EffectiveH`
+        Effective Hamiltonian for the forward evolution of the current update.
+    update_stats : dict
+        A dictionary with detailed statistics.
+        For each key in the following table, the dictionary contains a list where one value is
+        added for each update in a sweep.
+
+        =========== ===================================================================
+        key         description
+        =========== ===================================================================
+        i0          An update was performed on sites ``i0, ..., i0 + n - 1``.
+        ----------- -------------------------------------------------------------------
+        N_lanczos   Number of applications of the effective Hamiltonians in the update,
+                    including the backwards evolution.
+        ----------- -------------------------------------------------------------------
+        err         The truncation error of the update.
+        ----------- -------------------------------------------------------------------
+        time        Wallclock time evolved since :attr:`time0` (in seconds).
+        ----------- -------------------------------------------------------------------
+        combine     Whether legs were combined into pipes for the update,
+                    see :meth:`~tenpy.algorithms.mps_sweeps.Sweep.choose_combine`.
+        ----------- -------------------------------------------------------------------
+        time_update Wallclock time used for the update (in seconds).
+        =========== ===================================================================
+
+    sweep_stats : dict
+        A dictionary with statistics for each time step performed in :meth:`run`.
+
+        ============= ===================================================================
+        key           description
+        ============= ===================================================================
+        sweep         Number of sweeps (= time steps) performed so far.
+        ------------- -------------------------------------------------------------------
+        evolved_time  The :attr:`evolved_time` after the time step.
+        ------------- -------------------------------------------------------------------
+        time          Wallclock time evolved since :attr:`time0` (in seconds).
+        ------------- -------------------------------------------------------------------
+        max_trunc_err The maximum truncation error in the time step.
+        ------------- -------------------------------------------------------------------
+        max_chi       Maximum bond dimension.
+        ------------- -------------------------------------------------------------------
+        N_matvec      The value of :attr:`N_matvec` after the time step.
+        ============= ===================================================================
+    """
+
+    def __init__(self, psi, model, engine_params):
+        # needed already for the environment sweeps of infinite MPS in Sweep.__init__
+        self.evolved_time = get_parameter(engine_params, 'start_time', 0., 'TDVP')
+        self.dt = get_parameter(engine_params, 'dt', 2, 'TDVP')
+        self.N_steps = get_parameter(engine_params, 'N_steps', 10, 'TDVP')
+        super().__init__(psi, model, engine_params)
+        self.lanczos_params.setdefault('adaptive', True)
+
+    def run(self):
+        """Evolve :attr:`psi` by `N_steps` time steps `dt`.
+
+        Returns
+        -------
+        psi : :class:`~tenpy.networks.mps.MPS`
+            The time evolved state, which is modified in place.
+        """
+        for _ in range(self.N_steps):
+            max_trunc_err, _ = self.sweep()
+            self.evolved_time = self.evolved_time + self.dt
+            self.sweep_stats['sweep'].append(self.sweeps)
+            self.sweep_stats['evolved_time'].append(self.evolved_time)
+            self.sweep_stats['time'].append(time.time() - self.time0)
+            self.sweep_stats['max_trunc_err'].append(max_trunc_err)
+            self.sweep_stats['max_chi'].append(max(self.psi.chi))
+            self.sweep_stats['N_matvec'].append(self.N_matvec)
+            if self.verbose >= 1:
+                msg = "TDVP t={t!s}, max_chi={chi:d}, max_trunc_err={err:.2e}, N_matvec={N:d}"
+                print(msg.format(t=self.evolved_time,
+                                 chi=max(self.psi.chi),
+                                 err=max_trunc_err,
+                                 N=self.N_matvec))
+        return self.psi
+
+    def reset_stats(self):
+        """Reset the statistics, useful if you want to start a new run."""
+        self.sweeps = get_parameter(self.engine_params, 'sweep_0', 0, 'Sweep')
+        self.shelve = False
+        self.N_matvec = 0
+        self.update_stats = {
+            'i0': [],
+            'N_lanczos': [],
+            'err': [],
+            'time': [],
+            'combine': [],
+            'time_update': []
+        }
+        self.sweep_stats = {
+            'sweep': [],
+            'evolved_time': [],
+            'time': [],
+            'max_trunc_err': [],
+            'max_chi': [],
+            'N_matvec': []
+        }
+        self.chi_list = get_parameter(self.engine_params, 'chi_list', None, 'Sweep')
+        if self.chi_list is not None:
+            chi_max = self.chi_list[max([k for k in self.chi_list.keys() if k <= self.sweeps])]
+            self.trunc_params['chi_max'] = chi_max
+            if self.verbose >= 1:
+                print("Setting chi_max =", chi_max)
+        self.time0 = time.time()
+
+    def get_sweep_schedule(self):
+        """Define the schedule of a single time step.
+
+        With ``n = EffectiveH.length``, we update ``i0 = 0, ..., L-n-1`` moving right
+        (with a backwards evolution right of the updated sites), the right end ``i0 = L-n``
+        with the full time step, and ``i0 = L-n-1, ..., 0`` moving left (with a backwards
+        evolution left of the updated sites, except for the last update at ``i0 = 0``).
+
+        Returns
+        -------
+        schedule : iterable of (int, bool, (bool, bool))
+            Schedule for the sweep, see :meth:`~tenpy.algorithms.mps_sweeps.get_sweep_schedule`.
+            Here, `update_LP` or `update_RP` is True if and only if a backwards evolution
+            follows.
+        """
+        L = self.psi.L
+        n = self.EffectiveH.length
+        assert L >= n
+        i0s = list(range(0, L - n)) + list(range(L - n, -1, -1))
+        move_right = [True] * (L - n) + [False] * (L - n + 1)
+        update_LP_RP = [[True, False]] * (L - n) + [[False, True]] * (L - n) + [[False, False]]
+        return zip(i0s, move_right, update_LP_RP)
+
+    def post_update_local(self, update_data, meas_E_trunc=False):
+        """Update the environments at the ends of the unit cell and collect statistics.
+
+        Parameters
+        ----------
+        update_data : dict
+            Data computed during the local update, with keys ``'N', 'err'``.
+        meas_E_trunc : bool
+            Ignored, the energy is not measured.
+        """
+        i0 = self.i0
+        if not self.finite:
+            L = self.psi.L
+            env = self.env
+            if i0 == L - self.EffectiveH.length and not self.move_right:
+                LP = env._contract_LP(L - 1, env.get_LP(L - 1, store=False))
+                env.set_LP(L, LP, age=env.get_LP_age(L - 1) + 1)
+            if i0 == 0 and not self.move_right:
+                RP = env._contract_RP(0, env.get_RP(0, store=False))
+                env.set_RP(-1, RP, age=env.get_RP_age(0) + 1)
+        self.update_stats['i0'].append(i0)
+        self.update_stats['N_lanczos'].append(update_data['N'])
+        self.update_stats['err'].append(update_data['err'])
+        self.update_stats['time'].append(time.time() - self.time0)
+        self.update_stats['combine'].append(self.combine)
+        self.update_stats['time_update'].append(update_data.get('time_update', None))
+        self.trunc_err_list.append(update_data['err'].eps)
+        self.E_trunc_list.append(None)
+
+    def evolve(self, H, theta, delta):
+        """Calculate ``expm(delta H).dot(theta)`` with Lanczos.
+
+        Parameters
+        ----------
+        H : :class:`~tenpy.algorithms.mps_sweeps.EffectiveH`
+            The effective Hamiltonian.
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            The wave function to be evolved.
+        delta : complex
+            Prefactor of `H` in the exponential, e.g. ``-1.j * dt``.
+
+        Returns
+        -------
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            The evolved (and normalized) wave function.
+        N : int
+            The number of applications of `H`.
+        """
+        lanczos = LanczosEvolution(H, theta, self.lanczos_params)
+        theta, _ = lanczos.run(delta)
+        theta.iscale_prefactor(1. / npc.norm(theta))
+        self.N_matvec += lanczos.N_matvec
+        return theta, lanczos.N_matvec
+
+    def update_LP(self, U):
+        """Update the left part of the environment strictly left of site ``i0 + 1``."""
+        self.env.get_LP(self.i0 + 1, store=True)
+
+    def update_RP(self, VH):
+        """Update the right part of the environment strictly right of site ``i0 + n - 2``."""
+        self.env.get_RP(self.i0 + self.EffectiveH.length - 2, store=True)
+
+    def _get_dt(self):
+        """The time step for the forward evolution of the current update."""
+        if self.i0 == self.psi.L - self.EffectiveH.length:
+            return self.dt  # the turning point at the right end combines two half steps
+        return 0.5 * self.dt
+
+    def _del_env(self, LP=[], RP=[]):
+        """Delete the environments at the given sites, except the outer ones."""
+        L = self.psi.L
+        for i in LP:
+            if 0 < i < L:
+                self.env.del_LP(i)
+        for i in RP:
+            if 0 <= i < L - 1:
+                self.env.del_RP(i)
+
+
+class SingleSiteTDVPEngine(TDVPEngine):
+    """Single-site TDVP, see :class:`TDVPEngine`.
+
+    The forward evolution uses :class:`~tenpy.algorithms.mps_sweeps.OneSiteH`,
+    the backwards evolution of the bond matrix :class:`~tenpy.algorithms.mps_sweeps.ZeroSiteH`.
+    The bond dimension does not grow and nothing is truncated.
+
+    Parameters
+    ----------
+    psi, model, engine_params :
+        See :class:`TDVPEngine`.
+    """
+
+    def __init__(self, psi, model, engine_params):
+        self.EffectiveH = OneSiteH
+        super().__init__(psi, model, engine_params)
+
+    def prepare_update(self):
+        """Prepare the effective Hamiltonian and wave function on site ``i0``.
+
+        Returns
+        -------
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            The wave function on site `i0`, labels ``'vL', 'p', 'vR'``, combined
+            with the pipes of :attr:`eff_H` if :attr:`combine`.
+        theta_ortho : list
+            Empty list, there is nothing to orthogonalize against.
+        """
+        combine = self.combine and not self.combine_auto
+        self.eff_H = eff_H = self.EffectiveH(self.env, self.i0, combine, self.move_right)
+        theta = self.psi.get_theta(self.i0, n=1).replace_label('p0', 'p')
+        if self.combine_auto:
+            self.choose_combine(eff_H, theta)
+        if self.combine:
+            if self.move_right:
+                theta = theta.combine_legs(['vL', 'p'], pipes=[eff_H.pipeL])
+            else:
+                theta = theta.combine_legs(['p', 'vR'], pipes=[eff_H.pipeR])
+        else:
+            theta.itranspose(['vL', 'p', 'vR'])
+        return theta, []
+
+    def update_local(self, theta, theta_ortho, optimize=True):
+        """Evolve site `i0` forward, split it and evolve the bond matrix backwards.
+
+        Parameters
+        ----------
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            The wave function as returned by :meth:`prepare_update`.
+        theta_ortho : list
+            Ignored.
+        optimize : bool
+            Whether to actually evolve in time. If False, just move the orthogonality center.
+
+        Returns
+        -------
+        update_data : dict
+            ``'N'`` number of applications of the effective Hamiltonians,
+            ``'err'`` the (vanishing) truncation error, and ``'U', 'VH'`` (both ``None``).
+        """
+        i0 = self.i0
+        psi = self.psi
+        dt = self._get_dt()
+        N = 0
+        if optimize:
+            theta, N = self.evolve(self.eff_H, theta, -1.j * dt)
+        if self.combine:
+            theta = theta.split_legs()
+        theta.itranspose(['vL', 'p', 'vR'])
+        update_LP, update_RP = self.update_LP_RP
+        if update_LP:
+            theta = theta.combine_legs(['vL', 'p'], qconj=+1)
+            U, S, VH = npc.svd(theta, qtotal_LR=[theta.qtotal, None], inner_labels=['vR', 'vL'])
+            psi.set_B(i0, U.split_legs(['(vL.p)']), form='A')
+            psi.set_SR(i0, S)
+            self._del_env(LP=[i0 + 1])
+            self.update_LP(U)
+            C = VH.scale_axis(S, 'vL')
+            if optimize:
+                C, N_C = self.evolve(ZeroSiteH(self.env, i0), C, 0.5j * self.dt)
+                N += N_C
+            theta = npc.tensordot(C, psi.get_B(i0 + 1, form='B'), axes=['vR', 'vL'])
+            psi.set_B(i0 + 1, theta, form='Th')
+            self._del_env(LP=[i0 + 2], RP=[i0 - 1, i0])
+        elif update_RP:
+            theta = theta.combine_legs(['p', 'vR'], qconj=-1)
+            U, S, VH = npc.svd(theta, qtotal_LR=[None, theta.qtotal], inner_labels=['vR', 'vL'])
+            psi.set_B(i0, VH.split_legs(['(p.vR)']), form='B')
+            psi.set_SL(i0, S)
+            self._del_env(RP=[i0 - 1])
+            self.update_RP(VH)
+            C = U.scale_axis(S, 'vR')
+            if optimize:
+                C, N_C = self.evolve(ZeroSiteH(self.env, i0 - 1), C, 0.5j * self.dt)
+                N += N_C
+            theta = npc.tensordot(psi.get_B(i0 - 1, form='A'), C, axes=['vR', 'vL'])
+            psi.set_B(i0 - 1, theta, form='Th')
+            self._del_env(LP=[i0, i0 + 1], RP=[i0 - 2])
+        else:  # last update of the sweep: keep theta
+            psi.set_B(i0, theta, form='Th')
+            self._del_env(LP=[i0 + 1], RP=[i0 - 1])
+        return {'N': N, 'err': TruncationError(), 'U': None, 'VH': None}
+
+
+class TwoSiteTDVPEngine(TDVPEngine):
+    """Two-site TDVP, see :class:`TDVPEngine`.
+
+    The forward evolution uses :class:`~tenpy.algorithms.mps_sweeps.TwoSiteH`,
+    the backwards evolution of a single site :class:`~tenpy.algorithms.mps_sweeps.OneSiteH`.
+    The bond dimension can grow; the two-site wave functions are truncated according
+    to the `trunc_params`.
+
+    Parameters
+    ----------
+    psi, model, engine_params :
+        See :class:`TDVPEngine`.
+    """
+
+    def __init__(self, psi, model, engine_params):
+        self.EffectiveH = TwoSiteH
+        super().__init__(psi, model, engine_params)
+
+    def prepare_update(self):
+        """Prepare the effective Hamiltonian and wave function on sites ``(i0, i0+1)``.
+
+        Returns
+        -------
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            The wave function on sites ``(i0, i0+1)``, labels ``'vL', 'p0', 'p1', 'vR'``,
+            combined with the pipes of :attr:`eff_H` if :attr:`combine`.
+        theta_ortho : list
+            Empty list, there is nothing to orthogonalize against.
+        """
+        combine = self.combine and not self.combine_auto
+        self.eff_H = eff_H = self.EffectiveH(self.env, self.i0, combine)
+        theta = self.psi.get_theta(self.i0, n=2)  # 'vL', 'p0', 'p1', 'vR'
+        if self.combine_auto:
+            self.choose_combine(eff_H, theta)
+        if self.combine:
+            theta = theta.combine_legs([['vL', 'p0'], ['p1', 'vR']],
+                                       pipes=[eff_H.pipeL, eff_H.pipeR])
+        else:
+            theta.itranspose(['vL', 'p0', 'p1', 'vR'])
+        return theta, []
+
+    def update_local(self, theta, theta_ortho, optimize=True):
+        """Evolve sites ``(i0, i0+1)`` forward, truncate and evolve one site backwards.
+
+        Parameters
+        ----------
+        theta : :class:`~tenpy.linalg.np_conserved.Array`
+            The wave function as returned by :meth:`prepare_update`.
+        theta_ortho : list
+            Ignored.
+        optimize : bool
+            Whether to actually evolve in time. If False, just move the orthogonality center.
+
+        Returns
+        -------
+        update_data : dict
+            ``'N'`` number of applications of the effective Hamiltonians,
+            ``'err'`` the truncation error, and ``'U', 'VH'`` as returned by the SVD.
+        """
+        i0 = self.i0
+        psi = self.psi
+        dt = self._get_dt()
+        N = 0
+        if optimize:
+            theta, N = self.evolve(self.eff_H, theta, -1.j * dt)
+        if not self.combine:
+            theta = theta.combine_legs([['vL', 'p0'], ['p1', 'vR']],
+                                       new_axes=[0, 1],
+                                       qconj=[+1, -1])
+        qtotal_i0 = psi.get_B(i0, form=None).qtotal
+        U, S, VH, err, _ = svd_theta(theta,
+                                     self.trunc_params,
+                                     qtotal_LR=[qtotal_i0, None],
+                                     inner_labels=['vR', 'vL'])
+        A0 = U.split_legs(['(vL.p0)']).replace_label('p0', 'p')
+        B1 = VH.split_legs(['(p1.vR)']).replace_label('p1', 'p')
+        psi.set_B(i0, A0, form='A')
+        psi.set_SR(i0, S)
+        psi.set_B(i0 + 1, B1, form='B')
+        update_LP, update_RP = self.update_LP_RP
+        if update_LP:
+            self._del_env(LP=[i0 + 1])
+            self.update_LP(U)
+            theta = B1.scale_axis(S, 'vL')
+            if optimize:
+                H = OneSiteH(self.env, i0 + 1, False, True)
+                theta, N_1 = self.evolve(H, theta, 0.5j * self.dt)
+                N += N_1
+            psi.set_B(i0 + 1, theta, form='Th')
+            self._del_env(LP=[i0 + 2], RP=[i0 - 1, i0])
+        elif update_RP:
+            self._del_env(RP=[i0])
+            self.update_RP(VH)
+            theta = A0.scale_axis(S, 'vR')
+            if optimize:
+                H = OneSiteH(self.env, i0, False, False)
+                theta, N_1 = self.evolve(H, theta, 0.5j * self.dt)
+                N += N_1
+            psi.set_B(i0, theta, form='Th')
+            self._del_env(LP=[i0 + 1, i0 + 2], RP=[i0 - 1])
+        else:  # last update of the sweep
+            self._del_env(LP=[i0 + 1, i0 + 2], RP=[i0 - 1, i0])
+        return {'N': N, 'err': err, 'U': U, 'VH': VH}
 
 
 class Engine:
@@ -34,6 +519,8 @@ class Engine:
 
     You can call :meth:`run_one_site` for single-site TDVP, or
     :meth:`run_two_sites` for two-site TDVP.
+    This class recalculates the environments with custom sweeps and only supports finite MPS;
+    consider using :class:`SingleSiteTDVPEngine` or :class:`TwoSiteTDVPEngine` instead.
 
     Parameters
     ----------
@@ -54,6 +541,11 @@ class Engine:
         -------------- --------- ---------------------------------------------------------------
         trunc_params   dict      Truncation parameters as described in
                                  :func:`~tenpy.algorithms.truncation.truncate`
+        -------------- --------- ---------------------------------------------------------------
+        lanczos_params dict      Lanczos parameters as described in
+                                 :class:`~tenpy.linalg.lanczos.LanczosEvolution`.
+                                 By default, we set ``'adaptive': True`` to choose the Krylov
+                                 dimension and substeps from an a posteriori error estimate.
         ============== ========= ===============================================================
     environment :  :class:'~tenpy.networks.mpo.MPOEnvironment` | None
         Initial environment. If ``None`` (default), it will be calculated at the beginning.
@@ -70,6 +562,10 @@ class Engine:
         Optional parameters, see :func:`run` and :func:`run_GS` for more details.
     environment : :class:`~tenpy.networks.mpo.MPOEnvironment`
         The environment, storing the `LP` and `RP` to avoid recalculations.
+    lanczos_params : dict
+        Parameters for the :class:`~tenpy.linalg.lanczos.LanczosEvolution`.
+    N_matvec : int
+        Total number of applications of the effective Hamiltonians so far.
     """
 
     def __init__(self, psi, model, TDVP_params, environment=None):
@@ -87,6 +583,9 @@ class Engine:
         self.dt = get_parameter(TDVP_params, 'dt', 2, 'TDVP')
         self.trunc_params = get_parameter(TDVP_params, 'trunc_params', {}, 'TDVP')
         self.N_steps = get_parameter(TDVP_params, 'N_steps', 10, 'TDVP')
+        self.lanczos_params = get_parameter(TDVP_params, 'lanczos_params', {}, 'TDVP')
+        self.lanczos_params.setdefault('adaptive', True)
+        self.N_matvec = 0
 
     # Actual calculation
     def run_one_site(self, N_steps=None):
@@ -312,10 +811,7 @@ class Engine:
         """
         H = H1_mixed(Lp, Rp, W)
         theta = theta.combine_legs(['vL', 'p', 'vR'])
-        #Initialize Lanczos
-        parameters_lanczos_h1 = {'delta': dt}
-        lanczos_h1 = LanczosEvolution(H=H, psi0=theta, params=parameters_lanczos_h1)
-        theta, N_h1 = lanczos_h1.run(dt)
+        theta = self._lanczos_evolve(H, theta, dt)
         theta = theta.split_legs(['(vL.p.vR)'])
         return theta
 
@@ -337,10 +833,7 @@ class Engine:
         """
         H = H2_mixed(Lp, Rp, W0, W1)
         theta = theta.combine_legs(['vL', 'p0', 'p1', 'vR'])
-        #Initialize Lanczos
-        parameters_lanczos_h1 = {'delta': dt}
-        lanczos_h1 = LanczosEvolution(H=H, psi0=theta, params=parameters_lanczos_h1)
-        theta, N_h1 = lanczos_h1.run(dt)
+        theta = self._lanczos_evolve(H, theta, dt)
         theta = theta.split_legs(['(vL.p0.p1.vR)'])
         return theta
 
@@ -418,15 +911,17 @@ class Engine:
         dt : complex number
             time step of the evolution
         """
-        #Initialize Lanczos
-        parameters_lanczos_h1 = {'delta': dt}
-        lanczos_h0 = LanczosEvolution(H=H,
-                                      psi0=s.combine_legs(['vL', 'vR']),
-                                      params=parameters_lanczos_h1)
-        s_new, N_h0 = lanczos_h0.run(dt)
+        s_new = self._lanczos_evolve(H, s.combine_legs(['vL', 'vR']), dt)
         s_new = s_new.split_legs(['(vL.vR)'])
         return s_new
 
+    def _lanczos_evolve(self, H, psi0, dt):
+        """Calculate ``expm(dt H).dot(psi0)`` with Lanczos and count the applications of `H`."""
+        lanczos = LanczosEvolution(H=H, psi0=psi0, params=self.lanczos_params)
+        psi, N = lanczos.run(dt)
+        self.N_matvec += lanczos.N_matvec
+        return psi
+
 
 class H0_mixed:
     """Class defining the zero site Hamiltonian for Lanczos
@@ -42,9 +42,10 @@ import numpy as np
 import time
 
 from ..linalg import np_conserved as npc
-from .truncation import svd_theta, TruncationError
+from .truncation import svd_theta, svd_theta_batch, TruncationError
 from ..tools.params import get_parameter, unused_parameters
 from ..linalg.random_matrix import CUE
+from ..tools.process import parallel_map_blocks
 
 __all__ = ['Engine', 'RandomUnitaryEvolution']
 
@@ -110,6 +111,8 @@ class Engine:
         self._U_param = {}
         self._trunc_err_bonds = [TruncationError() for i in range(psi.L + 1)]
         self._update_index = None
+        self.batch_truncation = get_parameter(TEBD_params, 'batch_truncation', False, 'TEBD')
+        self.parallel_bonds = get_parameter(TEBD_params, 'parallel_bonds', False, 'TEBD')
 
     def __del__(self):
         unused_parameters(self.TEBD_params['trunc_params'], "TEBD trunc_params")
@@ -125,22 +128,34 @@ class Engine:
 
         The following (optional) parameters are read out from the :attr:`TEBD_params`.
 
-        ============== ====== ======================================================
-        key            type   description
-        ============== ====== ======================================================
-        dt             float  Time step.
-        -------------- ------ ------------------------------------------------------
-        order          int    Order of the algorithm.
-                                The total error scales as O(t, dt^order).
-        -------------- ------ ------------------------------------------------------
-        N_steps        int    Number of time steps `dt` to evolve.
-                              (The Trotter decompositions of order > 1 are slightly
-                              more efficient if more than one step is performed at
-                              once.)
-        -------------- ------ ------------------------------------------------------
-        trunc_params   dict   Truncation parameters as described in
-                              :func:`~tenpy.algorithms.truncation.truncate`.
-        ============== ====== ======================================================
+        ================ ====== ======================================================
+        key              type   description
+        ================ ====== ======================================================
+        dt               float  Time step.
+        ---------------- ------ ------------------------------------------------------
+        order            int    Order of the algorithm.
+                                  The total error scales as O(t, dt^order).
+        ---------------- ------ ------------------------------------------------------
+        N_steps          int    Number of time steps `dt` to evolve.
+                                (The Trotter decompositions of order > 1 are slightly
+                                more efficient if more than one step is performed at
+                                once.)
+        ---------------- ------ ------------------------------------------------------
+        trunc_params     dict   Truncation parameters as described in
+                                :func:`~tenpy.algorithms.truncation.truncate`.
+        ---------------- ------ ------------------------------------------------------
+        batch_truncation bool   If True, do the SVDs for all bonds of a Trotter layer
+                                first and truncate them together with
+                                :func:`~tenpy.algorithms.truncation.svd_theta_batch`.
+                                Faster for large unit cells, but needs the memory
+                                for all two-site wave functions of a layer at once.
+                                Read out in the constructor.
+        ---------------- ------ ------------------------------------------------------
+        parallel_bonds   bool   If True, distribute the (independent) bond updates
+                                of a Trotter layer on the threads set by
+                                :func:`~tenpy.tools.process.set_block_nthreads`.
+                                Read out in the constructor.
+        ================ ====== ======================================================
         """
         # initialize parameters
         delta_t = get_parameter(self.TEBD_params, 'dt', 0.1, 'TEBD')
@@ -430,6 +445,8 @@ class Engine:
             The error of the represented state which is introduced due to the truncation
             during this sequence of update steps.
         """
+        if self.batch_truncation or self.parallel_bonds:
+            return self._update_step_layer(U_idx_dt, odd)
         Us = self._U[U_idx_dt]
         trunc_err = TruncationError()
         for i_bond in np.arange(int(odd) % 2, self.psi.L, 2):
@@ -444,6 +461,42 @@ class Engine:
         self._update_index = None
         return trunc_err
 
+    def _update_step_layer(self, U_idx_dt, odd):
+        """Version of :meth:`update_step` handling all bonds of the layer together.
+
+        The bonds updated in one layer act on disjoint sites, so we can first calculate the new
+        tensors for all bonds and only then write them into :attr:`psi`.
+        For :attr:`parallel_bonds`, the bonds are distributed with
+        :func:`~tenpy.tools.process.parallel_map_blocks`.
+        For :attr:`batch_truncation`, the Schmidt spectra of all bonds are truncated
+        together with :func:`~tenpy.algorithms.truncation.svd_theta_batch`.
+        """
+        Us = self._U[U_idx_dt]
+        bonds = [i for i in range(int(odd) % 2, self.psi.L, 2) if Us[i] is not None]
+        if self.verbose >= 10:
+            print("Apply U_bond elements", bonds)
+        args = [(i, Us[i]) for i in bonds]
+
+        def map_bonds(func):
+            if self.parallel_bonds:
+                return parallel_map_blocks(func, args, [self._bond_work(i) for i in bonds])
+            return [func(*a) for a in args]
+
+        if self.batch_truncation:
+            C_thetas = map_bonds(self._bond_theta)
+            svds = svd_theta_batch([theta for C, theta in C_thetas],
+                                   self.trunc_params,
+                                   inner_labels=['vR', 'vL'])
+        else:
+            C_thetas, svds = zip(*map_bonds(self._bond_svd)) if bonds else ([], [])
+        # merge the results in the main thread
+        trunc_err = TruncationError()
+        for i, (C, theta), (U, S, V, err, renormalize) in zip(bonds, C_thetas, svds):
+            self._set_bond(i, C, theta, S, V, renormalize)
+            self._trunc_err_bonds[i] = self._trunc_err_bonds[i] + err
+            trunc_err += err
+        return trunc_err
+
     def update_bond(self, i, U_bond):
         """Updates the B matrices on a given bond.
 
@@ -472,6 +525,18 @@ class Engine:
         i0, i1 = i - 1, i
         if self.verbose >= 100:
             print("Update sites ({0:d}, {1:d})".format(i0, i1))
+        C, theta = self._bond_theta(i, U_bond)
+        # Perform the SVD and truncate the wavefunction
+        U, S, V, trunc_err, renormalize = svd_theta(theta,
+                                                    self.trunc_params,
+                                                    inner_labels=['vR', 'vL'])
+        self._set_bond(i, C, theta, S, V, renormalize)
+        self._trunc_err_bonds[i] = self._trunc_err_bonds[i] + trunc_err
+        return trunc_err
+
+    def _bond_theta(self, i, U_bond):
+        """Apply `U_bond` to the sites ``i-1, i``; return `C` and the combined `theta`."""
+        i0 = i - 1
         # Construct the theta matrix
         C = self.psi.get_theta(i0, n=2, formL=0.)  # the two B without the S on the left
         C = npc.tensordot(U_bond, C, axes=(['p0*', 'p1*'], ['p0', 'p1']))  # apply U
@@ -484,11 +549,28 @@ class Engine:
         # so we don't have to apply inverses of S (see below)
 
         theta = theta.combine_legs([('vL', 'p0'), ('p1', 'vR')], qconj=[+1, -1])
-        # Perform the SVD and truncate the wavefunction
-        U, S, V, trunc_err, renormalize = svd_theta(theta,
-                                                    self.trunc_params,
-                                                    inner_labels=['vR', 'vL'])
+        return C, theta
 
+    def _bond_svd(self, i, U_bond):
+        """Like :meth:`update_bond`, but return instead of setting the new tensors.
+
+        Only reads from :attr:`psi`, such that it can be called in parallel for different bonds.
+        Returns ``(C, theta), (U, S, V, trunc_err, renormalize)``, see :meth:`_set_bond`.
+        """
+        C, theta = self._bond_theta(i, U_bond)
+        return (C, theta), svd_theta(theta, self.trunc_params, inner_labels=['vR', 'vL'])
+
+    def _bond_work(self, i):
+        """Estimate the cost of the SVD in :meth:`_bond_svd` for load balancing."""
+        B0 = self.psi.get_B(i - 1, form=None)
+        B1 = self.psi.get_B(i, form=None)
+        M = B0.get_leg('vL').ind_len * B0.get_leg('p').ind_len
+        N = B1.get_leg('p').ind_len * B1.get_leg('vR').ind_len
+        return M * N * min(M, N)
+
+    def _set_bond(self, i, C, theta, S, V, renormalize):
+        """Set the new tensors at sites ``i-1, i`` from the (truncated) SVD of `theta`."""
+        i0, i1 = i - 1, i
         # Split tensor and update matrices
         B_R = V.split_legs(1).ireplace_label('p1', 'p')
 
@@ -511,8 +593,6 @@ class Engine:
         self.psi.set_SR(i0, S)
         self.psi.set_B(i0, B_L, form='B')
         self.psi.set_B(i1, B_R, form='B')
-        self._trunc_err_bonds[i] = self._trunc_err_bonds[i] + trunc_err
-        return trunc_err
 
     def update_imag(self, N_steps):
         """Perform an update suitable for imaginary time evolution.
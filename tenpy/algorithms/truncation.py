@@ -56,8 +56,12 @@ import numpy as np
 from ..linalg import np_conserved as npc
 import warnings
 from ..tools.params import get_parameter
+from ..tools.process import parallel_map_blocks
 
-__all__ = ['TruncationError', 'truncate', 'svd_theta']
+__all__ = [
+    'TruncationError', 'truncate', 'truncate_batch', 'svd_theta', 'svd_theta_batch',
+    'randomized_svd', 'random_sketch'
+]
 
 
 class TruncationError:
@@ -168,17 +172,12 @@ def truncate(S, trunc_par):
         Useful for re-normalization.
     err : :class:`TruncationError`
         The error of the represented state which is introduced due to the truncation.
-    """
-    # by default, only truncate values which are much closer to zero than machine precision.
-    # This is only to avoid problems with taking the inverse of `S`.
-    chi_max = get_parameter(trunc_par, 'chi_max', 100, 'truncation')
-    chi_min = get_parameter(trunc_par, 'chi_min', None, 'truncation')
-    sym_tol = get_parameter(trunc_par, 'symmetry_tol', None, 'truncation')
-    svd_min = get_parameter(trunc_par, 'svd_min', 1.e-14, 'truncation')
-    trunc_cut = get_parameter(trunc_par, 'trunc_cut', 1.e-14, 'truncation')
 
-    if trunc_cut is not None and trunc_cut >= 1.:
-        raise ValueError("trunc_cut >=1.")
+    See also
+    --------
+    truncate_batch : the same for the Schmidt spectra of many bonds at once.
+    """
+    chi_max, chi_min, sym_tol, svd_min, trunc_cut = _get_trunc_params(trunc_par)
     if not np.any(S > 1.e-10):
         warnings.warn("no Schmidt value above 1.e-10", stacklevel=2)
     if np.any(S < -1.e-10):
@@ -227,6 +226,96 @@ def truncate(S, trunc_par):
     return mask, norm_new, TruncationError.from_norm(norm_new, np.linalg.norm(S)),
 
 
+def truncate_batch(S_list, trunc_par, discarded=None):
+    """Vectorized version of :func:`truncate` for the Schmidt spectra of many bonds.
+
+    The parameters are read out only once, and the constraints are evaluated for all
+    spectra at once on a 2D array, in which shorter spectra are padded with zeros.
+    This avoids the Python overhead of calling :func:`truncate` for each bond separately,
+    e.g. for the bonds of a Trotter layer in TEBD with a large unit cell.
+    The result is the same as ``[truncate(S, trunc_par) for S in S_list]``.
+
+    Parameters
+    ----------
+    S_list : list of 1D array
+        Schmidt values (as returned by an SVD) of the different bonds.
+    trunc_par : dict
+        Parameters giving constraints for the truncation, see :func:`truncate`.
+    discarded : None | 1D array
+        For each spectrum the weight ``sum S[i]**2`` which was already discarded before
+        (e.g. the weight missing in a partial SVD), which counts towards `trunc_cut`.
+
+    Returns
+    -------
+    masks : list of 1D bool array
+        For each spectrum the index mask, True for indices which should be kept.
+    norms_new : 1D array
+        For each spectrum the norm of the truncated Schmidt values.
+    errs : list of :class:`TruncationError`
+        For each spectrum the error introduced due to the truncation.
+    """
+    chi_max, chi_min, sym_tol, svd_min, trunc_cut = _get_trunc_params(trunc_par)
+    n_S = len(S_list)
+    if n_S == 0:
+        return [], np.zeros(0), []
+    lengths = np.array([len(S) for S in S_list], np.intp)
+    n_max = np.max(lengths)
+    # pad on the left, such that the padding is sorted to the left as well
+    pad = n_max - lengths
+    S = np.zeros((n_S, n_max))
+    for j, S_j in enumerate(S_list):
+        S[j, pad[j]:] = S_j
+    is_pad = np.arange(n_max)[np.newaxis, :] < pad[:, np.newaxis]
+    if np.any(~np.any(S > 1.e-10, axis=1)):
+        warnings.warn("no Schmidt value above 1.e-10", stacklevel=2)
+    if np.any(S < -1.e-10):
+        warnings.warn("negative Schmidt values!", stacklevel=2)
+
+    # as in `truncate`, use 1.e-100 as replacement for <=0 values, but -inf for the padding
+    logS = np.log(np.where(S <= 0., 1.e-100, S))
+    logS[is_pad] = -np.inf
+    piv = np.argsort(logS, axis=1)  # sort *ascending*.
+    rows = np.arange(n_S)[:, np.newaxis]
+    logS = logS[rows, piv]
+    # good[j, cut] = (is `cut` a good choice to keep piv[j, cut:]?); never keep the padding
+    cut_range = np.arange(n_max)[np.newaxis, :]
+    good = (cut_range >= pad[:, np.newaxis])
+    n_keep = n_max - cut_range
+
+    if chi_max is not None:
+        good = _combine_constraints_batch(good, n_keep <= chi_max, "chi_max")
+
+    if chi_min is not None and chi_min > 1:
+        good = _combine_constraints_batch(good, n_keep >= chi_min, "chi_min")
+
+    if sym_tol:
+        good2 = np.empty(good.shape, np.bool_)
+        good2[:, 0] = True
+        with np.errstate(invalid='ignore'):  # -inf - -inf in the padding
+            good2[:, 1:] = np.greater_equal(logS[:, 1:] - logS[:, :-1], np.log(sym_tol))
+        good = _combine_constraints_batch(good, good2, "symmetry_tol")
+
+    if svd_min is not None:
+        good = _combine_constraints_batch(good, np.greater_equal(logS, np.log(svd_min)),
+                                          "svd_min")
+
+    if trunc_cut is not None:
+        cut_sq = trunc_cut * trunc_cut
+        if discarded is not None:
+            cut_sq = np.maximum(cut_sq - np.asarray(discarded), 0.)[:, np.newaxis]
+        good2 = (np.cumsum(S[rows, piv]**2, axis=1) > cut_sq)
+        good = _combine_constraints_batch(good, good2, "trunc_cut")
+
+    cut = np.argmax(good, axis=1)  # smallest possible cut: keep as many S as allowed
+    mask = np.zeros(S.shape, dtype=np.bool_)
+    mask[rows, piv] = (cut_range >= cut[:, np.newaxis])
+    norms_new = np.linalg.norm(S * mask, axis=1)
+    norms_old = np.linalg.norm(S, axis=1)
+    masks = [mask[j, pad[j]:] for j in range(n_S)]
+    errs = [TruncationError.from_norm(n, o) for n, o in zip(norms_new, norms_old)]
+    return masks, norms_new, errs
+
+
 def svd_theta(theta, trunc_par, qtotal_LR=[None, None], inner_labels=['vR', 'vL']):
     """Performs SVD of a matrix `theta` (= the wavefunction) and truncates it.
 
@@ -241,7 +330,24 @@ def svd_theta(theta, trunc_par, qtotal_LR=[None, None], inner_labels=['vR', 'vL'
         The matrix, on which the singular value decomposition (SVD) is performed.
         Usually, `theta` represents the wavefunction, such that the SVD is a Schmidt decomposition.
     trunc_par : dict
-        truncation parameters as described in :func:`truncate`.
+        truncation parameters as described in :func:`truncate`, and the following
+        optional parameters selecting how the SVD is done.
+
+        ================ ====== ======================================================
+        key              type   description
+        ================ ====== ======================================================
+        svd_method       str    ``'full'`` (default) for a full SVD of each block,
+                                ``'randomized'`` for a truncated SVD with
+                                :func:`randomized_svd`, which is much faster if
+                                `chi_max` is far below the rank of `theta`.
+        ---------------- ------ ------------------------------------------------------
+        svd_oversampling int    Number of additional singular values computed in each
+                                charge sector for ``svd_method='randomized'``.
+        ---------------- ------ ------------------------------------------------------
+        svd_power_iter   int    Number of power iterations
+                                for ``svd_method='randomized'``.
+        ================ ====== ======================================================
+
     qtotalLR : (charges, charges)
         The total charges for the returned `U` and `VH`.
     inner_labels : (string, string)
@@ -264,36 +370,240 @@ def svd_theta(theta, trunc_par, qtotal_LR=[None, None], inner_labels=['vR', 'vL'
     renormalization : float
         Factor, by which S was renormalized.
     """
-    U, S, VH = npc.svd(theta,
+    U, S, VH, renormalization, missing = _svd_theta_decompose(theta, trunc_par, qtotal_LR,
+                                                              inner_labels)
+    trunc_cut = get_parameter(trunc_par, 'trunc_cut', 1.e-14, 'truncation')
+    if trunc_cut is not None and missing > 0.:
+        # the missing weight counts as already discarded
+        trunc_par = trunc_par.copy()
+        trunc_par['trunc_cut'] = np.sqrt(max(trunc_cut**2 - missing, 0.))
+    piv, new_norm, _ = truncate(S, trunc_par)
+    return _svd_theta_project(U, S, VH, renormalization, piv, new_norm, trunc_par['chi_max'])
+
+
+def svd_theta_batch(thetas, trunc_par, qtotal_LR=[None, None], inner_labels=['vR', 'vL']):
+    """Perform the SVDs of several matrices `thetas` and truncate them with a single call.
+
+    Equivalent to ``[svd_theta(theta, trunc_par, qtotal_LR, inner_labels) for theta in thetas]``,
+    but the truncation of all the Schmidt spectra is done in one vectorized pass with
+    :func:`truncate_batch`.
+    The SVDs are independent and distributed with
+    :func:`~tenpy.tools.process.parallel_map_blocks` (if enabled).
+
+    Parameters
+    ----------
+    thetas : list of :class:`~tenpy.linalg.np_conserved.Array`
+        The matrices to be decomposed, see :func:`svd_theta`.
+    trunc_par : dict
+        Truncation parameters as described in :func:`svd_theta`.
+    qtotalLR : (charges, charges)
+        The total charges for the returned `U` and `VH`.
+    inner_labels : (string, string)
+        Labels for the `U` and `VH` on the newly-created bond.
+
+    Returns
+    -------
+    results : list of tuple
+        For each `theta` the tuple ``(U, S, VH, err, renormalization)`` as returned by
+        :func:`svd_theta`.
+    """
+    work = [np.prod(theta.shape) * min(theta.shape) for theta in thetas]
+    decomposed = parallel_map_blocks(_svd_theta_decompose,
+                                     [(theta, trunc_par, qtotal_LR, inner_labels)
+                                      for theta in thetas],
+                                     work=work)
+    missing = np.array([d[4] for d in decomposed])
+    piv_list, new_norms, _ = truncate_batch([d[1] for d in decomposed],
+                                            trunc_par,
+                                            discarded=np.maximum(missing, 0.))
+    chi_max = trunc_par['chi_max']
+    return [
+        _svd_theta_project(U, S, VH, renormalization, piv, new_norm, chi_max)
+        for (U, S, VH, renormalization, _), piv, new_norm in zip(decomposed, piv_list, new_norms)
+    ]
+
+
+def randomized_svd(theta,
+                   chi_max,
+                   oversampling=10,
+                   n_power_iter=2,
+                   qtotal_LR=[None, None],
+                   inner_labels=['vR', 'vL']):
+    """Approximate the largest singular values of `theta` with a randomized range finder.
+
+    Following [Halko2011]_, we project `theta` onto a random subspace of dimension
+    ``k = chi_max + oversampling`` *in each charge sector*, such that each sector can contain
+    all of the (at most) `chi_max` singular values kept in the end by :func:`truncate`,
+    orthonormalize the result with :func:`~tenpy.linalg.np_conserved.qr`,
+    improve it with `n_power_iter` power iterations, and finally do a full SVD of
+    the small projected matrix.
+    For a ``(M, N)`` matrix, this reduces the cost from ``O(M N min(M, N))`` to ``O(M N k)``.
+
+    Parameters
+    ----------
+    theta : :class:`~tenpy.linalg.np_conserved.Array`, shape ``(M, N)``
+        The matrix to be decomposed.
+    chi_max : int | None
+        The maximum number of singular values needed.
+        If ``None``, or if the random subspace would not be smaller than `theta`,
+        we fall back to the full :func:`~tenpy.linalg.np_conserved.svd`.
+    oversampling : int
+        Number of additional dimensions of the random subspace in each charge sector.
+    n_power_iter : int
+        Number of power iterations, which improve the accuracy for slowly decaying
+        singular values.
+    qtotal_LR : (charges, charges)
+        The total charges for the returned `U` and `VH`.
+    inner_labels : (string, string)
+        Labels for the `U` and `VH` on the newly-created bond.
+
+    Returns
+    -------
+    U : :class:`~tenpy.linalg.np_conserved.Array`
+        Matrix with the approximate left singular vectors as columns, shape ``(M, K)``.
+    S : 1D ndarray
+        The approximate largest singular values, *not* normalized.
+    VH : :class:`~tenpy.linalg.np_conserved.Array`
+        Matrix with the approximate right singular vectors as rows, shape ``(K, N)``.
+    """
+    if chi_max is not None:
+        # random subspace with dimension `k` in each charge sector of theta.legs[1]
+        omega = random_sketch(theta.legs[1], chi_max + oversampling)
+    if chi_max is None or omega.shape[1] >= min(theta.shape):
+        return npc.svd(theta,
                        full_matrices=False,
                        compute_uv=True,
                        qtotal_LR=qtotal_LR,
                        inner_labels=inner_labels)
-    renormalization = np.linalg.norm(S)
+    chinfo = theta.chinfo
+    qtotal_L, qtotal_R = qtotal_LR
+    if qtotal_L is None and qtotal_R is None:
+        qtotal_R = theta.qtotal
+    if qtotal_L is None:
+        qtotal_L = chinfo.make_valid(theta.qtotal - qtotal_R)
+    elif qtotal_R is None:
+        qtotal_R = chinfo.make_valid(theta.qtotal - qtotal_L)
+    Y = npc.tensordot(theta, omega, axes=[1, 0])
+    Q, _ = npc.qr(Y)
+    for _ in range(n_power_iter):
+        Z = npc.tensordot(theta.conj(), Q, axes=[0, 0])
+        Q, _ = npc.qr(Z)
+        Y = npc.tensordot(theta, Q, axes=[1, 0])
+        Q, _ = npc.qr(Y)
+    B = npc.tensordot(Q.conj(), theta, axes=[0, 0])  # Q has qtotal 0
+    U_B, S, VH = npc.svd(B,
+                         full_matrices=False,
+                         compute_uv=True,
+                         qtotal_LR=[qtotal_L, qtotal_R],
+                         inner_labels=inner_labels)
+    U = npc.tensordot(Q, U_B, axes=[1, 0])
+    return U, S, VH
+
+
+def random_sketch(leg, k):
+    """Random matrix projecting onto a subspace with dimension `k` in each charge sector of `leg`.
+
+    Parameters
+    ----------
+    leg : :class:`~tenpy.linalg.charges.LegCharge`
+        The leg to be projected.
+    k : int
+        Dimension of the subspace in each charge sector; smaller for sectors with smaller
+        dimension in `leg`.
+
+    Returns
+    -------
+    omega : :class:`~tenpy.linalg.np_conserved.Array`
+        Random Gaussian matrix with legs ``leg.conj(), leg_k``, where the new leg `leg_k`
+        has the same charges as `leg`.
+    """
+    charges, inverse = np.unique(leg.charges, axis=0, return_inverse=True)
+    sizes = np.bincount(inverse.reshape(-1), weights=np.diff(leg.slices)).astype(np.intp)
+    sizes = np.minimum(sizes, k)
+    slices = np.append([0], np.cumsum(sizes))
+    leg_k = npc.LegCharge.from_qind(leg.chinfo, slices, charges, leg.qconj)
+    return npc.Array.from_func(np.random.standard_normal, [leg.conj(), leg_k], shape_kw='size')
+
+
+def _combine_constraints(good1, good2, warn):
+    """return logical_and(good1, good2) if there remains at least one `True` entry.
+    Otherwise print a warning and return just `good1`."""
+    res = np.logical_and(good1, good2)
+    if np.any(res):
+        return res
+    warnings.warn("truncation: can't satisfy constraint for " + warn, stacklevel=3)
+    return good1
+
+
+def _get_trunc_params(trunc_par):
+    """Read out the parameters for :func:`truncate` from `trunc_par`."""
+    # by default, only truncate values which are much closer to zero than machine precision.
+    # This is only to avoid problems with taking the inverse of `S`.
+    chi_max = get_parameter(trunc_par, 'chi_max', 100, 'truncation')
+    chi_min = get_parameter(trunc_par, 'chi_min', None, 'truncation')
+    sym_tol = get_parameter(trunc_par, 'symmetry_tol', None, 'truncation')
+    svd_min = get_parameter(trunc_par, 'svd_min', 1.e-14, 'truncation')
+    trunc_cut = get_parameter(trunc_par, 'trunc_cut', 1.e-14, 'truncation')
+    if trunc_cut is not None and trunc_cut >= 1.:
+        raise ValueError("trunc_cut >=1.")
+    return chi_max, chi_min, sym_tol, svd_min, trunc_cut
+
+
+def _combine_constraints_batch(good1, good2, warn):
+    """Row-wise version of :func:`_combine_constraints` for 2D arrays `good1` and `good2`."""
+    res = np.logical_and(good1, good2)
+    ok = np.any(res, axis=1)
+    if np.all(ok):
+        return res
+    warnings.warn("truncation: can't satisfy constraint for " + warn, stacklevel=3)
+    return np.where(ok[:, np.newaxis], res, good1)
+
+
+def _svd_theta_decompose(theta, trunc_par, qtotal_LR, inner_labels):
+    """SVD part of :func:`svd_theta`, without truncation.
+
+    Returns ``U, S, VH, renormalization, missing``, where `S` is normalized by
+    ``renormalization = npc.norm(theta)`` and `missing` is the weight not captured by `S`.
+    """
+    svd_method = get_parameter(trunc_par, 'svd_method', 'full', 'truncation')
+    chi_max = get_parameter(trunc_par, 'chi_max', 100, 'truncation')
+    if svd_method == 'full':
+        # we need only the `chi_max` largest singular values, and one more to check `symmetry_tol`
+        keep_max = None if chi_max is None else chi_max + 1
+        U, S, VH = npc.svd(theta,
+                           full_matrices=False,
+                           compute_uv=True,
+                           qtotal_LR=qtotal_LR,
+                           inner_labels=inner_labels,
+                           keep_max=keep_max)
+    elif svd_method == 'randomized':
+        oversampling = get_parameter(trunc_par, 'svd_oversampling', 10, 'truncation')
+        n_power_iter = get_parameter(trunc_par, 'svd_power_iter', 2, 'truncation')
+        U, S, VH = randomized_svd(theta, chi_max, oversampling, n_power_iter, qtotal_LR,
+                                  inner_labels)
+    else:
+        raise ValueError("unknown svd_method " + repr(svd_method))
+    # S might miss some weight of `theta`, which we include into the truncation error
+    renormalization = npc.norm(theta)
     S = S / renormalization
-    piv, new_norm, err = truncate(S, trunc_par)
+    missing = 1. - np.sum(S**2)
+    return U, S, VH, renormalization, missing
+
+
+def _svd_theta_project(U, S, VH, renormalization, piv, new_norm, chi_max):
+    """Truncation part of :func:`svd_theta`: project onto the kept singular values `piv`."""
+    err = TruncationError.from_norm(new_norm, 1.)
     new_len_S = np.sum(piv, dtype=np.int_)
-    if new_len_S * 100 < len(S) and (trunc_par['chi_max'] is None
-                                     or new_len_S != trunc_par['chi_max']):
+    if new_len_S * 100 < len(S) and (chi_max is None or new_len_S != chi_max):
         msg = "Catastrophic reduction in chi: {0:d} -> {1:d}".format(len(S), new_len_S)
         # NANs are excluded in npc.svd
         UHU = npc.tensordot(U.conj(), U, axes=[[0], [0]])
         msg += " |U^d U - 1| = {0:f}".format(npc.norm(UHU - npc.eye_like(UHU)))
         VHV = npc.tensordot(VH, VH.conj(), axes=[[1], [1]])
         msg += " |V V - 1| = {0:f}".format(npc.norm(VHV - npc.eye_like(VHV)))
-        warnings.warn(msg, stacklevel=2)
+        warnings.warn(msg, stacklevel=3)
     S = S[piv] / new_norm
     renormalization *= new_norm
     U.iproject(piv, axes=1)  # U = U[:, piv]
     VH.iproject(piv, axes=0)  # VH = VH[piv, :]
     return U, S, VH, err, renormalization
-
-
-def _combine_constraints(good1, good2, warn):
-    """return logical_and(good1, good2) if there remains at least one `True` entry.
-    Otherwise print a warning and return just `good1`."""
-    res = np.logical_and(good1, good2)
-    if np.any(res):
-        return res
-    warnings.warn("truncation: can't satisfy constraint for " + warn, stacklevel=3)
-    return good1
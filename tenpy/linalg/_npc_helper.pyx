@@ -22,6 +22,7 @@ cimport cython
 from libcpp.vector cimport vector
 from libc.string cimport memcpy
 from cython.operator cimport dereference as deref, postincrement as inc
+from cython.parallel cimport prange
 
 import bisect
 import warnings
@@ -38,6 +39,7 @@ from scipy.linalg.cython_blas cimport (dgemm, zgemm, dgemv, zgemv,
 
 from ..tools.misc import inverse_permutation, to_iterable
 from ..tools.optimization import optimize, OptimizationFlag
+from ..tools.process import get_block_nthreads, split_block_threads
 
 np.import_array()
 
@@ -118,14 +120,17 @@ cdef void _batch_accumulate_gemm(vector[intp_t] batch_slices,
                             vector[void*] a_data_ptr,
                             vector[void*] b_data_ptr,
                             vector[void*] c_data_ptr,
-                            int dtype_num
+                            int dtype_num,
+                            int num_threads
                             ) nogil:
-    cdef size_t b, batch_count = batch_m_n.size()
+    # The batches write to different `c_data_ptr[b]`, so we can distribute them on threads.
+    # (`prange` falls back to a serial loop if not compiled with OpenMP, see setup.py)
+    cdef intp_t b, batch_count = batch_m_n.size()
     cdef intp_t x, batch_beg, batch_end,
     cdef intp_t i, j, m, n, k
     cdef idx_tuple i_j, m_n
 
-    for b in range(batch_count): # TODO parallelize !?
+    for b in prange(batch_count, num_threads=num_threads, schedule='dynamic'):
         m_n = batch_m_n[b]
         m = m_n.first
         n = m_n.second
@@ -1572,6 +1577,11 @@ def _tensordot_worker(a, b, int axes):
         t0 = time.time()
 
     # Step 3.2) the actual matrix-matrix multiplications
+    cdef int num_threads = get_block_nthreads()
+    if num_threads > 1:
+        work = [block_dim_a_contr[inds_contr[batch_slices[b]].first] *
+                batch_m_n[b].first * batch_m_n[b].second for b in range(res_n_blocks)]
+        num_threads = split_block_threads(work, num_threads)[0]
     with nogil:
         _batch_accumulate_gemm(batch_slices,
                                batch_m_n,
@@ -1580,7 +1590,8 @@ def _tensordot_worker(a, b, int axes):
                                a_data_ptr,
                                b_data_ptr,
                                c_data_ptr,
-                               calc_dtype_num)
+                               calc_dtype_num,
+                               num_threads)
 
     if DEBUG_PRINT:
         t1 = time.time()
@@ -7,7 +7,10 @@ import numpy as np
 from scipy.linalg import expm
 import warnings
 
-__all__ = ['LanczosGroundState', 'LanczosEvolution', 'lanczos', 'gram_schmidt', 'plot_stats']
+__all__ = [
+    'LanczosGroundState', 'LanczosEvolution', 'Davidson', 'lanczos', 'davidson', 'gram_schmidt',
+    'plot_stats'
+]
 
 
 class LanczosGroundState:
@@ -64,6 +67,11 @@ class LanczosGroundState:
                        This is necessary if the rank of A is smaller than N_max -
                        then we get a complete basis of the Krylov space,
                        and `beta` will be zero.
+        ------- ------ ---------------------------------------------------------------
+        pack    bool   Whether to store the blocks of the Krylov vectors in a single
+                       contiguous buffer with :meth:`~tenpy.linalg.np_conserved.Array.
+                       ipack_data`, such that the vector arithmetic (norm, inner,
+                       axpy, scaling) acts on the whole buffer at once.
         ======= ====== ===============================================================
 
     orthogonal_to : list of :class:`~tenpy.linalg.np_conserved.Array`
@@ -80,7 +88,7 @@ class LanczosGroundState:
         The starting vector.
     orthogonal_to : list of :class:`~tenpy.linalg.np_conserved.Array`
         Vectors to orthogonalize against.
-    N_min, N_max, E_tol, P_tol, N_cache, reortho:
+    N_min, N_max, E_tol, P_tol, N_cache, reortho, pack:
         Parameters as described above.
     Es : ndarray, shape(N_max, N_max)
         ``Es[n, :]`` contains the energies of ``_T[:n+1, :n+1]`` in step `n`.
@@ -91,8 +99,13 @@ class LanczosGroundState:
     _cache : list of psi0-like vectors
         The ONB of the Krylov space generated during the iteration.
         FIFO (first in first out) cache of at most N_cache vectors.
+    _packed_qdata : None | 2D array
+        For `pack`, the (lexsorted) qindices of the blocks in the common layout of the vectors.
     _result_krylov : ndarray
         Result in the ONB of the Krylov space: ground state of `_T`.
+    N_matvec : int
+        Number of applications of `H` performed so far (including a possible second iteration
+        in :meth:`_calc_result_full`).
 
     Notes
     -----
@@ -113,6 +126,7 @@ class LanczosGroundState:
         self.N_cache = get_parameter(params, 'N_cache', self.N_max, "Lanczos")
         self.min_gap = get_parameter(params, 'min_gap', 1.e-12, "Lanczos")
         self.reortho = get_parameter(params, 'reortho', False, "Lanczos")
+        self.pack = get_parameter(params, 'pack', True, "Lanczos")
         if self.N_cache < 2:
             raise ValueError("Need to cache at least two vectors.")
         if self.N_min < 2:
@@ -124,6 +138,13 @@ class LanczosGroundState:
         else:
             self.orthogonal_to = []
         self._cache = []
+        self._packed_qdata = None
+        self.N_matvec = 0
+        if self.pack:
+            self.orthogonal_to = [o.copy() for o in self.orthogonal_to]
+            for o in self.orthogonal_to:
+                self._pack(o)
+            self._pack(self.psi0)
         self.Es = np.zeros([self.N_max, self.N_max], dtype=np.float)
         # First Lanczos iteration: Form tridiagonal form of A in the Krylov subspace, stored in T
         self._T = np.zeros([self.N_max + 1, self.N_max + 1], dtype=np.float)
@@ -237,10 +258,35 @@ class LanczosGroundState:
             for o in self.orthogonal_to:  # Project out
                 w.iadd_prefactor_other(-npc.inner(o, w, do_conj=True), o)
         w = self.H.matvec(w)
+        self.N_matvec += 1
+        if self.pack:
+            self._pack(w)
         for o in self.orthogonal_to[::-1]:  # reverse: more obviously Hermitian.
             w.iadd_prefactor_other(-npc.inner(o, w, do_conj=True), o)
         return w
 
+    def _pack(self, w):
+        """Pack `w` into the common layout of all the vectors, see :meth:`Array.ipack_data`.
+
+        The layout contains the union of the blocks of all vectors packed so far;
+        if `w` has additional blocks, all previous vectors are repacked with the extended layout.
+        """
+        w.isort_qdata()
+        qdata = self._packed_qdata
+        if qdata is None:
+            self._packed_qdata = w._qdata
+            w.ipack_data()
+            return
+        # F-style strides to preserve sorting!
+        stride = npc.charges._make_stride([l.block_number for l in w.legs], False)
+        all_qdata = np.concatenate([qdata, w._qdata], axis=0)
+        _, unique = np.unique(np.sum(all_qdata * stride, axis=1), return_index=True)
+        if len(unique) > len(qdata):  # `w` has new blocks: extend the layout
+            qdata = self._packed_qdata = all_qdata[unique]
+            for v in self.orthogonal_to + [self.psi0] + self._cache:
+                v.ipack_data(qdata)
+        w.ipack_data(qdata)
+
     def _calc_result_krylov(self, k):
         """calculate ground state of _T[:k+1, :k+1]"""
         T = self._T
@@ -271,26 +317,51 @@ class LanczosEvolution(LanczosGroundState):
     ground state, we now calculate ``exp(delta T) e_0 in the Krylov ONB, where
     ``e_0 = (1, 0, 0, ...)`` corresponds to ``psi0`` in the original basis.
 
+    With the parameter `adaptive`, the Krylov dimension is chosen by the a posteriori error
+    estimate ``|delta| beta_k |[exp(delta T) e_0]_k|`` of [Saad1992]_, which is much smaller than
+    the last component ``|[exp(delta T) e_0]_k|`` alone for small time steps.
+    If the error estimate is still too large with `N_max` vectors, the time step is split into
+    substeps which are chosen from the already generated `T` without further applications of `H`,
+    and the iteration is restarted from the intermediate result.
+
     Parameters
     ----------
     H, psi0, params :
         Hamiltonian, starting vector and parameters as defined in :class:`LanczosGroundState`.
         The parameters `E_tol` and `min_gap` are ignored,
         the parameters `P_tol` defines when convergence is reached, see :meth:`_converged` for
-        details.
+        details. Additional parameters:
+
+        ======== ====== ===============================================================
+        key      type   description
+        ======== ====== ===============================================================
+        adaptive bool   If True, use the a posteriori error estimate to stop once the
+                        error of the whole time step `delta` is below `P_tol`, and
+                        split `delta` into substeps if `N_max` is not sufficient.
+                        If False, stop once ``|[exp(delta T) e_0]_k| < P_tol``.
+        ======== ====== ===============================================================
 
     Attributes
     ----------
     delta : float/complex
-        Prefactor of H in the exponential.
+        Prefactor of H in the exponential (of the current substep for `adaptive`).
+    adaptive : bool
+        Parameter as described above.
+    n_substeps : int
+        Number of substeps performed in the last call of :meth:`run`.
     _result_norm : float
         Norm of the resulting vector.
+    _tau : float
+        Fraction of the full time step performed in the current substep for `adaptive`.
     """
 
     def __init__(self, H, psi0, params):
         super().__init__(H, psi0, params)
+        self.adaptive = get_parameter(params, 'adaptive', False, "Lanczos")
         self.delta = None
+        self.n_substeps = 0
         self._result_norm = 1.
+        self._tau = 1.
 
     def run(self, delta):
         """Calculate ``expm(delta H).dot(psi0)`` using Lanczos.
@@ -306,9 +377,12 @@ class LanczosEvolution(LanczosGroundState):
         psi_f : :class:`~tenpy.linalg.np_conserved.Array`
             Best approximation for ``expm(delta H).dot(psi0)``
         N : int
-            Krylov space dimension used.
+            Krylov space dimension used; for `adaptive` the sum over all substeps.
         """
+        if self.adaptive:
+            return self._run_adaptive(delta)
         self.delta = delta
+        self.n_substeps = 1
         N = self._calc_T()
         if self.verbose >= 1:
             if N > 1:
@@ -326,6 +400,50 @@ class LanczosEvolution(LanczosGroundState):
         # else:
         return result_full, N
 
+    def _run_adaptive(self, delta):
+        """Implementation of :meth:`run` for `adaptive`."""
+        t = 0.  # fraction of `delta` evolved so far
+        N_total = 0
+        norm = 1.
+        self.n_substeps = 0
+        while t < 1. - 1.e-12:
+            if self.n_substeps > 0:
+                self._restart(psi)
+            self._tau = 1. - t
+            self.delta = self._tau * delta
+            N = self._calc_T()
+            N_total += N
+            k = N - 1
+            if abs(self._T[k, k + 1]) >= self._cutoff:
+                # choose a smaller substep if N_max was not sufficient;
+                # this needs only the tridiagonal `T`, but no further applications of `H`.
+                while not self._converged(k) and self._tau > 2.**-30:
+                    self._tau *= 0.5
+                    self.delta = self._tau * delta
+                    self._calc_result_krylov(k)
+            if self.verbose >= 1:
+                msg = "Lanczos N={0:d}, substep {1:d} with tau={2:.3e}, error estimate={3:.3e}"
+                print(msg.format(N, self.n_substeps, self._tau, self._error_estimate(k)))
+            if N == 1:
+                psi = self._result_krylov[0] * self.psi0
+            else:
+                psi = self._calc_result_full(N)
+            norm *= self._result_norm
+            t += self._tau
+            self.n_substeps += 1
+        if delta.real != 0.:
+            return psi * norm, N_total
+        # else:
+        return psi, N_total
+
+    def _restart(self, psi):
+        """Restart the Lanczos iteration with `psi` as new starting vector."""
+        self.psi0 = psi
+        if self.pack:
+            self._pack(psi)
+        self._cache = []
+        self._T[:, :] = 0.
+
     def _calc_result_krylov(self, k):
         """calculate expm(delta T) e0 for T= _T[:k+1, :k+1]"""
         T = self._T
@@ -342,15 +460,309 @@ class LanczosEvolution(LanczosGroundState):
             self._result_norm = np.linalg.norm(exp_dT_e0)
             self._result_krylov = exp_dT_e0 / self._result_norm
 
+    def _error_estimate(self, k):
+        """A posteriori estimate of the (relative) error of the result in step `k`.
+
+        This is the leading term ``|delta| beta_k |[exp(delta T) e_0]_k|`` of the error
+        expansion in [Saad1992]_, where ``beta_k = _T[k, k+1]`` is the norm of the next
+        Krylov vector.
+        """
+        return abs(self.delta) * abs(self._T[k, k + 1]) * np.abs(self._result_krylov[k])
+
     def _converged(self, k):
+        if self.adaptive:
+            # allow an error proportional to the length of the substep
+            return self._error_estimate(k) < self.P_tol * self._tau
         return np.abs(self._result_krylov[k]) < self.P_tol
 
 
+class Davidson:
+    r"""(Block-)Davidson algorithm to find the ground state of a hermitian operator.
+
+    Like the Lanczos algorithm, we build a subspace ``V`` and diagonalize the projection
+    ``M = V^\dagger H V``. However, instead of extending ``V`` by ``H`` applied to the last
+    vector, we extend it with the (preconditioned) Ritz residuals ``r = (H - E) x``
+    of the current lowest `block_size` Ritz pairs ``E, x`` and explicitly orthogonalize against
+    all vectors in ``V``. This has several advantages:
+
+    - If `H` provides the diagonal ``D`` of its matrix representation (with a method ``diag``,
+      see below), the residuals are preconditioned as ``(E - D)^{-1} r``,
+      which usually needs significantly fewer applications of `H`.
+    - With ``block_size > 1``, several vectors are added at once. If `H` provides a method
+      ``matvec_batch``, it can apply `H` to all of them together, which uses
+      matrix-matrix instead of matrix-vector-like operations.
+    - Since the Ritz vector is updated explicitly, a limited memory `N_cache` doesn't require
+      a second iteration as in :meth:`LanczosGroundState._calc_result_full`:
+      instead, the subspace is restarted with the current Ritz vectors once it is full.
+
+    Internally, the vectors of the subspace are stored as rows of a dense matrix in the
+    block layout of all blocks compatible with the charges of `psi0`,
+    such that the orthogonalization and the Ritz vectors are matrix products.
+
+    Parameters
+    ----------
+    H : :class:`~tenpy.linalg.sparse.LinearOperator`-like
+        A hermitian linear operator. Must implement the method `matvec` acting on a
+        :class:`~tenpy.linalg.np_conserved.Array`; the result has to have the same legs
+        as the argument.
+        Optionally, it can implement ``matvec_batch(list_of_vecs)`` returning the list of
+        ``matvec`` results, and ``diag(qtotal)`` returning the diagonal of `H` as
+        :class:`~tenpy.linalg.np_conserved.Array` with the same legs (and labels) as the vectors
+        in the charge sector given by `qtotal`.
+    psi0 : :class:`~tenpy.linalg.np_conserved.Array`
+        The starting vector, the best guess available for the ground state.
+    params : dict
+        Further optional parameters as described in the following table.
+        The same parameters as for :class:`LanczosGroundState` are read out,
+        such that the `lanczos_params` can be used for both.
+        The algorithm stops if *both* criteria for `e_tol` and `p_tol` are met
+        or if the maximum number of applications of `H` was reached.
+
+        ============ ====== ============================================================
+        key          type   description
+        ============ ====== ============================================================
+        N_min        int    Minimum number of applications of `H`.
+        ------------ ------ ------------------------------------------------------------
+        N_max        int    Maximum number of applications of `H`.
+        ------------ ------ ------------------------------------------------------------
+        E_tol        float  Stop if energy difference per step < `E_tol`
+        ------------ ------ ------------------------------------------------------------
+        P_tol        float  Tolerance for the error estimate from the Ritz residual,
+                            stop if ``(RitzRes/gap)**2 < P_tol``
+        ------------ ------ ------------------------------------------------------------
+        min_gap      float  Lower cutoff for the gap estimate used in the P_tol criterion.
+        ------------ ------ ------------------------------------------------------------
+        N_cache      int    The maximum dimension of the subspace,
+                            which is restarted with `block_size` Ritz vectors if full.
+        ------------ ------ ------------------------------------------------------------
+        cutoff       float  New vectors with norm smaller than `cutoff` (after the
+                            orthogonalization) are discarded.
+        ------------ ------ ------------------------------------------------------------
+        block_size   int    Number of Ritz pairs for which we add the correction vectors
+                            to the subspace in each iteration.
+        ------------ ------ ------------------------------------------------------------
+        precondition bool   Whether to use the diagonal of `H` (if available) as
+                            preconditioner.
+        ============ ====== ============================================================
+
+    orthogonal_to : list of :class:`~tenpy.linalg.np_conserved.Array`
+        Vectors (same tensor structure as psi) against which we orthogonalize,
+        ensuring that the result is perpendicular to them.
+
+    Attributes
+    ----------
+    H : :class:`~tenpy.linalg.sparse.LinearOperator`-like
+        The hermitian linear operator.
+    psi0 : :class:`~tenpy.linalg.np_conserved.Array`
+        The starting vector.
+    N_min, N_max, E_tol, P_tol, min_gap, N_cache, block_size, precondition :
+        Parameters as described above.
+    Es : list of 1D ndarray
+        The eigenvalues of the projected matrix ``M`` in each iteration.
+    _cutoff : float
+        See parameter `cutoff`.
+    _template : :class:`~tenpy.linalg.np_conserved.Array`
+        Packed zero vector containing all blocks compatible with the charges of `psi0`.
+        Defines the layout of the flat vectors.
+    _V, _HV : 2D ndarray
+        The first `_n` rows contain the flat ONB ``V`` of the subspace and `H` applied to it.
+    _M : 2D ndarray
+        The projection ``M[i, j] = <V_i|H|V_j>`` of `H` into the subspace.
+    _n : int
+        The current dimension of the subspace.
+    _O : 2D ndarray
+        The flat `orthogonal_to` vectors (after orthonormalization) as rows.
+    _H_diag : 1D ndarray | None
+        The flat diagonal of `H` used as preconditioner.
+    _N : int
+        The number of applications of `H` so far.
+    """
+
+    def __init__(self, H, psi0, params, orthogonal_to=[]):
+        self.H = H
+        self.psi0 = psi0
+        self._params = params
+        self.N_min = get_parameter(params, 'N_min', 2, "Davidson")
+        self.N_max = get_parameter(params, 'N_max', 20, "Davidson")
+        self.E_tol = get_parameter(params, 'E_tol', np.inf, "Davidson")
+        self.P_tol = get_parameter(params, 'P_tol', 1.e-14, "Davidson")
+        self.N_cache = get_parameter(params, 'N_cache', self.N_max, "Davidson")
+        self.min_gap = get_parameter(params, 'min_gap', 1.e-12, "Davidson")
+        self.block_size = get_parameter(params, 'block_size', 1, "Davidson")
+        self.precondition = get_parameter(params, 'precondition', True, "Davidson")
+        self._cutoff = get_parameter(params, 'cutoff', np.finfo(psi0.dtype).eps * 100, "Davidson")
+        self.verbose = params.get('verbose', 0)
+        if self.N_cache < 2 * self.block_size:
+            raise ValueError("Need to cache at least two vectors per block.")
+        self.Es = []
+        self._template = npc.Array.from_func(np.zeros,
+                                             psi0.legs,
+                                             qtotal=psi0.qtotal,
+                                             func_kwargs={'dtype': psi0.dtype})
+        self._template.iset_leg_labels(psi0.get_leg_labels())
+        self._template.ipack_data()
+        dtype = psi0.dtype
+        if len(orthogonal_to) > 0:
+            orthogonal_to, _ = gram_schmidt([o.copy() for o in orthogonal_to], self.verbose / 10)
+            dtype = np.find_common_type([dtype] + [o.dtype for o in orthogonal_to], [])
+            self._O = np.array([self._to_flat(o) for o in orthogonal_to], dtype)
+        else:
+            self._O = None
+        size = self._template._get_buffer().shape[0]
+        self._V = np.zeros([self.N_cache, size], dtype)
+        self._HV = np.zeros([self.N_cache, size], dtype)
+        self._M = np.zeros([self.N_cache, self.N_cache], dtype)
+        self._n = 0
+        self._N = 0
+        self._H_diag = None
+        if self.precondition and hasattr(H, 'diag'):
+            self._H_diag = self._to_flat(H.diag(psi0.qtotal))
+
+    def run(self):
+        """Find the ground state of H.
+
+        Returns
+        -------
+        E0 : float
+            Ground state energy (estimate).
+        psi0 : :class:`~tenpy.linalg.np_conserved.Array`
+            Ground state vector (estimate).
+        N : int
+            The number of applications of `H`.
+        """
+        self._expand(self._to_flat(self.psi0)[np.newaxis, :])
+        E0_old = np.inf
+        while True:
+            E, X, HX = self._ritz_pairs()
+            E0 = E[0]
+            R = HX - E[:len(X), np.newaxis] * X  # Ritz residuals
+            res_norm = np.linalg.norm(R[0])
+            gap = max(E[1] - E0, self.min_gap) if len(E) > 1 else np.inf
+            P_err = (res_norm / gap)**2
+            if self._N >= self.N_max or res_norm < self._cutoff:
+                break
+            if self._N >= self.N_min and P_err < self.P_tol and E0_old - E0 < self.E_tol:
+                break
+            W = self._precondition(R[:self.N_max - self._N], E)
+            if self._n + len(W) > self.N_cache:
+                self._restart(E, X, HX)
+            if self._expand(W) == 0:
+                break  # found an invariant subspace
+            E0_old = E0
+        if self.verbose >= 1:
+            msg = "Davidson N={0:d}, gap={1:.3e}, DeltaE0={2:.3e}, P_err={3:.3e}"
+            print(msg.format(self._N, gap, E0_old - E0, P_err))
+        return E0, self._from_flat(X[0] / np.linalg.norm(X[0])), self._N
+
+    def _to_flat(self, a):
+        """Return the entries of `a` as 1D array in the layout of :attr:`_template`."""
+        a = a.copy(deep=False)
+        if None not in self._template.get_leg_labels():
+            a.itranspose(self._template.get_leg_labels())
+        a.ipack_data(self._template._qdata)
+        return a._get_buffer()
+
+    def _from_flat(self, w):
+        """Inverse of :meth:`_to_flat`."""
+        a = self._template.astype(w.dtype)
+        a.ipack_data()
+        a._get_buffer()[:] = w
+        return a
+
+    def _expand(self, W):
+        """Orthonormalize the rows of `W` against the subspace and extend the subspace with them.
+
+        Returns the number of new vectors.
+        """
+        n = self._n
+        V = self._V[:n]
+        W = np.array(W, dtype=self._V.dtype)
+        for _ in range(2):  # twice is enough
+            if self._O is not None:
+                W -= np.dot(np.dot(W, self._O.T.conj()), self._O)
+            W -= np.dot(np.dot(W, V.T.conj()), V)
+        new = []
+        for w in W:
+            for v in new:  # orthogonalize the new vectors among themselves
+                w -= np.vdot(v, w) * v
+            norm = np.linalg.norm(w)
+            if norm > self._cutoff:
+                new.append(w / norm)
+        k = len(new)
+        if k == 0:
+            return 0
+        W = np.array(new)
+        HW = self._apply_H(W)
+        self._V[n:n + k] = W
+        self._HV[n:n + k] = HW
+        M = self._M
+        M[:n + k, n:n + k] = np.dot(self._V[:n + k].conj(), HW.T)
+        M[n:n + k, :n] = M[:n, n:n + k].T.conj()
+        self._n = n + k
+        return k
+
+    def _apply_H(self, W):
+        """Apply H to each of the rows of `W`, but orthogonalize agains the orthogonal_to."""
+        ws = [self._from_flat(w) for w in W]
+        matvec_batch = getattr(self.H, 'matvec_batch', None)
+        if len(ws) > 1 and matvec_batch is not None:
+            ws = matvec_batch(ws)
+        else:
+            ws = [self.H.matvec(w) for w in ws]
+        self._N += len(ws)
+        HW = np.array([self._to_flat(w) for w in ws])
+        if HW.dtype != self._V.dtype:
+            dtype = np.promote_types(HW.dtype, self._V.dtype)
+            self._V = self._V.astype(dtype)
+            self._HV = self._HV.astype(dtype)
+            self._M = self._M.astype(dtype)
+            HW = HW.astype(dtype)
+        if self._O is not None:  # equivalent to using H' = P H P with P = (1-sum_o |o><o|)
+            HW -= np.dot(np.dot(HW, self._O.T.conj()), self._O)
+        return HW
+
+    def _ritz_pairs(self):
+        """Diagonalize `_M` to find the lowest `block_size` Ritz pairs.
+
+        Returns the eigenvalues `E` of `_M`, and the lowest Ritz vectors `X` and `H` applied to
+        them as rows of 2D arrays.
+        """
+        n = self._n
+        E, Y = np.linalg.eigh(self._M[:n, :n])
+        self.Es.append(E)
+        Y = Y[:, :self.block_size].T
+        X = np.dot(Y, self._V[:n])
+        HX = np.dot(Y, self._HV[:n])
+        return E, X, HX
+
+    def _precondition(self, R, E):
+        """Preconditioned corrections ``(E - D)^{-1} r`` for the residuals `R`."""
+        if self._H_diag is None:
+            return R
+        denom = E[:len(R), np.newaxis] - self._H_diag[np.newaxis, :]
+        small = np.abs(denom) < self._cutoff
+        denom[small] = self._cutoff
+        return R / denom
+
+    def _restart(self, E, X, HX):
+        """Restart the subspace with the Ritz vectors `X`."""
+        k = len(X)
+        self._V[:k] = X
+        self._HV[:k] = HX
+        self._M[:k, :k] = np.diag(E[:k])
+        self._n = k
+
+
 def lanczos(H, psi, lanczos_params={}, orthogonal_to=[]):
     """Simple wrapper calling ``LanczosGroundState(H, psi, params, orthogonal_to).run()``"""
     return LanczosGroundState(H, psi, lanczos_params, orthogonal_to).run()
 
 
+def davidson(H, psi, params={}, orthogonal_to=[]):
+    """Simple wrapper calling ``Davidson(H, psi, params, orthogonal_to).run()``"""
+    return Davidson(H, psi, params, orthogonal_to).run()
+
+
 def gram_schmidt(vecs, rcond=1.e-14, verbose=0):
     """In place Gram-Schmidt Orthogonalization and normalization for npc Arrays.
 
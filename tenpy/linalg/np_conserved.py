@@ -57,6 +57,7 @@ Overview
     outer
     inner
     trace
+    TensordotPlanCache
 
 .. rubric:: Linear algebra
 
@@ -73,6 +74,7 @@ Overview
     eigh
     eig
     eigvalsh
+    eigvalsh_batch
     eigvals
     speigs
 
@@ -84,6 +86,8 @@ import scipy.linalg
 from scipy.linalg import blas as BLAS  # python interface to BLAS
 import warnings
 import itertools
+import heapq
+from collections import OrderedDict
 from numbers import Integral
 
 # import public API from charges
@@ -96,12 +100,14 @@ from ..tools.math import speigs as _sp_speigs
 from ..tools.math import qr_li, rq_li
 from ..tools.string import vert_join, is_non_string_iterable
 from ..tools.optimization import optimize, OptimizationFlag, use_cython
+from ..tools.process import parallel_map_blocks, get_block_nthreads
 
 __all__ = [
     'QCUTOFF', 'ChargeInfo', 'LegCharge', 'LegPipe', 'Array', 'zeros', 'eye_like', 'diag',
     'concatenate', 'grid_concat', 'grid_outer', 'detect_grid_outer_legcharge', 'detect_qtotal',
-    'detect_legcharge', 'trace', 'outer', 'inner', 'tensordot', 'svd', 'pinv', 'norm', 'eigh',
-    'eig', 'eigvalsh', 'eigvals', 'speigs', 'qr', 'expm', 'to_iterable_arrays'
+    'detect_legcharge', 'trace', 'outer', 'inner', 'tensordot', 'tensordot_cost', 'svd', 'pinv',
+    'norm', 'eigh', 'eig', 'eigvalsh', 'eigvalsh_batch', 'eigvals', 'speigs', 'qr', 'expm',
+    'to_iterable_arrays', 'TensordotPlanCache', 'tensordot_plan_cache'
 ]
 
 #: A cutoff to ignore machine precision rounding errors when determining charges
@@ -110,6 +116,10 @@ QCUTOFF = np.finfo(np.float64).eps * 10
 # the type used for charges
 QTYPE = charges.QTYPE
 
+#: Maximum number of entries in the stacks of blocks multiplied at once by :func:`tensordot`
+#: with ``batched=True``, limiting the memory overhead of the stacks.
+TENSORDOT_BATCH_MAX_SIZE = 2**22
+
 # ##################################
 # Array class
 # ##################################
@@ -164,6 +174,11 @@ class Array:
     _qdata_sorted : Bool
         Whether self._qdata is lexsorted. Defaults to `True`,
         but *must* be set to `False` by algorithms changing _qdata.
+    _buffer : None | tuple
+        ``None``, or ``(buffer, offsets, blocks)`` if the blocks were packed into a single 1D
+        `buffer` by :meth:`ipack_data`, with ``blocks[i]`` a view of
+        ``buffer[offsets[i]:offsets[i+1]]``. Only valid as long as ``_data`` contains exactly
+        the `blocks`, see :meth:`_get_buffer`.
 
     """
 
@@ -180,6 +195,7 @@ class Array:
         self._data = []
         self._qdata = np.empty((0, self.rank), dtype=np.intp, order='C')
         self._qdata_sorted = True
+        self._buffer = None
         self.test_sanity()
 
     def copy(self, deep=True):
@@ -214,7 +230,11 @@ class Array:
         cp._set_shape()
         cp._labels = cp._labels[:]  # list copy
         if deep:
-            cp._data = [b.copy() for b in self._data]
+            if self._get_buffer() is not None:
+                cp._data = self._data  # replaced by ipack_data() below
+                cp.ipack_data()  # a single copy of the whole buffer
+            else:
+                cp._data = [b.copy() for b in self._data]
             cp._qdata = self._qdata.copy('C')
             cp.qtotal = self.qtotal.copy()
             # even deep copies share legs & chinfo (!)
@@ -224,6 +244,10 @@ class Array:
 
     def __getstate__(self):
         """Allow to pickle and copy."""
+        if self._buffer is not None:
+            state = self.__dict__.copy()
+            state['_buffer'] = None  # the views in `_data` don't survive pickling
+            return state
         return self.__dict__
 
     def __setstate__(self, state):
@@ -232,10 +256,13 @@ class Array:
         if isinstance(state, dict):  # allow to import from the non-compiled version
             self.__dict__.update(state)
             self._set_shape()
+            if '_buffer' not in state:  # pickled with an older version
+                self._buffer = None
         elif isinstance(state, tuple):  # allow to import from the compiled versions of TenPy 0.3.0
             self._data, self._qdata, self._qdata_sorted, self.chinfo, self.dtype, labels, \
                 self.legs, self.qtotal, self.rank, self.shape = state
             self.labels = labels  # property, requires rank to be set already
+            self._buffer = None
         else:
             raise ValueError("setstate with incompatible type of state")
 
@@ -1911,6 +1938,10 @@ class Array:
             new_type = np.find_common_type([np.float_, self.dtype], [])  # int -> float
             if new_type != self.dtype:
                 return self.astype(new_type).norm(ord, False)
+        if ord is None or ord == 2:
+            buffer = self._get_buffer()
+            if buffer is not None:
+                return np.linalg.norm(buffer)
         block_norms = [np.linalg.norm(t.reshape(-1), ord) for t in self._data]
         # ``.reshape(-1) gives a 1D view and is thus faster than ``.flatten()``
         # add a [0] in the list to ensure correct results for ``ord=-inf``
@@ -2008,10 +2039,28 @@ class Array:
         """
         return tensordot(self, other, axes=1)
 
-    @use_cython(replacement="Array_iadd_prefactor_other")
     def iadd_prefactor_other(self, prefactor, other):
         """``self += prefactor * other`` for scalar `prefactor` and :class:`Array` `other`.
 
+        Note that we allow the type of `self` to change if necessary.
+        If both `self` and `other` are packed (see :meth:`ipack_data`) with the same block
+        structure, this is a single BLAS ``axpy`` call on the buffers.
+        """
+        if np.isscalar(prefactor) and isinstance(other, Array):
+            buffers = self._get_common_buffers(other)
+            if buffers is not None and (self.dtype.kind == 'c' or np.isrealobj(prefactor)):
+                buffer, other_buffer = buffers
+                axpy = BLAS.get_blas_funcs('axpy', dtype=buffer.dtype)
+                res = axpy(other_buffer, buffer, a=prefactor)
+                if res is not buffer:
+                    buffer[:] = res
+                return self
+        return self._iadd_prefactor_other(prefactor, other)
+
+    @use_cython(replacement="Array_iadd_prefactor_other")
+    def _iadd_prefactor_other(self, prefactor, other):
+        """``self += prefactor * other`` for scalar `prefactor` and :class:`Array` `other`.
+
         Note that we allow the type of `self` to change if necessary.
         """
         if not isinstance(other, Array) or not np.isscalar(prefactor):
@@ -2020,10 +2069,24 @@ class Array:
         self.ibinary_blockwise(np.add, other.__mul__(prefactor))
         return self
 
-    @use_cython(replacement="Array_iscale_prefactor")
     def iscale_prefactor(self, prefactor):
         """``self *= prefactor`` for scalar `prefactor`.
 
+        Note that we allow the type of `self` to change if necessary.
+        If `self` is packed (see :meth:`ipack_data`), this is a single operation on the buffer.
+        """
+        if np.isscalar(prefactor) and prefactor != 0. and \
+                (self.dtype.kind == 'c' or np.isrealobj(prefactor)):
+            buffer = self._get_buffer()
+            if buffer is not None:
+                buffer *= prefactor
+                return self
+        return self._iscale_prefactor(prefactor)
+
+    @use_cython(replacement="Array_iscale_prefactor")
+    def _iscale_prefactor(self, prefactor):
+        """``self *= prefactor`` for scalar `prefactor`.
+
         Note that we allow the type of `self` to change if necessary.
         """
         if not np.isscalar(prefactor):
@@ -2580,6 +2643,100 @@ class Array:
         # remove '**' entries
         return label.replace('**', '')
 
+    def ipack_data(self, qdata=None):
+        """Store all blocks as views into a single contiguous 1D buffer. In place.
+
+        With this storage layout, :meth:`iadd_prefactor_other`, :meth:`iscale_prefactor`,
+        :meth:`norm` and :func:`inner` act directly on the whole buffer
+        (if both arrays are packed with the same block structure),
+        replacing a loop over the blocks with a single (BLAS) call. :meth:`copy` preserves the
+        layout. This is useful for the vector arithmetic e.g. in
+        :class:`~tenpy.linalg.lanczos.LanczosGroundState`.
+
+        Any other operation replacing the blocks in ``_data`` silently falls back to the usual
+        list of separate blocks. In place operations on the entries of the blocks are fine.
+
+        Parameters
+        ----------
+        qdata : None | 2D array
+            If given, the lexsorted qindices of the blocks to be stored, which need to be a
+            superset of the (existing) ``self._qdata``. Blocks not in ``self._qdata``
+            are explicitly stored as zeros. This allows to give several arrays the same layout.
+        """
+        if qdata is None:
+            data = [np.asarray(t, dtype=self.dtype) for t in self._data]
+            qdata = self._qdata
+            shapes = [t.shape for t in data]
+            buffer_init = np.empty
+        else:
+            self.isort_qdata()
+            qdata = np.asarray(qdata, dtype=np.intp)
+            # F-style strides to preserve sorting!
+            stride = charges._make_stride([l.block_number for l in self.legs], False)
+            old_q = np.sum(self._qdata * stride, axis=1)
+            new_q = np.sum(qdata * stride, axis=1)
+            pos = np.searchsorted(new_q, old_q)
+            if np.any(pos >= len(new_q)) or np.any(new_q[np.minimum(pos, len(new_q) - 1)] !=
+                                                   old_q):
+                raise ValueError("`qdata` is not a superset of the existing blocks")
+            data = [None] * len(qdata)
+            for i, t in zip(pos, self._data):
+                data[i] = t
+            shapes = [self._get_block_shape(qi) for qi in qdata]
+            buffer_init = np.zeros
+        sizes = [int(np.prod(shape)) for shape in shapes]
+        offsets = np.zeros(len(sizes) + 1, np.intp)
+        np.cumsum(sizes, out=offsets[1:])
+        buffer = buffer_init(offsets[-1], self.dtype)
+        blocks = []
+        for t, shape, i0, i1 in zip(data, shapes, offsets[:-1], offsets[1:]):
+            block = buffer[i0:i1].reshape(shape)
+            if t is not None:
+                block[...] = t
+            blocks.append(block)
+        self._data = blocks
+        self._qdata = np.array(qdata, dtype=np.intp)  # copy
+        self._buffer = (buffer, offsets, tuple(blocks))
+        return self
+
+    def _get_buffer(self):
+        """Return the 1D buffer set by :meth:`ipack_data`, or ``None`` if not packed (anymore).
+
+        The buffer is only valid if ``_data`` still contains exactly the blocks created by
+        :meth:`ipack_data`, otherwise we reset ``_buffer = None``.
+        """
+        if self._buffer is None:
+            return None
+        buffer, _, blocks = self._buffer
+        data = self._data
+        if len(data) != len(blocks) or buffer.dtype != self.dtype or \
+                any([t is not b for t, b in zip(data, blocks)]):
+            self._buffer = None
+            return None
+        return buffer
+
+    def _get_common_buffers(self, other):
+        """Return ``(buffer, other_buffer)`` if both arrays are packed with the same layout.
+
+        Requires that `self` and `other` have the same `dtype`, compatible legs, same `qtotal`
+        and the same blocks in the same order; returns ``None`` otherwise.
+        """
+        buffer = self._get_buffer()
+        if buffer is None:
+            return None
+        other_buffer = other._get_buffer()
+        if other_buffer is None or other.dtype != self.dtype or self.dtype.char not in 'fdFD' or \
+                not np.array_equal(self._buffer[1], other._buffer[1]) or \
+                not np.array_equal(self._qdata, other._qdata) or \
+                np.any(self.qtotal != other.qtotal):
+            return None
+        if not optimize(OptimizationFlag.skip_arg_checks):
+            if self.rank != other.rank:
+                raise ValueError("different rank!")
+            for self_leg, other_leg in zip(self.legs, other.legs):
+                self_leg.test_equal(other_leg)
+        return buffer, other_buffer
+
     @use_cython(replacement="Array__imake_contiguous")
     def _imake_contiguous(self):
         """Make each of the blocks c-style contigous in memory.
@@ -3126,7 +3283,9 @@ def inner(a, b, axes=None, do_conj=False):
         Contract leg ``axes_a[i]`` of `a` with leg ``axes_b[i]`` of `b`.
     do_conj : bool
         If ``False`` (Default), ignore it.
-        if ``True``, conjugate `a` before, i.e., return ``inner(a.conj(), b, axes)``
+        if ``True``, conjugate `a` before, i.e., return ``inner(a.conj(), b, axes)``.
+        If `a` and `b` are packed with the same layout (see :meth:`Array.ipack_data`),
+        this is a single BLAS call on the buffers.
 
     Returns
     -------
@@ -3150,6 +3309,12 @@ def inner(a, b, axes=None, do_conj=False):
     if transp:
         a = a.copy(deep=False)
         a.itranspose(axes_a)
+    elif do_conj:
+        buffers = a._get_common_buffers(b)  # includes the check of the legs
+        if buffers is not None:
+            buffer_a, buffer_b = buffers
+            blas_dot = BLAS.get_blas_funcs('dotc', dtype=buffer_a.dtype)
+            return buffer_a.dtype.type(blas_dot(buffer_a, buffer_b))
     # check charge compatibility
     if not optimize(OptimizationFlag.skip_arg_checks):
         if a.chinfo != b.chinfo:
@@ -3162,7 +3327,109 @@ def inner(a, b, axes=None, do_conj=False):
     return _inner_worker(a, b, do_conj)
 
 
-def tensordot(a, b, axes=2):
+class TensordotPlanCache:
+    """LRU cache of contraction plans for :func:`tensordot`.
+
+    In DMRG and TEBD, the same contraction is done over and over again with arrays which have
+    exactly the same charge structure (e.g. in each Lanczos iteration of
+    :meth:`~tenpy.algorithms.mps_sweeps.TwoSiteH.matvec`), such that the sorting and charge
+    matching done in :func:`_tensordot_pre_worker` and :func:`_tensordot_worker` is repeated
+    without need. A plan contains the result of this preparation, i.e. which blocks need to be
+    multiplied and summed into which block of the result. Given the plan, the contraction reduces
+    to the BLAS calls for the matrix products of the blocks.
+
+    The plans are keyed on the charge data of the legs, the total charges and the stored block
+    layout ``_qdata`` (after bringing the arrays into standard form for the contraction),
+    so they can be reused whenever these coincide.
+    The cache is disabled for ``max_size=0`` (default for the global :data:`tensordot_plan_cache`),
+    which you can enable with :meth:`enable`.
+
+    Parameters
+    ----------
+    max_size : int
+        Maximum number of plans to be kept. If more are needed, the least recently used are
+        dropped.
+
+    Attributes
+    ----------
+    max_size : int
+        Maximum number of plans to be kept; ``0`` disables the cache.
+    hits : int
+        The number of contractions for which a plan could be reused.
+    misses : int
+        The number of contractions for which a new plan was created.
+    _plans : OrderedDict
+        The cached plans, in order of the last access.
+    """
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self._plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def enable(self, max_size=100):
+        """Enable the cache, keeping at most `max_size` plans."""
+        self.max_size = max_size
+        while len(self._plans) > max_size:
+            self._plans.popitem(last=False)
+
+    def disable(self):
+        """Disable the cache and drop all cached plans."""
+        self.max_size = 0
+        self.clear()
+
+    def clear(self):
+        """Drop all cached plans and reset the statistics."""
+        self._plans.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Return a dictionary with the statistics of the cache usage."""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total > 0 else 0.,
+            'size': len(self._plans),
+            'max_size': self.max_size
+        }
+
+    def __len__(self):
+        return len(self._plans)
+
+    def tensordot(self, a, b, axes):
+        """Equivalent to ``_tensordot_worker(a, b, axes)``, but using a cached plan."""
+        key = self._get_key(a, b, axes)
+        plan = self._plans.get(key, None)
+        if plan is None:
+            self.misses += 1
+            plan = _tensordot_plan(a, b, axes)
+            if self.max_size > 0:
+                self._plans[key] = plan
+                if len(self._plans) > self.max_size:
+                    self._plans.popitem(last=False)  # drop least recently used
+        else:
+            self.hits += 1
+            self._plans.move_to_end(key)
+        return _tensordot_execute_plan(plan, a, b)
+
+    @staticmethod
+    def _get_key(a, b, axes):
+        """Hashable key identifying the charge structure of a contraction in standard form."""
+        legs_key = tuple([(leg.qconj, leg.slices.tobytes(), leg.charges.tobytes())
+                          for leg in a.legs + b.legs])
+        return (axes, a.rank, legs_key, a.qtotal.tobytes(), b.qtotal.tobytes(),
+                a._qdata.tobytes(), b._qdata.tobytes())
+
+
+#: The global :class:`TensordotPlanCache` used by :func:`tensordot`. Disabled by default;
+#: use ``npc.tensordot_plan_cache.enable()`` to activate it.
+tensordot_plan_cache = TensordotPlanCache(max_size=0)
+
+
+def tensordot(a, b, axes=2, batched=False, plan_cache=None):
     """Similar as ``np.tensordot`` but for :class:`Array`.
 
     Builds the tensor product of `a` and `b` and sums over the specified axes.
@@ -3183,6 +3450,18 @@ def tensordot(a, b, axes=2):
         Alternatively, `axes_a` and `axes_b` specifiy the legs of `a` and `b`, respectively,
         which should be contracted. Legs can be specified with leg labels or indices.
         Contract leg ``axes_a[i]`` of `a` with leg ``axes_b[i]`` of `b`.
+    batched : bool
+        If ``True``, use :func:`_tensordot_batched_worker` instead of :func:`_tensordot_worker`:
+        first plan all necessary block products, then group them by shape and evaluate each
+        group with a single stacked :func:`numpy.matmul`.
+        This can be faster if the legs are split into many small charge sectors.
+        If ``False`` and the global :data:`tensordot_plan_cache` is enabled,
+        the contraction is done with a (cached) plan, see :class:`TensordotPlanCache`.
+    plan_cache : :class:`TensordotPlanCache` | None
+        If given, use this cache for the contraction plans instead of the global
+        :data:`tensordot_plan_cache`, even if the latter is disabled.
+        Useful for a fixed set of contractions repeated many times, e.g. in the `matvec` of
+        the :class:`~tenpy.networks.mps.TransferMatrix`.
 
     Returns
     -------
@@ -3216,6 +3495,12 @@ def tensordot(a, b, axes=2):
             # else: zero
     elif axes == 0:
         return outer(a, b)  # no sum necessary
+    elif batched:
+        res = _tensordot_batched_worker(a, b, axes)
+    elif plan_cache is not None:
+        res = plan_cache.tensordot(a, b, axes)
+    elif tensordot_plan_cache.max_size > 0:
+        res = tensordot_plan_cache.tensordot(a, b, axes)
     else:
         # #### the main work
         res = _tensordot_worker(a, b, axes)
@@ -3224,13 +3509,60 @@ def tensordot(a, b, axes=2):
     return res
 
 
+def tensordot_cost(a, b, axes=2):
+    """Estimate the cost of ``tensordot(a, b, axes)`` from the block structure of `a` and `b`.
+
+    Only the charge data and the stored blocks of `a` and `b` are used, not the entries.
+    This allows to compare different orders of contracting a network of several tensors
+    before doing any actual work.
+
+    Parameters
+    ----------
+    a, b : :class:`Array`
+        The npc Arrays to be contracted.
+    axes : ``(axes_a, axes_b)`` | int
+        The axes to be contracted, as for :func:`tensordot`. At least one leg of `a` and `b`
+        needs to be not contracted.
+
+    Returns
+    -------
+    flops : int
+        The number of multiply-add operations needed for the block-wise matrix products.
+    res : :class:`Array`
+        An array with the legs, labels and stored blocks of the result of
+        ``tensordot(a, b, axes)``, but all entries zero. The blocks are read-only views of a
+        single zero, such that `res` can be used for further calls of :func:`tensordot_cost`
+        without allocating the memory of the result.
+        ``res.size`` gives the number of entries the actual result of the contraction would store.
+    """
+    a, b, axes = _tensordot_transpose_axes(a, b, axes)
+    if axes == a.rank or axes == b.rank:
+        raise ValueError("full contraction")
+    a_sort, a_matrix_shapes, b_sort, b_matrix_shapes, res_legs, qtotal, res_qdata, res_shapes, \
+        res_ks = _tensordot_plan(a, b, axes)
+    flops = 0
+    for ks in res_ks:
+        for k1, k2 in ks:
+            m, k = a_matrix_shapes[k1]
+            flops += m * k * b_matrix_shapes[k2][1]
+    res_dtype = _find_calc_dtype(a.dtype, b.dtype)[1]
+    res = Array(res_legs, res_dtype, qtotal)
+    zero = np.zeros((), res_dtype)
+    res._data = [np.broadcast_to(zero, shape) for shape in res_shapes]
+    res._qdata = res_qdata.copy()
+    res._qdata_sorted = True
+    res._labels = _drop_duplicate_labels(a._labels[:-axes], b._labels[axes:])
+    return flops, res
+
+
 def svd(a,
         full_matrices=False,
         compute_uv=True,
         cutoff=None,
         qtotal_LR=[None, None],
         inner_labels=[None, None],
-        inner_qconj=+1):
+        inner_qconj=+1,
+        keep_max=None):
     """Singualar value decomposition of an Array `a`.
 
     Factorizes ``U, S, VH = svd(a)``, such that ``a = U*diag(S)*VH`` (where ``*`` stands for
@@ -3267,6 +3599,11 @@ def svd(a,
     inner_qconj : {+1, -1}
         Direction of the charges for the new leg. Default +1.
         The new LegCharge is constructed such that ``VH.legs[0].qconj = qconj``.
+    keep_max : ``None`` | int
+        If not ``None``, keep only the `keep_max` largest singular values of all blocks
+        (and those degenerate with the smallest of them).
+        Blocks which can not contribute are skipped, see :func:`_svd_blocks_keep_max`.
+        (Then the factorization holds only approximately).
 
     Returns
     -------
@@ -3274,7 +3611,8 @@ def svd(a,
         Matrix with left singular vectors as columns.
         Shape ``(M, M)`` or ``(M, K)`` depending on `full_matrices`.
     S : 1D ndarray
-        The singluar values of the array. If no `cutoff` is given, it has lenght ``min(M, N)``.
+        The singluar values of the array.
+        If neither `cutoff` nor `keep_max` is given, it has lenght ``min(M, N)``.
     VH : :class:`Array`
         Matrix with right singular vectors as rows.
         Shape ``(N, N)`` or ``(K, N)`` depending on `full_matrices`.
@@ -3282,7 +3620,7 @@ def svd(a,
     # check arguments
     if a.rank != 2:
         raise ValueError("SVD is only defined for a 2D matrix. Use LegPipes!")
-    if full_matrices and ((not compute_uv) or cutoff is not None):
+    if full_matrices and ((not compute_uv) or cutoff is not None or keep_max is not None):
         raise ValueError("What do you want? Check your goals!")
     labL, labR = inner_labels
     a_labels = a._labels
@@ -3304,7 +3642,7 @@ def svd(a,
     # the main work
     overwrite_a = (len(piped_axes) > 0)
     U, S, VH = _svd_worker(a, full_matrices, compute_uv, overwrite_a, cutoff, qtotal_LR,
-                           inner_qconj)
+                           inner_qconj, keep_max)
     if not compute_uv:
         return S
 
@@ -3513,6 +3851,53 @@ def eigvals(a, sort=None):
     return _eigvals_worker(False, a, sort)
 
 
+def eigvalsh_batch(arrays, UPLO='L'):
+    r"""Calculate the eigenvalues of many hermitian matrices at once.
+
+    Equivalent to ``[eigvalsh(a, UPLO) for a in arrays]``, but the charge blocks of equal size
+    are collected from all the `arrays` and diagonalized with a single call of
+    :func:`numpy.linalg.eigvalsh` on the stacked blocks.
+    This avoids the Python overhead per matrix, which dominates for many small matrices like
+    the two-site reduced density matrices of an MPS.
+
+    Parameters
+    ----------
+    arrays : list of :class:`Array`
+        The hermitian square matrices to be diagonalized.
+    UPLO : {'L', 'U'}
+        Whether to take the lower ('L', default) or upper ('U') triangular part of the matrices.
+
+    Returns
+    -------
+    W_list : list of 1D ndarray
+        ``W_list[k]`` are the eigenvalues of ``arrays[k]``,
+        sorted ascending within the blocks of the completely blocked legs.
+    """
+    W_list = []
+    by_size = {}  # block size -> list of (k, slice in W_list[k], block)
+    for k, a in enumerate(arrays):
+        if a.rank != 2 or a.shape[0] != a.shape[1]:
+            raise ValueError("expect a square matrix!")
+        a.legs[0].test_contractible(a.legs[1])
+        if np.any(a.qtotal != a.chinfo.make_valid()):
+            raise ValueError("Non-trivial qtotal -> Nilpotent. Not diagonizable!?")
+        piped_axes, a = a.as_completely_blocked()  # ensure complete blocking
+        W_list.append(np.zeros(a.shape[0], dtype=np.float))
+        for qindices, block in zip(a._qdata, a._data):
+            sl = a.legs[0].get_slice(qindices[0])
+            by_size.setdefault(block.shape[0], []).append((k, sl, block))
+    groups = list(by_size.values())
+    stacks = [(np.array([block for _, _, block in group]), UPLO) for group in groups]
+    work = None
+    if get_block_nthreads() > 1:
+        work = [stack.shape[0] * stack.shape[1]**3 for stack, _ in stacks]
+    eig_stacks = parallel_map_blocks(np.linalg.eigvalsh, stacks, work)
+    for group, w_stack in zip(groups, eig_stacks):
+        for (k, sl, _), w in zip(group, w_stack):
+            W_list[k][sl] = w
+    return W_list
+
+
 def speigs(a, charge_sector, k, *args, **kwargs):
     """Sparse eigenvalue decomposition ``w, v`` of square `a` in a given charge sector.
 
@@ -4243,20 +4628,30 @@ def _tensordot_worker(a, b, axes):
 
     # (rows_a changes faster than cols_b, such that the resulting array is qdata lex-sorted)
     # determine output qdata
-    res_data = []
-    res_qdata_a = []
-    res_qdata_b = []
+    res_rows_cols = []
     for col_b, charge_match in enumerate(b_charges_match):
         rows_a = a_lookup_charges.get(tuple(charge_match), [])  # empty list if no match
         for row_a in rows_a:
-            block_contr = fast_dot_sum(a_data[row_a], b_data[col_b], a_qdata_contr[row_a],
-                                       b_qdata_contr[col_b])
-            if block_contr is not None:  # no common blocks
-                # Step 4) reshape back to tensors
-                block_contr = block_contr.reshape(a_shape_keep[row_a] + b_shape_keep[col_b])
-                res_data.append(block_contr.astype(res_dtype, copy=False))
-                res_qdata_a.append(a_qdata_keep[row_a])
-                res_qdata_b.append(b_qdata_keep[col_b])
+            res_rows_cols.append((row_a, col_b))
+    # the blocks of the result are independent: can be calculated in parallel
+    work = None
+    if get_block_nthreads() > 1:
+        work = [a_data[row_a][0].size * int(np.prod(b_shape_keep[col_b]))
+                for row_a, col_b in res_rows_cols]
+    blocks_contr = parallel_map_blocks(fast_dot_sum,
+                                       [(a_data[row_a], b_data[col_b], a_qdata_contr[row_a],
+                                         b_qdata_contr[col_b]) for row_a, col_b in res_rows_cols],
+                                       work)
+    res_data = []
+    res_qdata_a = []
+    res_qdata_b = []
+    for (row_a, col_b), block_contr in zip(res_rows_cols, blocks_contr):
+        if block_contr is not None:  # no common blocks
+            # Step 4) reshape back to tensors
+            block_contr = block_contr.reshape(a_shape_keep[row_a] + b_shape_keep[col_b])
+            res_data.append(block_contr.astype(res_dtype, copy=False))
+            res_qdata_a.append(a_qdata_keep[row_a])
+            res_qdata_b.append(b_qdata_keep[col_b])
     res = Array(a.legs[:cut_a] + b.legs[cut_b:], res_dtype, qtotal)
     if len(res_data) == 0:
         return res
@@ -4267,7 +4662,245 @@ def _tensordot_worker(a, b, axes):
     return res
 
 
-def _svd_worker(a, full_matrices, compute_uv, overwrite_a, cutoff, qtotal_LR, inner_qconj):
+def _tensordot_plan(a, b, axes):
+    """Prepare the contraction of `a` and `b` for :class:`TensordotPlanCache`.
+
+    Assumes standard form of parameters as for :func:`_tensordot_worker`.
+    The plan depends only on the charge data and ``_qdata`` of `a` and `b`, not on the entries.
+
+    Returns
+    -------
+    plan : tuple
+        Contains ``a_sort, a_matrix_shapes, b_sort, b_matrix_shapes, res_legs, res_qtotal,
+        res_qdata, res_shapes, res_ks``, where `a_sort` and `b_sort` are the order in which
+        (reshaped to matrices of `a_matrix_shapes` or `b_matrix_shapes`, respectively)
+        blocks are used, and ``res_ks[i]`` is the list of ``(k1, k2)`` indices into the sorted
+        blocks which need to be multiplied and summed up to give the block `i` of the result
+        with qindices ``res_qdata[i]`` and shape ``res_shapes[i]``.
+    """
+    chinfo = a.chinfo
+    cut_a = a.rank - axes
+    cut_b = axes
+    qtotal = chinfo.make_valid(a.qtotal + b.qtotal)
+    res_legs = a.legs[:cut_a] + b.legs[cut_b:]
+    if a.stored_blocks == 0 or b.stored_blocks == 0:  # special case: `a` or `b` is 0
+        empty = np.empty((0, ), np.intp)
+        return (empty, [], empty, [], res_legs, qtotal, np.empty((0, len(res_legs)), np.intp), [],
+                [])
+    # same sorting as in _tensordot_pre_worker
+    stride = charges._make_stride([l.block_number for l in a.legs[cut_a:]], False)
+    a_qdata_contr = np.sum(a._qdata[:, cut_a:] * stride, axis=1)
+    a_sort = np.lexsort(np.append(a_qdata_contr[:, np.newaxis], a._qdata[:, :cut_a], axis=1).T)
+    a_qdata_keep = a._qdata[a_sort, :cut_a]
+    a_qdata_contr = a_qdata_contr[a_sort]
+    b_qdata_contr = np.sum(b._qdata[:, :cut_b] * stride, axis=1)
+    if not b._qdata_sorted:
+        b_sort = np.lexsort(np.append(b_qdata_contr[:, np.newaxis], b._qdata[:, cut_b:], axis=1).T)
+    else:
+        b_sort = np.arange(b.stored_blocks, dtype=np.intp)
+    b_qdata_keep = b._qdata[b_sort, cut_b:]
+    b_qdata_contr = b_qdata_contr[b_sort]
+    a_slices = charges._find_row_differences(a_qdata_keep)
+    b_slices = charges._find_row_differences(b_qdata_keep)
+    # shapes of the blocks as matrices (1D vectors are made row/column matrices)
+    a_block_shapes = [a._get_block_shape(qi) for qi in a._qdata[a_sort]]
+    b_block_shapes = [b._get_block_shape(qi) for qi in b._qdata[b_sort]]
+    a_matrix_shapes = [(int(np.prod(s[:cut_a])), int(np.prod(s[cut_a:]))) for s in a_block_shapes]
+    b_matrix_shapes = [(int(np.prod(s[:cut_b])), int(np.prod(s[cut_b:]))) for s in b_block_shapes]
+    a_shape_keep = [a_block_shapes[i][:cut_a] for i in a_slices[:-1]]
+    b_shape_keep = [b_block_shapes[j][cut_b:] for j in b_slices[:-1]]
+    a_qdata_keep = a_qdata_keep[a_slices[:-1]]
+    b_qdata_keep = b_qdata_keep[b_slices[:-1]]
+    # same charge matching as in _tensordot_worker
+    a_charges_keep = charges._partial_qtotal(chinfo, a.legs[:cut_a], a_qdata_keep, +1, None)
+    a_lookup_charges = list_to_dict_list(a_charges_keep)  # lookup table ``charge -> [row_a]``
+    b_charges_match = charges._partial_qtotal(chinfo, b.legs[cut_b:], b_qdata_keep, -1, qtotal)
+    res_qdata = []
+    res_shapes = []
+    res_ks = []
+    for col_b, charge_match in enumerate(b_charges_match):
+        rows_a = a_lookup_charges.get(tuple(charge_match), [])  # empty list if no match
+        j0, j1 = b_slices[col_b], b_slices[col_b + 1]
+        for row_a in rows_a:
+            i0, i1 = a_slices[row_a], a_slices[row_a + 1]
+            ks = _iter_common_sorted(a_qdata_contr[i0:i1], b_qdata_contr[j0:j1])
+            if len(ks) == 0:
+                continue
+            res_ks.append([(i0 + k1, j0 + k2) for k1, k2 in ks])
+            res_qdata.append(np.append(a_qdata_keep[row_a], b_qdata_keep[col_b]))
+            res_shapes.append(a_shape_keep[row_a] + b_shape_keep[col_b])
+    if len(res_qdata) > 0:
+        res_qdata = np.array(res_qdata, dtype=np.intp)
+    else:
+        res_qdata = np.empty((0, len(res_legs)), np.intp)
+    return (a_sort, a_matrix_shapes, b_sort, b_matrix_shapes, res_legs, qtotal, res_qdata,
+            res_shapes, res_ks)
+
+
+def _tensordot_execute_plan(plan, a, b):
+    """Perform the contraction of `a` and `b` prepared by :func:`_tensordot_plan`."""
+    a_sort, a_matrix_shapes, b_sort, b_matrix_shapes, res_legs, qtotal, res_qdata, res_shapes, \
+        res_ks = plan
+    calc_dtype, res_dtype = _find_calc_dtype(a.dtype, b.dtype)
+    res = Array(res_legs, res_dtype, qtotal)
+    if len(res_ks) == 0:
+        return res
+    a_data = a._data
+    b_data = b._data
+    a_data = [
+        np.reshape(a_data[i], shape).astype(calc_dtype, order='F', copy=False)
+        for i, shape in zip(a_sort, a_matrix_shapes)
+    ]
+    b_data = [
+        np.reshape(b_data[j], shape).astype(calc_dtype, order='F', copy=False)
+        for j, shape in zip(b_sort, b_matrix_shapes)
+    ]
+    blas_dot = BLAS.get_blas_funcs('gemm', dtype=calc_dtype)
+    res_data = []
+    for ks, shape in zip(res_ks, res_shapes):
+        k1, k2 = ks[0]
+        sum_ = blas_dot(1., a_data[k1], b_data[k2])
+        for k1, k2 in ks[1:]:
+            sum_ = blas_dot(1., a_data[k1], b_data[k2], 1., sum_, overwrite_c=True)
+        res_data.append(sum_.reshape(shape).astype(res_dtype, copy=False))
+    res._data = res_data
+    res._qdata = res_qdata.copy()
+    res._qdata_sorted = True
+    return res
+
+
+def _tensordot_batched_worker(a, b, axes):
+    """Variant of :func:`_tensordot_worker` grouping block products of equal shape.
+
+    Same arguments and return value as :func:`_tensordot_worker`.
+    Instead of calling BLAS once for each pair of blocks to be multiplied, we first plan
+    *all* block products ``(row_a, col_b, k)`` necessary for the result,
+    group them by the shapes of the (reshaped) matrices to be multiplied, and evaluate each group
+    with stacked :func:`numpy.matmul` calls. Products contributing to the same block of the
+    result are summed within the matrix product by concatenating the blocks along the
+    contracted dimension.
+    This reduces the Python and BLAS call overhead if the contracted legs are split into many
+    small charge sectors, at the cost of copying the blocks into the stacks;
+    the size of the stacks is limited by :data:`TENSORDOT_BATCH_MAX_SIZE`.
+    """
+    chinfo = a.chinfo
+    if a.stored_blocks == 0 or b.stored_blocks == 0:  # special case: `a` or `b` is 0
+        return zeros(a.legs[:-axes] + b.legs[axes:], np.find_common_type([a.dtype, b.dtype], []),
+                     a.qtotal + b.qtotal)
+    cut_a = a.rank - axes
+    cut_b = axes
+    a_pre_result, b_pre_result, _, res_dtype = _tensordot_pre_worker(a, b, cut_a, cut_b)
+    a_data, a_qdata_contr, a_qdata_keep, a_shape_keep = a_pre_result
+    b_data, b_qdata_contr, b_qdata_keep, b_shape_keep = b_pre_result
+    qtotal = chinfo.make_valid(a.qtotal + b.qtotal)
+    a_charges_keep = charges._partial_qtotal(a.chinfo, a.legs[:cut_a], a_qdata_keep, +1, None)
+    a_lookup_charges = list_to_dict_list(a_charges_keep)  # lookup table ``charge -> [row_a]``
+    b_charges_match = charges._partial_qtotal(a.chinfo, b.legs[cut_b:], b_qdata_keep, -1, qtotal)
+    # flat lists of all the blocks as matrices (1D vectors for full contractions)
+    a_blocks = [A if A.ndim == 2 else A.reshape((1, -1)) for blocks in a_data for A in blocks]
+    b_blocks = [B if B.ndim == 2 else B.reshape((-1, 1)) for blocks in b_data for B in blocks]
+    a_offsets = np.cumsum([0] + [len(blocks) for blocks in a_data])
+    b_offsets = np.cumsum([0] + [len(blocks) for blocks in b_data])
+
+    # plan: find all the blocks of the result and the block products contributing to them
+    res_rows_cols = []  # (row_a, col_b) for each block of the result
+    k1_all = []  # indices of the blocks of `a` in the products, relative to the start of row_a
+    k2_all = []  # indices of the blocks of `b` in the products, relative to the start of col_b
+    for col_b, charge_match in enumerate(b_charges_match):
+        rows_a = a_lookup_charges.get(tuple(charge_match), [])  # empty list if no match
+        b_qdata_col = b_qdata_contr[col_b]
+        for row_a in rows_a:
+            # vectorized version of _iter_common_sorted(a_qdata_contr[row_a], b_qdata_col)
+            a_qdata_row = a_qdata_contr[row_a]
+            k2 = np.searchsorted(b_qdata_col, a_qdata_row)
+            k2[k2 == len(b_qdata_col)] = 0
+            k1 = np.flatnonzero(b_qdata_col[k2] == a_qdata_row)
+            if len(k1) == 0:
+                continue
+            res_rows_cols.append((row_a, col_b))
+            k1_all.append(k1)
+            k2_all.append(k2[k1])
+    res = Array(a.legs[:cut_a] + b.legs[cut_b:], res_dtype, qtotal)
+    if len(res_rows_cols) == 0:
+        return res
+    rows_a, cols_b = np.array(res_rows_cols, np.intp).T
+    ks_counts = [len(k1) for k1 in k1_all]
+    res_inds = np.repeat(np.arange(len(res_rows_cols)), ks_counts)
+    inds_a = np.concatenate(k1_all) + np.repeat(a_offsets[rows_a], ks_counts)
+    inds_b = np.concatenate(k2_all) + np.repeat(b_offsets[cols_b], ks_counts)
+    # group the products by the shapes of the matrices to be multiplied
+    # stable sort: `res_inds` stay non-decreasing within each group
+    _, a_shape_class = np.unique([A.shape for A in a_blocks], axis=0, return_inverse=True)
+    _, b_shape_class = np.unique([B.shape for B in b_blocks], axis=0, return_inverse=True)
+    shape_class = a_shape_class[inds_a] * (np.max(b_shape_class) + 1) + b_shape_class[inds_b]
+    perm = np.argsort(shape_class, kind='stable')
+    shape_class = shape_class[perm]
+    group_slices = np.flatnonzero(np.concatenate(([True], shape_class[1:] != shape_class[:-1])))
+    group_slices = np.append(group_slices, len(perm))
+
+    # execute: stacked matrix products for each shape class
+    res_blocks = [None] * len(res_rows_cols)
+    for g_beg, g_end in zip(group_slices[:-1], group_slices[1:]):
+        g_perm = perm[g_beg:g_end]
+        g_inds_a = inds_a[g_perm]
+        g_inds_b = inds_b[g_perm]
+        g_res_inds = res_inds[g_perm]
+        if len(g_perm) == 1:
+            C = np.dot(a_blocks[g_inds_a[0]], b_blocks[g_inds_b[0]])
+            _tensordot_batched_accumulate(res_blocks, g_res_inds, [C])
+            continue
+        unique_a, pos_a = np.unique(g_inds_a, return_inverse=True)
+        unique_b, pos_b = np.unique(g_inds_b, return_inverse=True)
+        a_stack = np.stack([a_blocks[i] for i in unique_a])
+        b_stack = np.stack([b_blocks[i] for i in unique_b])
+        _, m, k = a_stack.shape
+        n = b_stack.shape[2]
+        # the products for a given block of the result are contiguous in the group;
+        # if there are `c` of them, we can sum them up in a single matrix product
+        # with the `c` matrices of `a` (`b`) concatenated along the columns (rows).
+        starts = np.flatnonzero(np.concatenate(([True], g_res_inds[1:] != g_res_inds[:-1])))
+        counts = np.diff(np.append(starts, len(g_perm)))
+        for c in np.unique(counts):
+            c_starts = starts[counts == c]
+            chunk = max(TENSORDOT_BATCH_MAX_SIZE // (c * (m * k + k * n) + m * n), 1)
+            for i in range(0, len(c_starts), chunk):
+                sub_starts = c_starts[i:i + chunk]
+                R = len(sub_starts)
+                idx = (sub_starts[:, np.newaxis] + np.arange(c)[np.newaxis, :]).reshape(-1)
+                A = a_stack[pos_a[idx]].reshape(R, c, m, k)
+                A = A.transpose(0, 2, 1, 3).reshape(R, m, c * k)
+                B = b_stack[pos_b[idx]].reshape(R, c * k, n)
+                _tensordot_batched_accumulate(res_blocks, g_res_inds[sub_starts],
+                                              np.matmul(A, B))
+
+    # Step 4) reshape back to tensors
+    res_data = []
+    for (row_a, col_b), block in zip(res_rows_cols, res_blocks):
+        block = block.reshape(a_shape_keep[row_a] + b_shape_keep[col_b])
+        res_data.append(block.astype(res_dtype, copy=False))
+    res._qdata = np.concatenate((a_qdata_keep[rows_a], b_qdata_keep[cols_b]), axis=1)
+    res._qdata_sorted = True  # same order of (row_a, col_b) as in _tensordot_worker
+    res._data = res_data
+    return res
+
+
+def _tensordot_batched_accumulate(res_blocks, res_indices, products):
+    """Add the `products` to ``res_blocks[res_indices]`` (which may be ``None`` initially)."""
+    for res_idx, C in zip(res_indices, products):
+        if res_blocks[res_idx] is None:
+            res_blocks[res_idx] = C.copy()  # don't keep a view to the whole stack alive
+        else:
+            res_blocks[res_idx] += C
+
+
+def _svd_worker(a,
+                full_matrices,
+                compute_uv,
+                overwrite_a,
+                cutoff,
+                qtotal_LR,
+                inner_qconj,
+                keep_max=None):
     """Main work of svd. Assumes that `a` is 2D and completely blocked."""
     chinfo = a.chinfo
     qtotal_L, qtotal_R = qtotal_LR
@@ -4281,25 +4914,20 @@ def _svd_worker(a, full_matrices, compute_uv, overwrite_a, cutoff, qtotal_LR, in
     at_full = 0
     blocks_kept = []
 
-    # main loop
-    for i in range(len(a._data)):
-        block = a._data[i]
-        if compute_uv:
-            U_b, S_b, VH_b = svd_flat(block, full_matrices, True, overwrite_a, check_finite=True)
-            if anynan(U_b) or anynan(VH_b) or anynan(S_b):
-                warnings.warn("Svd (gesdd) gave NaNs. Try again with gesvd")
-                # give it another try with the other (more stable) svd driver
-                U_b, S_b, VH_b = svd_flat(block,
-                                          full_matrices,
-                                          True,
-                                          overwrite_a,
-                                          check_finite=True,
-                                          lapack_driver='gesvd')
-                if anynan(U_b) or anynan(VH_b) or anynan(S_b):
-                    raise ValueError("NaN in U_b {0:d} and/or VH_b: {1:d}".format(
-                        np.sum(np.isnan(U_b)), np.sum(np.isnan(VH_b))))
-        else:
-            S_b = svd_flat(block, False, False, overwrite_a, check_finite=True)
+    # main loop: the svd of the blocks are independent and can be calculated in parallel
+    if keep_max is not None:
+        blocks_svd = _svd_blocks_keep_max(a._data, compute_uv, overwrite_a, keep_max)
+    else:
+        work = None
+        if get_block_nthreads() > 1:
+            work = [block.size * min(block.shape) for block in a._data]
+        blocks_svd = parallel_map_blocks(_svd_block,
+                                         [(block, full_matrices, compute_uv, overwrite_a)
+                                          for block in a._data], work)
+    for i, (block, block_svd) in enumerate(zip(a._data, blocks_svd)):
+        if block_svd is None:  # skipped by _svd_blocks_keep_max
+            continue
+        U_b, S_b, VH_b = block_svd
         if anynan(S_b):
             raise ValueError("NaN in S: " + str(np.sum(np.isnan(S_b))))
         if cutoff is not None:
@@ -4357,6 +4985,104 @@ def _svd_worker(a, full_matrices, compute_uv, overwrite_a, cutoff, qtotal_LR, in
     return U, S, VH
 
 
+def _svd_block(block, full_matrices, compute_uv, overwrite_a):
+    """Svd of a single block for :func:`_svd_worker`; ``U, VH = None, None`` if not `compute_uv`."""
+    if not compute_uv:
+        return None, svd_flat(block, False, False, overwrite_a, check_finite=True), None
+    U_b, S_b, VH_b = svd_flat(block, full_matrices, True, overwrite_a, check_finite=True)
+    if anynan(U_b) or anynan(VH_b) or anynan(S_b):
+        warnings.warn("Svd (gesdd) gave NaNs. Try again with gesvd")
+        # give it another try with the other (more stable) svd driver
+        U_b, S_b, VH_b = svd_flat(block,
+                                  full_matrices,
+                                  True,
+                                  overwrite_a,
+                                  check_finite=True,
+                                  lapack_driver='gesvd')
+        if anynan(U_b) or anynan(VH_b) or anynan(S_b):
+            raise ValueError("NaN in U_b {0:d} and/or VH_b: {1:d}".format(
+                np.sum(np.isnan(U_b)), np.sum(np.isnan(VH_b))))
+    return U_b, S_b, VH_b
+
+
+def _svd_blocks_keep_max(blocks, compute_uv, overwrite_a, keep_max):
+    """Svd of the `blocks` for :func:`_svd_worker`, keeping only the `keep_max` largest values.
+
+    The Frobenius norm of a block is an upper bound for its singular values.
+    We hence process the blocks in descending order of their norm, in batches of
+    :func:`~tenpy.tools.process.get_block_nthreads` blocks distributed with
+    :func:`~tenpy.tools.process.parallel_map_blocks`, and merge the singular values into
+    a heap of the `keep_max` largest values found so far.
+    Once the norm of the remaining blocks is below the smallest value in the (full) heap,
+    they can not contribute and are skipped.
+    Finally, singular values below that global cut are discarded from each block.
+
+    Returns
+    -------
+    blocks_svd : list of {None | (U_b, S_b, VH_b)}
+        For each of the `blocks` the result of :func:`_svd_block` restricted to the
+        kept singular values, or ``None`` for skipped blocks.
+    """
+    norms = np.array([np.linalg.norm(block) for block in blocks])  # before `overwrite_a`
+    order = np.argsort(-norms, kind='stable')
+    batch = max(get_block_nthreads(), 1)
+    heap = []  # min-heap of the `keep_max` largest singular values found so far
+    blocks_svd = [None] * len(blocks)
+    for start in range(0, len(order), batch):
+        cut = heap[0] if len(heap) == keep_max else -1.
+        todo = [i for i in order[start:start + batch] if norms[i] > cut]
+        if len(todo) == 0:
+            break  # the remaining blocks have even smaller norms
+        work = [blocks[i].size * min(blocks[i].shape) for i in todo]
+        results = parallel_map_blocks(_svd_block,
+                                      [(blocks[i], False, compute_uv, overwrite_a) for i in todo],
+                                      work)
+        for i, res in zip(todo, results):
+            blocks_svd[i] = res
+            for s in res[1][:keep_max]:  # S_b is sorted descending
+                if len(heap) < keep_max:
+                    heapq.heappush(heap, s)
+                elif s > heap[0]:
+                    heapq.heapreplace(heap, s)
+                else:
+                    break
+    if len(heap) == keep_max:
+        cut = heap[0]
+        for i, res in enumerate(blocks_svd):
+            if res is None:
+                continue
+            U_b, S_b, VH_b = res
+            num = np.count_nonzero(S_b >= cut)
+            if num == 0:
+                blocks_svd[i] = None
+            elif num < len(S_b):
+                if compute_uv:
+                    U_b, VH_b = U_b[:, :num], VH_b[:num, :]
+                blocks_svd[i] = (U_b, S_b[:num], VH_b)
+    return blocks_svd
+
+
+def _eig_block(hermitian, block, sort, UPLO, compute_v=True):
+    """Diagonalize a single block for :func:`_eig_worker` and :func:`_eigvals_worker`."""
+    if compute_v:
+        if hermitian:
+            rw, rv = np.linalg.eigh(block, UPLO)
+        else:
+            rw, rv = np.linalg.eig(block)
+    else:
+        rv = None
+        if hermitian:
+            rw = np.linalg.eigvalsh(block, UPLO)
+        else:
+            rw = np.linalg.eigvals(block)
+    if sort is not None:  # apply sorting options
+        perm = argsort(rw, sort)
+        rw = np.take(rw, perm)
+        if compute_v:
+            rv = np.take(rv, perm, axis=1)
+    return rw, rv
+
+
 def _eig_worker(hermitian, a, sort, UPLO='L'):
     """Worker for ``eig``, ``eigh``"""
     if a.rank != 2 or a.shape[0] != a.shape[1]:
@@ -4371,15 +5097,13 @@ def _eig_worker(hermitian, a, sort, UPLO='L'):
     resw = np.zeros(a.shape[0], dtype=dtype)
     resv = diag(1., a.legs[0], dtype=np.promote_types(dtype, a.dtype))
     # w, v now default to 0 and the Identity
-    for qindices, block in zip(a._qdata, a._data):  # non-zero blocks on the diagonal
-        if hermitian:
-            rw, rv = np.linalg.eigh(block, UPLO)
-        else:
-            rw, rv = np.linalg.eig(block)
-        if sort is not None:  # apply sorting options
-            perm = argsort(rw, sort)
-            rw = np.take(rw, perm)
-            rv = np.take(rv, perm, axis=1)
+    # non-zero blocks on the diagonal: independent, can be diagonalized in parallel
+    work = None
+    if get_block_nthreads() > 1:
+        work = [block.shape[0]**3 for block in a._data]
+    eig_blocks = parallel_map_blocks(_eig_block, [(hermitian, block, sort, UPLO)
+                                                  for block in a._data], work)
+    for qindices, (rw, rv) in zip(a._qdata, eig_blocks):
         qi = qindices[0]  # both `a` and `resv` are sorted and share the same qindices
         resv._data[qi] = rv  # replace idendity block
         resw[a.legs[0].get_slice(qi)] = rw  # replace eigenvalues
@@ -4400,14 +5124,13 @@ def _eigvals_worker(hermitian, a, sort, UPLO='L'):
     dtype = np.float if hermitian else np.complex
     resw = np.zeros(a.shape[0], dtype=dtype)
     # w now default to 0
-    for qindices, block in zip(a._qdata, a._data):  # non-zero blocks on the diagonal
-        if hermitian:
-            rw = np.linalg.eigvalsh(block, UPLO)
-        else:
-            rw = np.linalg.eigvals(block)
-        if sort is not None:  # apply sorting options
-            perm = argsort(rw, sort)
-            rw = np.take(rw, perm)
+    # non-zero blocks on the diagonal: independent, can be diagonalized in parallel
+    work = None
+    if get_block_nthreads() > 1:
+        work = [block.shape[0]**3 for block in a._data]
+    eig_blocks = parallel_map_blocks(_eig_block, [(hermitian, block, sort, UPLO, False)
+                                                  for block in a._data], work)
+    for qindices, (rw, _) in zip(a._qdata, eig_blocks):
         qi = qindices[0]  # both `a` and `resv` are sorted and share the same qindices
         resw[a.legs[0].get_slice(qi)] = rw  # replace eigenvalues
     return resw
@@ -38,16 +38,20 @@ i.e. between sites ``i-1`` and ``i``.
 # Copyright 2018 TeNPy Developers
 
 import numpy as np
+import scipy.sparse.linalg
 import warnings
 import sys
+import time
 
 from ..linalg import np_conserved as npc
+from ..linalg import sparse
 from .site import group_sites, Site
 from ..tools.string import vert_join
 from .mps import MPS as _MPS  # only for MPS._valid_bc
 from .mps import MPSEnvironment
 from .terms import OnsiteTerms, CouplingTerms, MultiCouplingTerms
 from ..tools.misc import add_with_None_0
+from ..tools.math import lcm
 
 __all__ = ['MPO', 'MPOGraph', 'MPOEnvironment', 'grid_insert_ops']
 
@@ -337,7 +341,7 @@ class MPO:
                 self.IdR[b] = np.nonzero(p == IdR)[0][0]
         # done
 
-    def expectation_value(self, psi, tol=1.e-10, max_range=100):
+    def expectation_value(self, psi, tol=1.e-10, max_range=100, method='fixed_point'):
         """Calculate ``<psi|self|psi>/<psi|psi>``.
 
         For a finite MPS, simply contract the network ``<psi|self|psi>``.
@@ -346,18 +350,36 @@ class MPO:
         it calculates the expectation value of terms with the left-most non-trivial
         operator inside the MPO unit cell and returns the average value per site.
 
+        For an infinite MPS, we split the `wR` leg of `LP` at the unit cell boundary into
+        `IdL`, `IdR` and the remaining indices `r`. We start with the left fixed point
+        ``S**2`` of the transfer matrix in the `IdL` part. Contracting the first unit cell of
+        `self` maps it to some `LP_r` (terms just started) and to the `IdR` part (terms finished
+        within the unit cell). The terms extending further are given by the sum
+        ``X = LP_r + T_rr(LP_r) + T_rr(T_rr(LP_r)) + ...``, where `T_rr` is the transfer over
+        ``lcm(self.L, psi.L)`` sites, projected onto the indices `r` on both sides.
+        With ``method='fixed_point'``, we solve ``(1 - T_rr) X = LP_r`` with
+        :func:`scipy.sparse.linalg.gmres`, which needs only a few applications of `T`,
+        independent of the decay length of exponentially decaying long-range terms.
+        With ``method='power'``, we explicitly evaluate the sum term by term.
+
         Parameters
         ----------
         psi : :class:`~tenpy.networks.mps.MPS`
             State for which the expectation value should be taken.
         tol : float
             Ignored for finite `psi`.
-            For infinite MPO containing exponentially decaying long-range terms, stop evaluating
-            further terms if the terms in `LP` have norm < `tol`.
+            For ``method='fixed_point'``, the (relative) tolerance for the GMRES solution.
+            For ``method='power'``, stop evaluating further terms if the terms in `LP` have
+            norm < `tol`.
         max_range : int
             Ignored for finite `psi`.
-            Contract at most ``self.L * max_range`` sites, even if `tol` is not reached.
-            In that case, issue a warning.
+            For ``method='fixed_point'``, the maximum number of GMRES restarts.
+            For ``method='power'``, contract at most ``self.L * max_range`` sites,
+            even if `tol` is not reached.
+            In both cases, issue a warning if `tol` is not reached.
+        method : ``'fixed_point' | 'power'``
+            Ignored for finite `psi`. How to evaluate the terms extending over several unit
+            cells, see above.
 
         Returns
         -------
@@ -367,6 +389,71 @@ class MPO:
         """
         if psi.finite:
             return MPOEnvironment(psi, self, psi).full_contraction(0)
+        if method == 'power':
+            return self._expectation_value_power(psi, tol, max_range)
+        elif method != 'fixed_point':
+            raise ValueError("unknown method " + repr(method))
+        L = self.L
+        L_tot = lcm(L, psi.L)  # `T` acts on `L_tot` sites, starting at site `L`
+        # mask for the indices `r` on the bond (L-1, L), which is the same as (-1, 0)
+        mask_r = np.ones(self._W[-1].get_leg('wR').ind_len, np.bool_)
+        mask_r[self.get_IdL(L)] = False
+        mask_r[self.get_IdR(L - 1)] = False
+        RP = psi.init_RP(L - 1, mpo=self)  # also valid right of site ``L - 1 + L_tot``
+        axes_RP = [['vR*', 'wR', 'vR'], ['vL*', 'wL', 'vL']]
+        # left fixed point: `S**2` in the `IdL` part
+        LP = psi.init_LP(0, mpo=self)
+        LP.iscale_axis(psi.get_SL(0)**2, 'vR')
+        LP = self._contract_LP_sites(psi, LP, 0, L)
+        exp_val = npc.inner(LP, RP, axes=axes_RP, do_conj=False)  # terms within the unit cell
+        if not np.any(mask_r):
+            return exp_val / L  # only onsite terms
+        LP_r = LP
+        LP_r.iproject(mask_r, 'wR')
+        if npc.norm(LP_r) == 0.:
+            return exp_val / L  # no terms extending over several unit cells
+        W0_r = self._W[0].copy()
+        W0_r.iproject(mask_r, 'wL')
+        LP_r = LP_r.combine_legs(['vR*', 'wR', 'vR'])
+        pipe = LP_r.legs[0]
+
+        def matvec(X):
+            # ``(1 - T_rr) X``
+            X = X.split_legs(0)
+            Y = self._contract_LP_sites(psi, X, L, L + L_tot, W0_r)
+            Y.iproject(mask_r, 'wR')
+            Y = X - Y.itranspose(['vR*', 'wR', 'vR'])
+            return Y.combine_legs([0, 1, 2], pipes=pipe)
+
+        flat_linop = sparse.FlatLinearOperator(matvec, pipe, LP_r.dtype, LP_r.qtotal,
+                                               LP_r.get_leg_labels()[0])
+        b = flat_linop.npc_to_flat(LP_r)
+        x, info = scipy.sparse.linalg.gmres(flat_linop, b, x0=b, tol=tol, maxiter=max_range)
+        if info != 0:
+            msg = "GMRES: tolerance {0:.2e} not reached ({1:d})".format(tol, info)
+            warnings.warn(msg, stacklevel=2)
+        X = flat_linop.flat_to_npc(x).split_legs(0)
+        # terms finishing in a later unit cell
+        LP = self._contract_LP_sites(psi, X, L, L + L_tot, W0_r)
+        exp_val = exp_val + npc.inner(LP, RP, axes=axes_RP, do_conj=False)
+        return exp_val / L
+
+    def _contract_LP_sites(self, psi, LP, start, stop, W_start=None):
+        """Contract `LP` (left of site `start`) with `psi` (in 'B' form) and `self` up to `stop`.
+
+        If given, `W_start` is used instead of ``self.get_W(start)``, e.g. a projected version."""
+        for i in range(start, stop):
+            W = self.get_W(i)
+            if i == start and W_start is not None:
+                W = W_start
+            B = psi.get_B(i, form='B')
+            LP = npc.tensordot(LP, B, axes=['vR', 'vL'])
+            LP = npc.tensordot(LP, W, axes=[['wR', 'p'], ['wL', 'p*']])
+            LP = npc.tensordot(LP, B.conj(), axes=[['vR*', 'p'], ['vL*', 'p*']])
+        return LP
+
+    def _expectation_value_power(self, psi, tol, max_range):
+        """Infinite MPS case of :meth:`expectation_value` with ``method='power'``."""
         L = self.L
         LP0 = psi.init_LP(0, mpo=self)
         masks_L_no_IdL = []
@@ -676,6 +763,12 @@ class MPOGraph:
     graph : list of dict of dict of list of tuples
         For each site `i` a dictionary ``{keyL: {keyR: [(opname, strength)]}}`` with
         ``keyL in vertices[i]`` and ``keyR in vertices[i+1]``.
+    build_stats : dict | None
+        Statistics and timings (in seconds) of the last call to :meth:`build_MPO`:
+        the bond dimensions ``'chi'``, the number of edges ``'n_edges'`` and
+        non-zero blocks ``'n_blocks'`` for each `W`, the number ``'n_W_reused'`` of `W` which
+        were reused from other sites, and the timings ``'time_states', 'time_legcharges',
+        'time_Ws', 'time_MPO'`` of the individual steps.
     _grid_legs : None | list of LegCharge
         The charges for the MPO
     """
@@ -689,6 +782,7 @@ class MPOGraph:
         self.states = [set() for _ in range(self.L + 1)]
         self.graph = [{} for _ in range(self.L)]
         self._ordered_states = None
+        self.build_stats = None
         self.test_sanity()
 
     @classmethod
@@ -891,28 +985,67 @@ class MPOGraph:
         """True if there is an edge from `keyL` on bond (i-1, i) to `keyR` on bond (i, i+1)."""
         return keyR in self.graph[i].get(keyL, [])
 
-    def build_MPO(self, Ws_qtotal=None):
+    def build_MPO(self, Ws_qtotal=None, verbose=0):
         """Build the MPO represented by the graph (`self`).
 
+        The `W` tensors are assembled directly block by block from the graph with :meth:`_build_W`,
+        without the intermediate grids of :meth:`MPO.from_grids`.
+        Sites with identical graph entries and bond charges (e.g. in the bulk of a translation
+        invariant system) share the assembled `W`, see :meth:`_W_cache_key`.
+        Statistics and timings of the different steps are saved in :attr:`build_stats`.
+
         Parameters
         ----------
         Ws_qtotal : None | (list of) charges
             The `qtotal` for each of the Ws to be generated, default (``None``) means 0 charge.
             A single qtotal holds for each site.
+        verbose : int
+            If ``verbose >= 1``, print the :attr:`build_stats`.
 
         Returns
         -------
         mpo : :class:`MPO`
             the MPO which self represents.
         """
+        t0 = time.time()
         self.test_sanity()
-        # pre-work: generate the grid
         self._set_ordered_states()
-        grids = self._build_grids()
         IdL = [s.get('IdL', None) for s in self._ordered_states]
         IdR = [s.get('IdR', None) for s in self._ordered_states]
+        t1 = time.time()
         legs, Ws_qtotal = self._calc_legcharges(Ws_qtotal)
-        H = MPO.from_grids(self.sites, grids, self.bc, IdL, IdR, Ws_qtotal, legs, self.max_range)
+        t2 = time.time()
+        Ws = []
+        cache = {}
+        n_reused = 0
+        for i in range(self.L):
+            key = self._W_cache_key(i, legs, Ws_qtotal)
+            W = cache.get(key, None) if key is not None else None
+            if W is None:
+                W = self._build_W(i, legs[i], legs[i + 1].conj(), Ws_qtotal[i])
+                if key is not None:
+                    cache[key] = W
+            else:
+                n_reused += 1
+            Ws.append(W)
+        t3 = time.time()
+        H = MPO(self.sites, Ws, self.bc, IdL, IdR, self.max_range)
+        t4 = time.time()
+        self.build_stats = {
+            'chi': [leg.ind_len for leg in legs],
+            'n_edges': [sum([len(D) for D in G.values()]) for G in self.graph],
+            'n_blocks': [len(W._data) for W in Ws],
+            'n_W_reused': n_reused,
+            'time_states': t1 - t0,
+            'time_legcharges': t2 - t1,
+            'time_Ws': t3 - t2,
+            'time_MPO': t4 - t3,
+        }
+        if verbose >= 1:
+            print("MPOGraph.build_MPO: chi = {chi!r}, reused {n_W_reused:d} of {L:d} Ws".format(
+                L=self.L, **self.build_stats))
+            print("time (s): states {time_states:.3f}, legcharges {time_legcharges:.3f}, "
+                  "Ws {time_Ws:.3f}, MPO {time_MPO:.3f}".format(**self.build_stats))
         return H
 
     def __repr__(self):
@@ -969,6 +1102,91 @@ class MPOGraph:
             grids.append(grid)
         return grids
 
+    def _W_cache_key(self, i, legs, Ws_qtotal):
+        """Hashable key identifying the `W` on site `i`, or ``None`` if it can't be hashed.
+
+        Two sites with the same key have identical `W`: the key contains the site (by identity),
+        the charges of the virtual legs and `qtotal`, as well as the edges of the graph in terms
+        of the indices of the ordered states.
+        """
+        stL, stR = self._ordered_states[i:i + 2]
+        edges = []
+        for keyL, D in self.graph[i].items():
+            a = stL[keyL]
+            for keyR, ops in D.items():
+                edges.append((a, stR[keyR], tuple([tuple(op) for op in ops])))
+        edges.sort(key=lambda e: e[:2])
+        key = (id(self.sites[i]), legs[i].to_qflat().tobytes(), legs[i + 1].to_qflat().tobytes(),
+               np.asarray(Ws_qtotal[i]).tobytes(), tuple(edges))
+        try:
+            hash(key)
+        except TypeError:  # e.g. a strength given as numpy array
+            return None
+        return key
+
+    def _build_W(self, i, leg_wL, leg_wR, qtotal):
+        """Assemble the `W` on site `i` directly in block-sparse form.
+
+        For each edge ``keyL -> keyR`` with operators ``[(opname, strength), ...]``,
+        the blocks of the onsite operators are added to the corresponding block of `W`.
+        This is equivalent to (but much faster than) :func:`~tenpy.linalg.np_conserved.grid_outer`
+        with the grid obtained from :meth:`_build_grids`, which inserts each entry with
+        :meth:`~tenpy.linalg.np_conserved.Array.__setitem__`.
+
+        Parameters
+        ----------
+        i : int
+            The site index.
+        leg_wL, leg_wR : :class:`~tenpy.linalg.charge.LegCharge`
+            The virtual legs ``'wL', 'wR'`` of the `W`.
+        qtotal : charges
+            The total charge of the `W`.
+
+        Returns
+        -------
+        W : :class:`~tenpy.linalg.np_conserved.Array`
+            The `W` with labels ``'wL', 'wR', 'p', 'p*'``.
+        """
+        site = self.sites[i]
+        stL, stR = self._ordered_states[i:i + 2]
+        graph = self.graph[i]  # ``{keyL: {keyR: [(opname, strength)]}}``
+        qind_L, offset_L = _qindex_offset(leg_wL)
+        qind_R, offset_R = _qindex_offset(leg_wR)
+        ops = {}
+        dtypes = []
+        for D in graph.values():
+            for entry in D.values():
+                for opname, strength in entry:
+                    if opname not in ops:
+                        op = ops[opname] = site.get_op(opname)
+                        dtypes.append(op.dtype)
+                    dtypes.append(np.asarray(strength).dtype)
+        dtype = np.find_common_type(dtypes, [])
+        W = npc.Array([leg_wL, leg_wR] + site.get_op('Id').legs, dtype, qtotal)
+        blocks = {}
+        for keyL, D in graph.items():
+            a = stL[keyL]
+            qa, ia = qind_L[a], offset_L[a]
+            for keyR, entry in D.items():
+                b = stR[keyR]
+                qb, ib = qind_R[b], offset_R[b]
+                for opname, strength in entry:
+                    op = ops[opname]
+                    for qp, op_block in zip(op._qdata, op._data):
+                        qindices = (qa, qb, qp[0], qp[1])
+                        block = blocks.get(qindices, None)
+                        if block is None:
+                            shape = (leg_wL.slices[qa + 1] - leg_wL.slices[qa],
+                                     leg_wR.slices[qb + 1] - leg_wR.slices[qb]) + op_block.shape
+                            block = blocks[qindices] = np.zeros(shape, dtype)
+                        block[ia, ib] += strength * op_block
+        W._data = list(blocks.values())
+        W._qdata = np.array(list(blocks.keys()), dtype=np.intp).reshape(len(blocks), 4)
+        W._qdata_sorted = False
+        W.iset_leg_labels(['wL', 'wR', 'p', 'p*'])
+        W.test_sanity()
+        return W
+
     def _calc_legcharges(self, Ws_qtotal):
         """Obtain charges for the virtual legs of the MPO.
 
@@ -1144,14 +1362,30 @@ class MPOEnvironment(MPSEnvironment):
         The number of physical sites involved into the contraction yielding `firstLP`.
     age_RP : int
         The number of physical sites involved into the contraction yielding `lastRP`.
+    storage : ``None`` | dict
+        If ``None``, keep all the `LP` and `RP` in RAM. Otherwise parameters for an
+        :class:`~tenpy.tools.cache.OutOfCoreList`, see :class:`~tenpy.networks.mps.MPSEnvironment`.
 
     Attributes
     ----------
     H : :class:`~tenpy.networks.mpo.MPO`
         The MPO sandwiched between `bra` and `ket`.
+    contraction_order : ``'auto' | 'ket' | 'bra'``
+        The order in which :meth:`_contract_LP` and :meth:`_contract_RP` contract the tensors
+        of a site into the environment. For ``'ket'``, contract the environment with the `ket`
+        first, then with `W` and finally with the `bra`; for ``'bra'`` the other way round.
+        If `bra` and `ket` have different bond dimensions, one of them can be significantly
+        cheaper. For ``'auto'`` (default), choose for each site the order with less operations,
+        estimated from the block structure of the tensors with
+        :func:`~tenpy.linalg.np_conserved.tensordot_cost`.
+    _contraction_orders : dict
+        Cache for the choices with ``contraction_order='auto'``: maps ``('LP', i)`` or
+        ``('RP', i)`` to ``(key, order)``, where `key` identifies the shapes and number of stored
+        blocks of the tensors for which the `order` was chosen.
     """
 
-    def __init__(self, bra, H, ket, init_LP=None, init_RP=None, age_LP=0, age_RP=0):
+    def __init__(self, bra, H, ket, init_LP=None, init_RP=None, age_LP=0, age_RP=0,
+                 storage=None):
         if ket is None:
             ket = bra
         if ket is not bra:
@@ -1162,10 +1396,9 @@ class MPOEnvironment(MPSEnvironment):
         self.L = L = bra.L
         self.finite = bra.finite
         self.dtype = np.find_common_type([bra.dtype, ket.dtype, H.dtype], [])
-        self._LP = [None] * L
-        self._RP = [None] * L
-        self._LP_age = [None] * L
-        self._RP_age = [None] * L
+        self.contraction_order = 'auto'
+        self._contraction_orders = {}
+        self._init_storage(storage)
         if init_LP is None:
             init_LP = self.ket.init_LP(0, bra, H)
         self.set_LP(0, init_LP, age=age_LP)
@@ -1275,23 +1508,83 @@ class MPOEnvironment(MPSEnvironment):
     def _contract_LP(self, i, LP):
         """Contract LP with the tensors on site `i` to form ``self._LP[i+1]``"""
         # same as MPSEnvironment._contract_LP, but also contract with `H.get_W(i)`
-        LP = npc.tensordot(LP, self.ket.get_B(i, form='A'), axes=('vR', 'vL'))
-        LP = npc.tensordot(self.H.get_W(i), LP, axes=(['p*', 'wL'], ['p', 'wR']))
-        LP = npc.tensordot(self.bra.get_B(i, form='A').conj(),
-                           LP,
-                           axes=(['p*', 'vL*'], ['p', 'vR*']))
+        A = self.ket.get_B(i, form='A')
+        W = self.H.get_W(i)
+        A_bra = self.bra.get_B(i, form='A').copy(deep=False).iconj()  # no copy for real dtype
+        if self._get_contraction_order('LP', i, LP, A, W, A_bra) == 'bra':
+            LP = npc.tensordot(LP, A_bra, axes=('vR*', 'vL*'))  # 'wR', 'vR', 'p*', 'vR*'
+            LP = npc.tensordot(LP, W, axes=(['wR', 'p*'], ['wL', 'p']))  # 'vR', 'vR*', 'wR', 'p*'
+            LP = npc.tensordot(LP, A, axes=(['vR', 'p*'], ['vL', 'p']))
+        else:
+            LP = npc.tensordot(LP, A, axes=('vR', 'vL'))
+            LP = npc.tensordot(W, LP, axes=(['p*', 'wL'], ['p', 'wR']))
+            LP = npc.tensordot(A_bra, LP, axes=(['p*', 'vL*'], ['p', 'vR*']))
         return LP  # labels 'vR*', 'wR', 'vR'
 
     def _contract_RP(self, i, RP):
         """Contract RP with the tensors on site `i` to form ``self._RP[i-1]``"""
         # same as MPSEnvironment._contract_RP, but also contract with `H.get_W(i)`
-        RP = npc.tensordot(self.ket.get_B(i, form='B'), RP, axes=('vR', 'vL'))
-        RP = npc.tensordot(self.H.get_W(i), RP, axes=(['p*', 'wR'], ['p', 'wL']))
-        RP = npc.tensordot(self.bra.get_B(i, form='B').conj(),
-                           RP,
-                           axes=(['p*', 'vR*'], ['p', 'vL*']))
+        B = self.ket.get_B(i, form='B')
+        W = self.H.get_W(i)
+        B_bra = self.bra.get_B(i, form='B').copy(deep=False).iconj()  # no copy for real dtype
+        if self._get_contraction_order('RP', i, RP, B, W, B_bra) == 'bra':
+            RP = npc.tensordot(B_bra, RP, axes=('vR*', 'vL*'))  # 'vL*', 'p*', 'vL', 'wL'
+            RP = npc.tensordot(RP, W, axes=(['p*', 'wL'], ['p', 'wR']))  # 'vL*', 'vL', 'wL', 'p*'
+            RP = npc.tensordot(RP, B, axes=(['vL', 'p*'], ['vR', 'p']))
+        else:
+            RP = npc.tensordot(B, RP, axes=('vR', 'vL'))
+            RP = npc.tensordot(W, RP, axes=(['p*', 'wR'], ['p', 'wL']))
+            RP = npc.tensordot(B_bra, RP, axes=(['p*', 'vR*'], ['p', 'vL*']))
         return RP  # labels 'vL', 'wL', 'vL*'
 
+    def _get_contraction_order(self, which, i, env, B, W, B_bra):
+        """Choose the order of the contractions in :meth:`_contract_LP` or :meth:`_contract_RP`.
+
+        Parameters
+        ----------
+        which : ``'LP' | 'RP'``
+            Whether we contract `env` = LP with the 'A' form or `env` = RP with the 'B' form.
+        i : int
+            Site index, used for caching the choice.
+        env, B, W, B_bra : :class:`~tenpy.linalg.np_conserved.Array`
+            The environment, the tensor of the `ket`, the MPO tensor and the (conjugated) tensor
+            of the `bra` on site `i`.
+
+        Returns
+        -------
+        order : ``'ket' | 'bra'``
+            Whether to contract `env` with the `ket` or the `bra` first.
+        """
+        if self.contraction_order != 'auto':
+            return self.contraction_order
+        key = (env.shape, B.shape, W.shape, B_bra.shape, env.stored_blocks, B.stored_blocks,
+               W.stored_blocks, B_bra.stored_blocks)
+        cached = self._contraction_orders.get((which, i), None)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        # (tensor, (axes of the previous result, axes of the tensor)) for each contraction
+        if which == 'LP':
+            contr_ket = [(B, ('vR', 'vL')), (W, (['p', 'wR'], ['p*', 'wL'])),
+                         (B_bra, (['p', 'vR*'], ['p*', 'vL*']))]
+            contr_bra = [(B_bra, ('vR*', 'vL*')), (W, (['p*', 'wR'], ['p', 'wL'])),
+                         (B, (['p*', 'vR'], ['p', 'vL']))]
+        else:
+            contr_ket = [(B, ('vL', 'vR')), (W, (['p', 'wL'], ['p*', 'wR'])),
+                         (B_bra, (['p', 'vL*'], ['p*', 'vR*']))]
+            contr_bra = [(B_bra, ('vL*', 'vR*')), (W, (['p*', 'wL'], ['p', 'wR'])),
+                         (B, (['p*', 'vL'], ['p', 'vR']))]
+        costs = []
+        for contractions in [contr_ket, contr_bra]:
+            total_flops = 0
+            res = env
+            for T, (axes_res, axes_T) in contractions:
+                flops, res = npc.tensordot_cost(res, T, axes=(axes_res, axes_T))
+                total_flops += flops
+            costs.append(total_flops)
+        order = 'bra' if costs[1] < costs[0] else 'ket'
+        self._contraction_orders[(which, i)] = (key, order)
+        return order
+
 
 def grid_insert_ops(site, grid):
     """Replaces entries representing operators in a grid of ``W[i]`` with npc.Arrays.
@@ -1407,6 +1700,15 @@ def _calc_grid_legs_infinite(chinfo, grids, Ws_qtotal, leg0, IdL_0):
     return legs
 
 
+def _qindex_offset(leg):
+    """For each index of `leg` find the `qindex` of the block and the position inside the block."""
+    qind = np.zeros(leg.ind_len, dtype=np.intp)
+    for qi in range(leg.block_number):
+        qind[leg.slices[qi]:leg.slices[qi + 1]] = qi
+    offset = np.arange(leg.ind_len, dtype=np.intp) - leg.slices[qind]
+    return qind, offset
+
+
 def _mpo_graph_state_order(key):
     """Key-function for sorting they `states` of an MPO Graph.
 
@@ -85,6 +85,7 @@ from ..linalg import sparse
 from .site import GroupedSite, group_sites
 from ..tools.misc import to_iterable, argsort
 from ..tools.math import lcm, speigs, entropy
+from ..tools.cache import OutOfCoreList
 from ..algorithms.truncation import TruncationError, svd_theta
 
 __all__ = ['MPS', 'MPSEnvironment', 'TransferMatrix']
@@ -150,6 +151,10 @@ class MPS:
     _transfermatrix_keep : int
         How many states to keep at least when diagonalizing a :class:`TransferMatrix`.
         Important if the state develops a near-degeneracy.
+    _transfermatrix_guess : dict
+        Charge sector (as bytes) -> dominant eigenvector of the :class:`TransferMatrix` found in
+        the last call to :meth:`correlation_length`. Used to warm-start the next
+        diagonalization, e.g. when the correlation length is evaluated repeatedly during iDMRG.
     """
     # Canonical form conventions: the saved B = s**nu[0]--Gamma--s**nu[1].
     # For the canonical forms, ``nu[0] + nu[1] = 1``
@@ -189,6 +194,7 @@ class MPS:
         elif self.bc == 'finite':
             self._S[0] = self._S[-1] = np.ones([1])
         self._transfermatrix_keep = 1
+        self._transfermatrix_guess = {}
         self.test_sanity()
 
     def test_sanity(self):
@@ -595,6 +601,7 @@ class MPS:
         cp = MPS(self.sites, self._B, self._S, self.bc, self.form, self.norm)
         cp.grouped = self.grouped
         cp._transfermatrix_keep = self._transfermatrix_keep
+        cp._transfermatrix_guess = self._transfermatrix_guess.copy()
         return cp
 
     @property
@@ -1386,18 +1393,57 @@ class MPS:
             ``mutinf[k]`` is the mutual information :math:`I(i:j)` between the
             sites ``i, j = coords[k]``.
         """
-        #  Basically the code of get_rho_segment and entanglement_entropy,
-        #  but optimized to run in O(L*max_range)
         if max_range is None:
             max_range = self.L
         S_i = self.entanglement_entropy_segment(n=n)  # single-site entropy
         legs_ij = self._get_p_labels(2, False), self._get_p_labels(2, True)
         # = (['p0', 'p1'], ['p0*', 'p1*'])
+        coord, rhos = [], []
+        for i, j, rho_ij in self._iter_rho_two_site(max_range):
+            coord.append((i, j))
+            rhos.append(rho_ij.combine_legs(legs_ij, qconj=[+1, -1]))
+        # diagonalize the equal-sized charge blocks of all rho_ij at once
+        S_ij = [entropy(w, n) for w in npc.eigvalsh_batch(rhos)]
+        mutinf = [S_i[i] + S_i[j % self.L] - S for (i, j), S in zip(coord, S_ij)]
+        return np.array(coord), np.array(mutinf)
+
+    def get_rho_two_site(self, max_range=None):
+        """Calculate the reduced density matrices of all pairs of sites ``i < j``.
+
+        The density matrices are obtained in a single sweep for each `i`, in O(L*max_range),
+        see :meth:`mutinf_two_site`. They can be used for further observables, e.g., with
+        :func:`~tenpy.linalg.np_conserved.eigvalsh_batch` for entropies.
+
+        Parameters
+        ----------
+        max_range : int
+            Maximal distance ``|i-j|`` for which the density matrix should be calculated.
+            ``None`` defaults to `L`.
+
+        Returns
+        -------
+        coords : 2D array
+            Coordinates for the `rhos`.
+        rhos : list of :class:`~tenpy.linalg.np_conserved.Array`
+            ``rhos[k]`` is the reduced density matrix on the sites ``i, j = coords[k]``,
+            with legs ``'p0', 'p1', 'p0*', 'p1*'`` (and ``'q0', 'q1', 'q0*', 'q1*'`` for a
+            :class:`~tenpy.networks.purification_mps.PurificationMPS`).
+        """
+        if max_range is None:
+            max_range = self.L
+        legs_ij = self._get_p_labels(2, False) + self._get_p_labels(2, True)
+        coord, rhos = [], []
+        for i, j, rho_ij in self._iter_rho_two_site(max_range):
+            coord.append((i, j))
+            rhos.append(rho_ij.itranspose(legs_ij))
+        return np.array(coord), rhos
+
+    def _iter_rho_two_site(self, max_range):
+        """Iterate over ``(i, j, rho_ij)`` for the two-site density matrices with ``i < j``."""
+        #  Basically the code of get_rho_segment, but optimized to run in O(L*max_range)
         contr_legs = (
             ['vR*'] + self._get_p_label('1'),  # ['vL', 'p1']
             ['vL*'] + self._get_p_label('1*'))  # ['vL*', 'p1*']
-        mutinf = []
-        coord = []
         for i in range(self.L):
             rho = self.get_theta(i, 1)
             rho = npc.tensordot(rho, rho.conj(), axes=('vL', 'vL*'))
@@ -1408,13 +1454,9 @@ class MPS:
                 B = self._replace_p_label(self.get_B(j, form='B'), '1')  # 'vL', 'vR', 'p1'
                 rho = npc.tensordot(rho, B, axes=['vR', 'vL'])
                 rho_ij = npc.tensordot(rho, B.conj(), axes=(['vR*', 'vR'], ['vL*', 'vR*']))
-                rho_ij = rho_ij.combine_legs(legs_ij, qconj=[+1, -1])
-                S_ij = entropy(npc.eigvalsh(rho_ij), n)
-                mutinf.append(S_i[i] + S_i[j % self.L] - S_ij)
-                coord.append((i, j))
+                yield i, j, rho_ij
                 if j + 1 < jmax:
                     rho = npc.tensordot(rho, B.conj(), axes=contr_legs)
-        return np.array(coord), np.array(mutinf)
 
     def overlap(self, other, charge_sector=0, ignore_form=False, **kwargs):
         """Compute overlap ``<self|other>``.
@@ -1836,6 +1878,206 @@ class MPS:
                     # but we apply opstr after op1 (using the last argument = False)
         return np.real_if_close(C)
 
+    def correlation_functions(self,
+                              op_pairs,
+                              sites1=None,
+                              sites2=None,
+                              opstr=None,
+                              str_on_first=True):
+        r"""Correlation functions ``<psi|op1_i op2_j|psi>/<psi|psi>`` for many operator pairs.
+
+        Equivalent to::
+
+            [self.correlation_function(ops1, ops2, sites1, sites2, opstr, str_on_first)
+             for (ops1, ops2) in op_pairs]
+
+        but much faster if many pairs are requested: the different `ops1` (and `ops2`) are
+        stacked along an additional leg, such that the transfer of the contracted network from
+        site ``i`` to ``j`` is done only once for all pairs. The cost of a transfer step grows
+        only linearly with the number of (distinct) `ops1`, while the contraction of the `ops2`
+        at the end yields all combinations ``ops1 x ops2`` at once.
+
+        Operators appearing in several pairs are stacked only once, e.g. for
+        ``op_pairs = [('Sx', 'Sx'), ('Sx', 'Sy'), ('Sy', 'Sx'), ('Sy', 'Sy')]`` only two
+        operators are stacked on each side.
+
+        Parameters
+        ----------
+        op_pairs : list of (ops1, ops2)
+            Pairs of operators for which the correlation functions are requested.
+            Each `ops1` and `ops2` is given as for :meth:`correlation_function`.
+        sites1, sites2, opstr, str_on_first :
+            See :meth:`correlation_function`; the same for all pairs in `op_pairs`.
+
+        Returns
+        -------
+        C_list : list of 2D ndarray
+            ``C_list[k]`` is the correlation function for ``op_pairs[k]``,
+            see :meth:`correlation_function` for the details.
+        """
+        ops1_list, ops2_list, pair_indices = [], [], []
+
+        def index(ops_list, ops):
+            for k, ops_k in enumerate(ops_list):
+                if ops_k is ops or (isinstance(ops_k, str) and ops_k == ops):
+                    return k
+            ops_list.append(ops)
+            return len(ops_list) - 1
+
+        for ops1, ops2 in op_pairs:
+            pair_indices.append((index(ops1_list, ops1), index(ops2_list, ops2)))
+        _, _, sites1, sites2, opstr = self._correlation_function_args(
+            None, None, sites1, sites2, opstr)
+        ops1_list = [npc.to_iterable_arrays(ops1) for ops1 in ops1_list]
+        ops2_list = [npc.to_iterable_arrays(ops2) for ops2 in ops2_list]
+        stacked1 = {}  # site -> `ops1` stacked along the leg 'o'
+        stacked2 = {}  # site -> `ops2` stacked along the leg 'o'
+        for i in set(sites1):
+            stacked1[i] = self._stack_ops(ops1_list, i)
+        for j in set(sites2):
+            stacked2[j] = self._stack_ops(ops2_list, j)
+        C = np.empty((len(ops1_list), len(ops2_list), len(sites1), len(sites2)), dtype=np.complex)
+        for x, i in enumerate(sites1):
+            # j > i
+            mask = sites2 > i
+            if np.any(mask):
+                C[:, :, x, mask] = self._corr_up_diag_stacked(stacked1[i], stacked2, i,
+                                                              sites2[mask], opstr,
+                                                              str_on_first, True)
+            # j == i
+            mask = sites2 == i
+            if np.any(mask):
+                C[:, :, x, mask] = self._corr_onsite_stacked(stacked1[i], stacked2[i],
+                                                             i)[:, :, np.newaxis]
+        #  j < i
+        for y, j in enumerate(sites2):
+            mask = sites1 > j
+            if np.any(mask):
+                C_T = self._corr_up_diag_stacked(stacked2[j], stacked1, j, sites1[mask], opstr,
+                                                 str_on_first, False)
+                C[:, :, mask, y] = C_T.transpose([1, 0, 2])
+        return [np.real_if_close(C[a, b]) for a, b in pair_indices]
+
+    def correlation_function_long_range(self,
+                                        ops1,
+                                        ops2,
+                                        i,
+                                        distances,
+                                        opstr=None,
+                                        num_ev=10,
+                                        tol=1.e-10):
+        r"""Correlation function ``<psi|op1_i op2_{i+d}|psi>`` for (very) large distances `d`.
+
+        Works only for infinite MPS. Instead of walking site by site from `i` to ``i + d``
+        like :meth:`correlation_function`, we walk exactly only to the end of the unit cell
+        containing `i` and from the beginning of the unit cell containing ``j = i + d`` to `j`.
+        The ``m`` full unit cells in between are given by the `m`-th power of the
+        :class:`TransferMatrix` `T` of the unit cell, which we evaluate with the `num_ev`
+        dominant left and right eigenvectors of `T`::
+
+            |    <C| T^m |R_j>  ~=  sum_{a,b} <C|r_a> eta_a^m (M^{-1})_{a,b} <l_b|R_j>
+
+        where ``M[b, a] = <l_b|r_a>`` is the overlap of the left and right eigenvectors.
+        After the diagonalization, each distance costs ``O(num_ev)`` independent of `d`, and
+        the parts ``R_j`` are only calculated once for each site in the unit cell.
+
+        The neglected eigenvalues are at most ``|eta_{num_ev}|`` in magnitude, so we fall back
+        to the exact walk of :meth:`correlation_function` for all distances with
+        ``|eta_{num_ev}|^m > tol``, in particular for ``j`` in the same or the next unit cell.
+        If `num_ev` covers all eigenvalues of the relevant charge sector, the decomposition is
+        exact for any ``m >= 0``.
+
+        Parameters
+        ----------
+        ops1 : :class:`~tenpy.linalg.np_conserved.Array` | str
+            First operator of the correlation function, acting on site `i`.
+        ops2 : (list of) { :class:`~tenpy.linalg.np_conserved.Array` | str }
+            Second operator of the correlation function; ``ops2[j]`` acts on site `j`.
+            If a list, its length needs to divide :attr:`L`.
+        i : int
+            The site of `ops1`.
+        distances : int | 1D array of int
+            The distances ``d = j - i >= 1`` for which we want the correlations.
+            A single `int` is translated to ``range(1, distances + 1)``.
+        opstr : None | (list of) { :class:`~tenpy.linalg.np_conserved.Array` | str }
+            Operator(s) to be inserted on the sites ``i <= r < j``, as for
+            :meth:`correlation_function` with ``str_on_first=True``.
+            If a list, its length needs to divide :attr:`L`. Needs to be unitary (like a
+            Jordan-Wigner string), since we apply it to a copy of `self` to get the
+            transfer matrix of the unit cell with the `opstr` inserted.
+        num_ev : int
+            Number of (left and right) eigenvectors of the transfer matrix to keep.
+        tol : float
+            Distances with ``|eta_{num_ev}|^m > tol`` are evaluated with the exact walk.
+
+        Returns
+        -------
+        C : 1D ndarray
+            The correlation function ``C[k] = <psi|ops1_i prod_{i <= r < j} opstr[r] ops2_j|psi>``
+            for ``j = i + distances[k]``.
+        """
+        if self.finite:
+            raise ValueError("only works for infinite MPS")
+        if isinstance(distances, int):
+            distances = range(1, distances + 1)
+        distances = np.asarray(distances, dtype=np.intp)
+        if np.any(distances < 1):
+            raise ValueError("need distances >= 1")
+        ops1 = npc.to_iterable_arrays(ops1)
+        ops2 = npc.to_iterable_arrays(ops2)
+        opstr = npc.to_iterable_arrays(opstr)
+        L = self.L
+        if L % len(ops2) != 0 or L % len(opstr) != 0:
+            raise ValueError("`ops2` and `opstr` need to be periodic with the unit cell")
+        i = self._to_valid_index(i)
+        js = i + distances
+        m = js // L - 1  # number of full unit cells between i and j
+        C = np.zeros(len(distances), dtype=np.complex)
+        # the part of the unit cell containing i: from i to the bond (L-1, L)
+        C_i = self._corr_left_unit_cell(ops1, opstr, i)
+        q = self.chinfo.make_valid(-C_i.qtotal)  # only R_j with this charge contribute
+        R_js = [self._corr_right_unit_cell(ops2, opstr, s) for s in range(L)]
+        R_js = [(R_j if np.all(R_j.qtotal == q) else None) for R_j in R_js]
+        m_exact = 0  # distances with ``m < m_exact`` are evaluated with the exact walk
+        if np.any(m >= 0) and any([R_j is not None for R_j in R_js]):
+            # the transfer matrix of the unit cell, including the `opstr`
+            ket = self
+            if any([op is not None for op in opstr]):
+                ket = self.copy()
+                for r in range(L):
+                    op = self.get_op(opstr, r)
+                    if op is not None:
+                        ket.apply_local_op(r, op, unitary=True)
+            TL = TransferMatrix(self, ket, transpose=True, charge_sector=C_i.qtotal, form='B')
+            eta_L, l_vecs = TL.eigenvectors(num_ev)
+            TR = TransferMatrix(self, ket, transpose=False, charge_sector=q, form='B')
+            eta_R, r_vecs = TR.eigenvectors(num_ev)
+            n_ev = min(len(eta_L), len(eta_R))
+            eta_R = eta_R[:n_ev]
+            l_vecs = [l.split_legs() for l in l_vecs[:n_ev]]  # legs 'vR*', 'vR'
+            r_vecs = [r.split_legs() for r in r_vecs[:n_ev]]  # legs 'vL', 'vL*'
+            axes = [['vR*', 'vR'], ['vL*', 'vL']]
+            M = np.array([[npc.inner(l, r, axes, do_conj=False) for r in r_vecs]
+                          for l in l_vecs])
+            c = np.array([npc.inner(C_i, r, axes, do_conj=False) for r in r_vecs])
+            if n_ev < TR.flat_linop.shape[0]:
+                eta_min = min(np.abs(eta_L[n_ev - 1]), np.abs(eta_R[n_ev - 1]))
+                m_exact = np.inf if eta_min >= 1. else np.ceil(np.log(tol) / np.log(eta_min))
+            for s, R_j in enumerate(R_js):
+                mask = np.logical_and(js % L == s, m >= m_exact)
+                if R_j is None or not np.any(mask):
+                    continue  # vanishes by charge conservation or evaluated exactly
+                d = np.array([npc.inner(l, R_j, axes, do_conj=False) for l in l_vecs])
+                x = np.linalg.solve(M, d)
+                C[mask] = np.sum(c * x * eta_R[np.newaxis, :]**m[mask, np.newaxis], axis=1)
+        # short distances: exact walk
+        exact = m < m_exact
+        if np.any(exact):
+            j_exact = np.unique(js[exact])
+            C_exact = self._corr_up_diag(ops1, ops2, i, j_exact, opstr, True, True)
+            C[exact] = np.array(C_exact)[np.searchsorted(j_exact, js[exact])]
+        return np.real_if_close(C)
+
     def norm_test(self):
         """Check that self is in canonical form.
 
@@ -2118,13 +2360,13 @@ class MPS:
         assert (not self.finite)
         T = TransferMatrix(self, self, charge_sector=charge_sector, form='B')
         num = max(target + 1, self._transfermatrix_keep)
-        E, _ = T.eigenvectors(num, which='LM')
+        E, _ = self._transfermatrix_eigenvectors_warm(T, num)
         E = E[np.argsort(-np.abs(E))]  # sort descending by magnitude
         if charge_sector is not None and charge_sector != 0:
             # need also dominant eigenvector: include 0 charge sector to results
             del T
             T = TransferMatrix(self, self, charge_sector=0, form='B')
-            E0, _ = T.eigenvectors(num, which='LM')
+            E0, _ = self._transfermatrix_eigenvectors_warm(T, num)
             assert abs(E0[0]) > abs(E[0]), "dominant eigenvector in zero charge sector?"
             E = np.array([E0[0]] + list(E))
         if abs(E[0] - 1.) > tol_ev0:
@@ -2656,6 +2898,130 @@ class MPS:
                 C = npc.tensordot(B.conj(), C, axes=[['vL*', 'p*'], ['vR*', 'p']])
         return res
 
+    def _stack_ops(self, ops_list, i):
+        """Stack the operators ``self.get_op(ops, i) for ops in ops_list`` along a new leg 'o'.
+
+        Returns an Array with legs ``'o', 'p', 'p*'``; the leg 'o' carries the (opposite) charges
+        of the operators, such that operators of different charges can be stacked.
+        """
+        ops = [self.get_op(ops, i).transpose(['p', 'p*']) for ops in ops_list]
+        grid_legs = npc.detect_grid_outer_legcharge(ops, [None])
+        stacked = npc.grid_outer(ops, grid_legs)
+        stacked.iset_leg_labels(['o', 'p', 'p*'])
+        return stacked
+
+    def _corr_onsite_stacked(self, op1, op2, i):
+        """On-site terms ``<psi|op1 op2|psi>`` for stacked `op1`, `op2`, see :meth:`_stack_ops`.
+
+        Returns an ndarray of shape ``(op1.shape[0], op2.shape[0])``."""
+        op1 = op1.replace_label('o', 'o1')
+        op2 = op2.replace_label('o', 'o2')
+        op12 = npc.tensordot(op1, op2, axes=['p*', 'p'])
+        theta = self.get_theta(i, n=1)
+        C = npc.tensordot(op12, theta, axes=['p*', 'p0'])
+        other_p = [p + '0' for p in self._p_label[1:]]  # e.g. 'q0' for PurificationMPS
+        C = npc.tensordot(theta.conj(),
+                          C,
+                          axes=[['p0*', 'vL*', 'vR*'] + [p + '*' for p in other_p],
+                                ['p', 'vL', 'vR'] + other_p])
+        return C.transpose(['o1', 'o2']).to_ndarray()
+
+    def _corr_up_diag_stacked(self, op1, stacked2, i, j_gtr, opstr, str_on_first,
+                              apply_opstr_first):
+        """Like :meth:`_corr_up_diag`, but for stacked operators, see :meth:`_stack_ops`.
+
+        `op1` is the stacked operator on site `i`, `stacked2` a dictionary `j` -> stacked operator
+        for the sites in `j_gtr`. Returns an ndarray ``C[a, b, k]`` for the `a`-th operator of
+        `op1` on site `i` and the `b`-th operator in ``stacked2[j_gtr[k]]``.
+        """
+        op1 = op1.replace_label('o', 'o1')
+        opstr1 = self.get_op(opstr, i)
+        if opstr1 is not None:
+            axes = ['p*', 'p'] if apply_opstr_first else ['p', 'p*']
+            op1 = npc.tensordot(op1, opstr1, axes=axes)
+        theta = self.get_theta(i, n=1)
+        other_p = self._p_label[1:]  # e.g. 'q' for PurificationMPS
+        C = npc.tensordot(op1, theta, axes=['p*', 'p0'])
+        C = npc.tensordot(theta.conj(),
+                          C,
+                          axes=[['p0*', 'vL*'] + [p + '0*' for p in other_p],
+                                ['p', 'vL'] + [p + '0' for p in other_p]])
+        # C has legs 'vR*', 'o1', 'vR'
+        contr_B = [['vL*'] + [p + '*' for p in self._p_label], ['vR*'] + self._p_label]
+        js = list(j_gtr[::-1])  # stack of j, sorted *descending*
+        res = []
+        for r in range(i + 1, js[0] + 1):  # js[0] is the maximum
+            B = self.get_B(r, form='B')
+            C = npc.tensordot(C, B, axes=['vR', 'vL'])
+            if r == js[-1]:
+                op2 = stacked2[r].replace_label('o', 'o2')
+                Cij = npc.tensordot(op2, C, axes=['p*', 'p'])
+                Cij = npc.tensordot(B.conj(),
+                                    Cij,
+                                    axes=[contr_B[0] + ['vR*'], contr_B[1] + ['vR']])
+                res.append(Cij.transpose(['o1', 'o2']).to_ndarray())
+                js.pop()
+            if len(js) > 0:
+                op = self.get_op(opstr, r)
+                if op is not None:
+                    C = npc.tensordot(op, C, axes=['p*', 'p'])
+                C = npc.tensordot(B.conj(), C, axes=contr_B)
+        return np.stack(res, axis=-1)
+
+    def _corr_left_unit_cell(self, ops1, opstr, i):
+        """Contract ``ops1`` on site `i` and `opstr` on ``i <= r < L`` from the left.
+
+        Returns the (generalized) `LP` with legs ``'vR*', 'vR'`` on the bond ``(L-1, L)``."""
+        other_p = self._p_label[1:]  # e.g. 'q' for PurificationMPS
+        op1 = self.get_op(ops1, i)
+        opstr1 = self.get_op(opstr, i)
+        if opstr1 is not None:
+            op1 = npc.tensordot(op1, opstr1, axes=['p*', 'p'])
+        theta = self.get_theta(i, n=1)
+        C = npc.tensordot(op1, theta, axes=['p*', 'p0'])
+        C = npc.tensordot(theta.conj(),
+                          C,
+                          axes=[['p0*', 'vL*'] + [p + '0*' for p in other_p],
+                                ['p', 'vL'] + [p + '0' for p in other_p]])
+        contr_B = [['vL*'] + self._get_p_label('*'), ['vR*'] + self._p_label]
+        for r in range(i + 1, self.L):
+            B = self.get_B(r, form='B')
+            C = npc.tensordot(C, B, axes=['vR', 'vL'])
+            op = self.get_op(opstr, r)
+            if op is not None:
+                C = npc.tensordot(op, C, axes=['p*', 'p'])
+            C = npc.tensordot(B.conj(), C, axes=contr_B)
+        return C
+
+    def _corr_right_unit_cell(self, ops2, opstr, j):
+        """Contract ``ops2`` on site `j` and `opstr` on ``0 <= r < j`` from the right.
+
+        Returns the (generalized) `RP` with legs ``'vL', 'vL*'`` on the bond ``(-1, 0)``."""
+        contr_B = [self._p_label + ['vR'], self._get_p_label('*') + ['vR*']]
+        B = self.get_B(j, form='B')
+        R = npc.tensordot(self.get_op(ops2, j), B, axes=['p*', 'p'])
+        R = npc.tensordot(R, B.conj(), axes=contr_B)
+        contr_B = [self._p_label + ['vL*'], self._get_p_label('*') + ['vR*']]
+        for r in reversed(range(0, j)):
+            B = self.get_B(r, form='B')
+            R = npc.tensordot(B, R, axes=['vR', 'vL'])
+            op = self.get_op(opstr, r)
+            if op is not None:
+                R = npc.tensordot(op, R, axes=['p*', 'p'])
+            R = npc.tensordot(R, B.conj(), axes=contr_B)
+        return R
+
+    def _transfermatrix_eigenvectors_warm(self, TM, num_ev):
+        """Call ``TM.eigenvectors(num_ev)``, warm-started with :attr:`_transfermatrix_guess`."""
+        charge_sector = TM.flat_linop.charge_sector
+        if charge_sector is None:
+            return TM.eigenvectors(num_ev, which='LM')
+        key = charge_sector.tobytes()
+        guess = self._transfermatrix_guess.get(key, None)
+        eta, V = TM.eigenvectors(num_ev, which='LM', v0=guess)
+        self._transfermatrix_guess[key] = V[0]
+        return eta, V
+
     def _canonical_form_dominant_gram_matrix(self, bond0, transpose, tol_xi, guess=None):
         """Find dominant eigenvector of the transfer matrix starting between sites (bond0-1,bond0).
 
@@ -2846,6 +3212,11 @@ class MPSEnvironment:
         The number of physical sites involved into the contraction yielding `firstLP`.
     age_RP : int
         The number of physical sites involved into the contraction yielding `lastRP`.
+    storage : ``None`` | dict
+        If ``None``, keep all the `LP` and `RP` in RAM.
+        Otherwise, store them in an :class:`~tenpy.tools.cache.OutOfCoreList` (each),
+        with `storage` as its parameters. This keeps only the recently used ones in RAM and
+        spills the others to disk.
 
     Attributes
     ----------
@@ -2855,11 +3226,11 @@ class MPSEnvironment:
         The two MPS for the contraction.
     dtype : type
         The data type.
-    _LP : list of {``None`` | :class:`~tenpy.linalg.np_conserved.Array`}
+    _LP : list | :class:`~tenpy.tools.cache.OutOfCoreList` of {``None`` | :class:`Array`}
         Left parts of the environment, len `L`.
         ``LP[i]`` contains the contraction strictly left of site `i`
         (or ``None``, if we don't have it calculated).
-    _RP : list of {``None`` | :class:`~tenpy.linalg.np_conserved.Array`}
+    _RP : list | :class:`~tenpy.tools.cache.OutOfCoreList` of {``None`` | :class:`Array`}
         Right parts of the environment, len `L`.
         ``RP[i]`` contains the contraction strictly right of site `i`
         (or ``None``, if we don't have it calculated).
@@ -2873,7 +3244,7 @@ class MPSEnvironment:
         network which yields ``self._RP[i]``.
     """
 
-    def __init__(self, bra, ket, init_LP=None, init_RP=None, age_LP=0, age_RP=0):
+    def __init__(self, bra, ket, init_LP=None, init_RP=None, age_LP=0, age_RP=0, storage=None):
         if ket is None:
             ket = bra
         if ket is not bra:
@@ -2883,10 +3254,7 @@ class MPSEnvironment:
         self.dtype = np.find_common_type([bra.dtype, ket.dtype], [])
         self.L = L = bra.L
         self.finite = bra.finite
-        self._LP = [None] * L
-        self._RP = [None] * L
-        self._LP_age = [None] * L
-        self._RP_age = [None] * L
+        self._init_storage(storage)
         if init_LP is None:
             init_LP = self.ket.init_LP(0, bra)
         self.set_LP(0, init_LP, age=age_LP)
@@ -3003,6 +3371,20 @@ class MPSEnvironment:
         self._RP[i] = RP
         self._RP_age[i] = age
 
+    def prefetch_LP(self, i):
+        """Hint that `LP` at site `i` will be needed soon.
+
+        If the environment is stored in an :class:`~tenpy.tools.cache.OutOfCoreList`,
+        this starts loading the `LP` from disk in the background. Otherwise, it does nothing.
+        """
+        if isinstance(self._LP, OutOfCoreList):
+            self._LP.prefetch(self._to_valid_index(i))
+
+    def prefetch_RP(self, i):
+        """Hint that `RP` at site `i` will be needed soon, see :meth:`prefetch_LP`."""
+        if isinstance(self._RP, OutOfCoreList):
+            self._RP.prefetch(self._to_valid_index(i))
+
     def del_LP(self, i):
         """Delete stored part strictly to the left of site `i`."""
         i = self._to_valid_index(i)
@@ -3136,6 +3518,18 @@ class MPSEnvironment:
             E.append(npc.inner(theta_bra, C, axes=[th_labels] * 2, do_conj=True))
         return np.real_if_close(np.array(E)) * self.bra.norm * self.ket.norm
 
+    def _init_storage(self, storage):
+        """Initialize `_LP`, `_RP` and their ages with ``None``."""
+        L = self.L
+        if storage is None:
+            self._LP = [None] * L
+            self._RP = [None] * L
+        else:
+            self._LP = OutOfCoreList(L, storage)
+            self._RP = OutOfCoreList(L, storage)
+        self._LP_age = [None] * L
+        self._RP_age = [None] * L
+
     def _contract_LP(self, i, LP):
         """Contract LP with the tensors on site `i` to form ``self._LP[i+1]``"""
         LP = npc.tensordot(LP, self.ket.get_B(i, form='A'), axes=('vR', 'vL'))
@@ -3157,6 +3551,74 @@ class MPSEnvironment:
         return self.ket._to_valid_index(i)
 
 
+class _FlatTransferMatrix(sparse.FlatLinearOperator):
+    """:class:`~tenpy.linalg.sparse.FlatLinearOperator` for the :class:`TransferMatrix`.
+
+    The flat vectors of the selected charge sector are converted directly to (and from) the
+    blocks of the vector with split legs `label_split`, without going through the LegPipe.
+    The block layout is determined once for each charge sector, such that the `npc_matvec`
+    always gets vectors with the same ``_qdata`` and can reuse its contraction plans.
+
+    Parameters
+    ----------
+    npc_matvec, leg, dtype, charge_sector, vec_label :
+        See :class:`~tenpy.linalg.sparse.FlatLinearOperator`; `leg` is the LegPipe.
+    label_split : list of str
+        The labels of the split legs of `leg`.
+
+    Attributes
+    ----------
+    label_split : list of str
+        The labels of the split legs of `leg`.
+    _layouts : dict
+        Charge sector (as bytes) -> ``(legs, qtotal, qdata, indices)``, where ``indices[k]``
+        are the indices of the flat vector in the `k`-th block of the split vector.
+    """
+
+    def __init__(self, npc_matvec, leg, label_split, dtype, charge_sector=0, vec_label=None):
+        self.label_split = label_split
+        self._layouts = {}
+        sparse.FlatLinearOperator.__init__(self, npc_matvec, leg, dtype, charge_sector, vec_label)
+
+    def _matvec(self, vec):
+        if self._charge_sector is None:
+            return sparse.FlatLinearOperator._matvec(self, vec)
+        vec = np.asarray(vec)
+        if vec.ndim != 1:
+            vec = np.squeeze(vec, axis=1)  # need a vector, not a Nx1 matrix
+        legs, qtotal, qdata, indices = self._get_layout()
+        npc_vec = npc.Array(legs, vec.dtype, qtotal)
+        npc_vec._data = [vec[ind] for ind in indices]
+        npc_vec._qdata = qdata.copy()
+        npc_vec._qdata_sorted = False
+        npc_vec.iset_leg_labels(self.label_split)
+        npc_vec = self.npc_matvec(npc_vec)  # apply the transfer matrix
+        self.matvec_count += 1
+        npc_vec.itranspose(self.label_split)
+        # the legs of the result are the same as before (up to the LegCharge instances)
+        blocks = dict(zip([tuple(qi) for qi in npc_vec._qdata], npc_vec._data))
+        result = np.zeros(self.shape[0], npc_vec.dtype)
+        for qi, ind in zip(qdata, indices):
+            block = blocks.get(tuple(qi), None)
+            if block is not None:
+                result[ind] = block
+        return result
+
+    def _get_layout(self):
+        """Block layout of the vector with split legs for the current charge sector."""
+        key = self._charge_sector.tobytes()
+        layout = self._layouts.get(key, None)
+        if layout is None:
+            # find out where the flat indices end up by converting ``1, 2, ..., n``
+            flat_indices = np.arange(1, self.shape[0] + 1, dtype=np.float)
+            vec = self.flat_to_npc(flat_indices).split_legs(0)
+            vec.itranspose(self.label_split)
+            indices = [np.rint(block).astype(np.intp) - 1 for block in vec._data]
+            layout = (vec.legs, vec.qtotal, vec._qdata.copy(), indices)
+            self._layouts[key] = layout
+        return layout
+
+
 class TransferMatrix(sparse.NpcLinearOperator):
     r"""Transfer matrix of two MPS (bra & ket).
 
@@ -3229,6 +3691,10 @@ class TransferMatrix(sparse.NpcLinearOperator):
         The matrices of the ket, transposed for fast `matvec`.
     _contract_legs : int
         Number of physical legs per site + 1.
+    _plan_cache : :class:`~tenpy.linalg.np_conserved.TensordotPlanCache`
+        Contraction plans for the tensordots in :meth:`matvec`.
+        Since :attr:`flat_linop` acts on vectors with a fixed block layout (for each charge
+        sector), the same `2 L` plans can be reused in each iteration of :meth:`eigenvectors`.
     """
 
     def __init__(self,
@@ -3278,7 +3744,9 @@ class TransferMatrix(sparse.NpcLinearOperator):
         dtype = np.promote_types(bra.dtype, ket.dtype)
         self.pipe = pipe
         self.label_split = label_split
-        self.flat_linop = sparse.FlatLinearOperator(self.matvec, pipe, dtype, charge_sector, label)
+        self.flat_linop = _FlatTransferMatrix(self.matvec, pipe, label_split, dtype, charge_sector,
+                                              label)
+        self._plan_cache = npc.TensordotPlanCache(max_size=4 * L)
         self.qtotal = bra.chinfo.make_valid(np.sum([B.qtotal for B in M + N], axis=0))
         self._contract_legs = len(ket._p_label) + 1  # for a ususal MPS: 2
 
@@ -3306,15 +3774,18 @@ class TransferMatrix(sparse.NpcLinearOperator):
         qtotal = vec.qtotal
         legs = vec.legs
         contract = self._contract_legs  # number of physical legs per site + 1
+        plans = self._plan_cache
         # the actual work
         if not self.transpose:  # right to left
             for N, M in zip(self._bra_N, self._ket_M):
-                vec = npc.tensordot(M, vec, axes=1)  # axes=['vR', 'vL']
-                vec = npc.tensordot(vec, N, axes=contract)  # [['p', 'vL*'], ['p*', 'vR*']]
+                vec = npc.tensordot(M, vec, axes=1, plan_cache=plans)  # axes=['vR', 'vL']
+                # axes=[['p', 'vL*'], ['p*', 'vR*']]
+                vec = npc.tensordot(vec, N, axes=contract, plan_cache=plans)
         else:  # left to right
             for N, M in zip(self._bra_N, self._ket_M):
-                vec = npc.tensordot(vec, M, axes=1)  # axes=['vR', 'vL']
-                vec = npc.tensordot(N, vec, axes=contract)  # [['vL*', 'p*'], ['vR*', 'p']])
+                vec = npc.tensordot(vec, M, axes=1, plan_cache=plans)  # axes=['vR', 'vL']
+                # axes=[['vL*', 'p*'], ['vR*', 'p']]
+                vec = npc.tensordot(N, vec, axes=contract, plan_cache=plans)
         if np.any(self.qtotal != 0):
             # Hack: replace leg charges and qtotal -> effectively gauge `self.qtotal` away.
             vec.qtotal = qtotal
@@ -3324,6 +3795,16 @@ class TransferMatrix(sparse.NpcLinearOperator):
             vec = vec.combine_legs([0, 1], pipes=pipe)
         return vec
 
+    def _fits_vector(self, vec):
+        """Whether `vec` (with a LegPipe) fits to :attr:`pipe` and the selected charge sector."""
+        charge_sector = self.flat_linop.charge_sector
+        leg = vec.legs[0]
+        if vec.rank != 1 or leg.ind_len != self.pipe.ind_len or leg.qconj != self.pipe.qconj:
+            return False
+        if charge_sector is not None and np.any(vec.qtotal != charge_sector):
+            return False
+        return np.array_equal(leg.to_qflat(), self.pipe.to_qflat())
+
     def initial_guess(self, diag=1.):
         """Return a diagonal matrix as initial guess for the eigenvector.
 
@@ -3363,6 +3844,11 @@ class TransferMatrix(sparse.NpcLinearOperator):
             After the first `NoConvergenceError` we increase the `tol` argument to that value.
         which : str
             Which eigenvalues to look for, see `scipy.sparse.linalg.speigs`.
+        v0 : :class:`~tenpy.linalg.np_conserved.Array` | None
+            Initial guess (with the LegPipe :attr:`pipe`) to warm-start the implicitly restarted
+            Arnoldi iteration, e.g. the dominant eigenvector of a previous call for a slightly
+            different MPS. Ignored if it doesn't fit to the :attr:`pipe` or the charge sector,
+            e.g. because the bond dimension has changed in the meantime.
         **kwargs :
             Further keyword arguments are given to :func:`~tenpy.tools.math.speigs`.
 
@@ -3375,6 +3861,8 @@ class TransferMatrix(sparse.NpcLinearOperator):
         """
         if max_num_ev is None:
             max_num_ev = num_ev + 2
+        if v0 is not None and not self._fits_vector(v0):
+            v0 = None
         flat_linop = self.flat_linop
         if flat_linop.charge_sector is None:
             # Try for all charge sectors
@@ -301,29 +301,14 @@ class PurificationMPS(MPS):
         elif legs == 'q':
             tr_legs = labels(['p'])
             comb_legs = labels(['q'])
-        contr_rho = (
-            ['vR*'] + self._get_p_label('1'),  # 'vL', 'p1'
-            ['vL*'] + self._get_p_label('1*'))  # 'vL*', 'p1*'
-        mutinf = []
-        coord = []
-        for i in range(self.L):
-            rho = self.get_theta(i, 1)
-            rho = npc.tensordot(rho, rho.conj(), axes=('vL', 'vL*'))
-            jmax = i + max_range + 1
-            if self.finite:
-                jmax = min(jmax, self.L)
-            for j in range(i + 1, jmax):
-                B = self.get_B(j, form='B', label_p='1')  # 'vL', 'vR', 'p1'
-                rho = npc.tensordot(rho, B, axes=['vR', 'vL'])
-                rho_ij = npc.tensordot(rho, B.conj(), axes=(['vR*', 'vR'], ['vL*', 'vR*']))
-                for a, b in zip(*tr_legs):
-                    rho_ij = npc.trace(rho_ij, a, b)
-                rho_ij = rho_ij.combine_legs(comb_legs, qconj=[+1, -1])
-                S_ij = entropy(npc.eigvalsh(rho_ij), n)
-                mutinf.append(S_i[i] + S_i[j % self.L] - S_ij)
-                coord.append((i, j))
-                if j + 1 < jmax:
-                    rho = npc.tensordot(rho, B.conj(), axes=contr_rho)
+        coord, rhos = [], []
+        for i, j, rho_ij in self._iter_rho_two_site(max_range):
+            for a, b in zip(*tr_legs):
+                rho_ij = npc.trace(rho_ij, a, b)
+            coord.append((i, j))
+            rhos.append(rho_ij.combine_legs(comb_legs, qconj=[+1, -1]))
+        S_ij = [entropy(w, n) for w in npc.eigvalsh_batch(rhos)]
+        mutinf = [S_i[i] + S_i[j % self.L] - S for (i, j), S in zip(coord, S_ij)]
         return np.array(coord), np.array(mutinf)
 
     def swap_sites(self, i, swapOP='auto', trunc_par={}):
@@ -16,9 +16,11 @@ Common to all tools is that they are not just useful for a single algorithm but
     string
     process
     optimization
+    cache
+    io
 """
 # Copyright 2018 TeNPy Developers
 
-from . import fit, math, misc, params, process, string, optimization
+from . import fit, math, misc, params, process, string, optimization, cache, io
 
-__all__ = ['fit', 'math', 'misc', 'params', 'process', 'string', 'optimization']
+__all__ = ['fit', 'math', 'misc', 'params', 'process', 'string', 'optimization', 'cache', 'io']
@@ -0,0 +1,189 @@
+"""List-like storage of large objects which spills them to disk if they don't fit into RAM.
+
+This is used e.g. for the environment tensors `LP` and `RP` in
+:class:`~tenpy.networks.mps.MPSEnvironment`: for long finite chains and large bond dimensions,
+the environments alone might exceed the available memory, but a sweep only needs the ones
+around the current position. :class:`OutOfCoreList` keeps the most recently used entries in RAM
+(up to a given budget), saves the others with :mod:`pickle` in a local cache directory,
+and allows to :meth:`~OutOfCoreList.prefetch` entries which will be needed soon in a background
+thread.
+"""
+# Copyright 2018 TeNPy Developers
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .params import get_parameter
+
+__all__ = ['OutOfCoreList']
+
+
+class OutOfCoreList:
+    """List-like container keeping at most `max_memory` bytes in RAM and the rest on disk.
+
+    Supports ``len(obj)``, iteration, and getting/setting entries with ``obj[i]``
+    for non-negative integer indices, where ``obj[i] = None`` deletes the entry.
+    The entries are not copied: if an object is still in RAM, ``obj[i]`` returns the object
+    given before. Hence, an object must not be modified in place after setting it,
+    since the modifications might get lost when it is saved to disk.
+
+    Parameters
+    ----------
+    length : int
+        Number of entries, all initialized to ``None``.
+    params : dict
+        Further optional parameters as described in the following table.
+
+        ============ ============= ==========================================================
+        key          type          description
+        ============ ============= ==========================================================
+        directory    str | None    Directory in which a (temporary) sub-directory for the
+                                   files is created. ``None`` defaults to the system's
+                                   default for temporary files, see :mod:`tempfile`.
+        ------------ ------------- ----------------------------------------------------------
+        max_memory   int           Budget in bytes for the entries kept in RAM.
+                                   The most recently used entry is always kept in RAM,
+                                   even if it is larger.
+        ------------ ------------- ----------------------------------------------------------
+        prefetch     bool          Whether :meth:`prefetch` loads entries in a background
+                                   thread. If False, :meth:`prefetch` does nothing.
+        ============ ============= ==========================================================
+
+    Attributes
+    ----------
+    directory : str
+        The (temporary) directory containing the files, removed by :meth:`close`.
+    max_memory : int
+        Budget in bytes for the entries kept in RAM.
+    _memory : OrderedDict
+        The entries in RAM, ordered from least to most recently used.
+    _nbytes : dict
+        Estimated size in bytes for each of the entries in `_memory`.
+    _on_disk : set
+        Indices of entries for which the file in :attr:`directory` is up to date.
+    _pending : dict
+        Indices of entries currently loaded by :meth:`prefetch`, mapping to the future.
+    _pool : :class:`~concurrent.futures.ThreadPoolExecutor` | None
+        A single thread used for :meth:`prefetch`.
+    """
+
+    def __init__(self, length, params={}):
+        self._length = length
+        directory = get_parameter(params, 'directory', None, 'OutOfCoreList')
+        self.max_memory = get_parameter(params, 'max_memory', 2**30, 'OutOfCoreList')
+        prefetch = get_parameter(params, 'prefetch', True, 'OutOfCoreList')
+        self.directory = tempfile.mkdtemp(prefix='tenpy_cache_', dir=directory)
+        self._memory = OrderedDict()
+        self._nbytes = {}
+        self._on_disk = set()
+        self._pending = {}
+        self._pool = ThreadPoolExecutor(max_workers=1) if prefetch else None
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self[i]
+
+    def __getitem__(self, i):
+        i = self._check_index(i)
+        if i in self._pending:
+            obj = self._pending.pop(i).result()  # (re-raises exceptions)
+            self._to_memory(i, obj)
+        elif i in self._memory:
+            obj = self._memory[i]
+            self._memory.move_to_end(i)
+        elif i in self._on_disk:
+            obj = self._load(i)
+            self._to_memory(i, obj)
+        else:
+            obj = None
+        return obj
+
+    def __setitem__(self, i, obj):
+        i = self._check_index(i)
+        self._forget(i)
+        if obj is not None:
+            self._to_memory(i, obj)
+
+    def prefetch(self, i):
+        """Start loading entry `i` from disk in a background thread, if it isn't in RAM."""
+        i = self._check_index(i)
+        if self._pool is None or i in self._memory or i in self._pending:
+            return
+        if i in self._on_disk:
+            self._pending[i] = self._pool.submit(self._load, i)
+
+    def in_memory(self):
+        """Return the indices of the entries currently kept in RAM."""
+        return list(self._memory.keys())
+
+    def close(self):
+        """Remove the files on disk. Afterwards, only the entries in RAM are kept."""
+        for i in list(self._pending):
+            self[i]  # finish loading
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self._on_disk = set()
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __del__(self):
+        self.close()
+
+    def _check_index(self, i):
+        i = int(i)
+        if not 0 <= i < self._length:
+            raise IndexError("index {0:d} out of range".format(i))
+        return i
+
+    def _filename(self, i):
+        return os.path.join(self.directory, "{0:d}.pkl".format(i))
+
+    def _load(self, i):
+        with open(self._filename(i), 'rb') as f:
+            return pickle.load(f)
+
+    def _forget(self, i):
+        """Remove entry `i` from RAM and disk."""
+        if i in self._pending:
+            self._pending.pop(i).result()  # wait before removing the file
+        if i in self._memory:
+            del self._memory[i]
+            del self._nbytes[i]
+        if i in self._on_disk:
+            self._on_disk.remove(i)
+            os.remove(self._filename(i))
+
+    def _to_memory(self, i, obj):
+        """Put `obj` as most recently used entry `i` in RAM and spill older ones if necessary."""
+        self._memory[i] = obj
+        self._memory.move_to_end(i)
+        self._nbytes[i] = _estimate_nbytes(obj)
+        total = sum(self._nbytes.values())
+        while total > self.max_memory and len(self._memory) > 1:
+            j, old = self._memory.popitem(last=False)  # least recently used
+            total -= self._nbytes.pop(j)
+            if j not in self._on_disk:  # otherwise the file is still up to date
+                with open(self._filename(j), 'wb') as f:
+                    pickle.dump(old, f, protocol=pickle.HIGHEST_PROTOCOL)
+                self._on_disk.add(j)
+
+
+def _estimate_nbytes(obj):
+    """Estimate the memory used by `obj`, taking into account the blocks of npc Arrays."""
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    data = getattr(obj, '_data', None)  # :class:`~tenpy.linalg.np_conserved.Array`
+    if isinstance(data, list):
+        return sum([np.asarray(t).nbytes for t in data])
+    return sys.getsizeof(obj)
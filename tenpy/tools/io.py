@@ -0,0 +1,388 @@
+"""Binary on-disk format for :class:`~tenpy.linalg.np_conserved.Array`, MPS, MPO, etc.
+
+In contrast to :mod:`pickle`, the format written by :func:`save` stores all numpy arrays
+(in particular the blocks of an :class:`~tenpy.linalg.np_conserved.Array`) as raw data at aligned
+positions in a single file, and the structure of the saved object in an index.
+This allows to
+
+- read the data without any copies, optionally with memory-mapped reads for large arrays
+  (only loading the data from disk when it is actually accessed),
+- load only parts of a saved object, e.g., a single tensor ``'_B/3'`` of an MPS,
+- deduplicate shared objects: each :class:`~tenpy.linalg.charges.ChargeInfo`,
+  :class:`~tenpy.linalg.charges.LegCharge` or other class instance is saved only once,
+  and all references to it point to the same instance after loading,
+  just as for :mod:`pickle`.
+
+The blocks of an :class:`~tenpy.linalg.np_conserved.Array` are saved as one contiguous buffer,
+such that the loaded Array is packed (see :meth:`~tenpy.linalg.np_conserved.Array.ipack_data`).
+Instances of other classes defined in tenpy (like :class:`~tenpy.networks.mps.MPS`,
+:class:`~tenpy.networks.mpo.MPO` or :class:`~tenpy.networks.mps.MPSEnvironment`) are saved
+with their ``__getstate__()`` if defined, or their ``__dict__`` otherwise.
+Any other objects (e.g. functions, sets, or instances of classes defined outside of tenpy)
+are pickled.
+
+File layout: the magic bytes ``b'TENPY_IO'``, the data of the numpy arrays (each aligned to
+:data:`ALIGNMENT` bytes), a JSON index describing the saved object, and finally the position of
+the index as 8-byte little-endian integer.
+
+.. warning ::
+    Like :mod:`pickle`, loading a file can import modules and create instances of arbitrary
+    classes. Only load files you trust!
+"""
+# Copyright 2018 TeNPy Developers
+
+import importlib
+import json
+import pickle
+import struct
+
+import numpy as np
+
+__all__ = ['save', 'load', 'Saver', 'Loader', 'ALIGNMENT', 'FORMAT_VERSION']
+
+#: Alignment in bytes of the numpy arrays within the file.
+ALIGNMENT = 64
+
+#: Version of the file format written by :class:`Saver`.
+FORMAT_VERSION = 1
+
+_MAGIC = b'TENPY_IO'
+
+
+def save(obj, filename):
+    """Save `obj` to the file `filename`, see :class:`Saver`."""
+    with Saver(filename) as saver:
+        saver.save(obj)
+
+
+def load(filename, path='', mmap_threshold=None):
+    """Load an object saved with :func:`save`.
+
+    Parameters
+    ----------
+    filename : str
+        The file to read.
+    path : str
+        Path (separated by ``'/'``) to a part of the saved object, see :meth:`Loader.load`.
+    mmap_threshold : int | None
+        Numpy arrays (including the blocks of Arrays) with at least that many bytes are memory
+        mapped instead of being read into RAM. ``None`` disables memory mapping.
+
+    Returns
+    -------
+    obj :
+        The (part of the) saved object.
+    """
+    with Loader(filename, mmap_threshold) as loader:
+        return loader.load(path)
+
+
+class Saver:
+    """Write an object to a file in the format described in :mod:`tenpy.tools.io`.
+
+    Parameters
+    ----------
+    filename : str
+        The file to write.
+
+    Attributes
+    ----------
+    filename : str
+        The file to write.
+    _f : file
+        The opened file.
+    _memo : dict
+        Maps ``id(obj)`` of shared objects to their index in `_shared`.
+    _keep_alive : list
+        The shared objects, ensuring that their ``id`` doesn't get reused during the save.
+    _shared : list
+        Index nodes of the shared objects.
+    """
+
+    def __init__(self, filename):
+        from ..linalg import np_conserved as npc  # (import here to avoid circular imports)
+        from .cache import OutOfCoreList
+        self._Array = npc.Array
+        self._OutOfCoreList = OutOfCoreList
+        self.filename = filename
+        self._f = open(filename, 'wb')
+        self._f.write(_MAGIC)
+        self._memo = {}
+        self._keep_alive = []
+        self._shared = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._f.close()
+
+    def save(self, obj):
+        """Save `obj` and write the index. Can only be called once."""
+        root = self._node(obj)
+        index = {'format_version': FORMAT_VERSION, 'shared': self._shared, 'root': root}
+        pos = self._f.tell()
+        self._f.write(json.dumps(index).encode('utf-8'))
+        self._f.write(struct.pack('<Q', pos))
+        self._f.close()
+
+    def _node(self, obj):
+        """Return a JSON-serializable node describing `obj`."""
+        if obj is None or isinstance(obj, (bool, int, float, str)):
+            return obj
+        if isinstance(obj, complex):
+            return {'__t__': 'complex', 'real': obj.real, 'imag': obj.imag}
+        if isinstance(obj, np.ndarray):
+            if obj.dtype.hasobject:
+                return self._pickle_node(obj)
+            return self._ndarray_node(obj)
+        if isinstance(obj, np.generic):
+            return {'__t__': 'npscalar', 'dtype': obj.dtype.str, 'value': self._node(obj.item())}
+        if isinstance(obj, list):
+            return {'__t__': 'list', 'items': [self._node(o) for o in obj]}
+        if isinstance(obj, tuple):
+            return {'__t__': 'tuple', 'items': [self._node(o) for o in obj]}
+        if isinstance(obj, dict):
+            return {
+                '__t__': 'dict',
+                'keys': [self._node(k) for k in obj.keys()],
+                'values': [self._node(v) for v in obj.values()]
+            }
+        if isinstance(obj, self._Array):
+            return self._Array_node(obj)
+        if isinstance(obj, self._OutOfCoreList):
+            return self._node(list(obj))  # loaded as list
+        return self._shared_node(obj)
+
+    def _ndarray_node(self, a):
+        """Write the data of `a` at the next aligned position."""
+        a = np.ascontiguousarray(a)
+        pos = self._f.tell()
+        pad = (-pos) % ALIGNMENT
+        self._f.write(b'\0' * pad)
+        self._f.write(a.tobytes())  # (C order)
+        return {'__t__': 'ndarray', 'dtype': a.dtype.str, 'shape': list(a.shape), 'pos': pos + pad}
+
+    def _pickle_node(self, obj):
+        data = np.frombuffer(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL), np.uint8)
+        return {'__t__': 'pickle', 'data': self._ndarray_node(data)}
+
+    def _Array_node(self, a):
+        """Node for an :class:`~tenpy.linalg.np_conserved.Array`, all blocks in one buffer."""
+        buffer = a._get_buffer()
+        if buffer is None:
+            buffer = np.concatenate([np.ravel(t) for t in a._data] + [np.zeros(0, a.dtype)])
+            buffer = buffer.astype(a.dtype, copy=False)
+        return {
+            '__t__': 'npc.Array',
+            'legs': [self._node(leg) for leg in a.legs],
+            'dtype': a.dtype.str,
+            'qtotal': self._node(a.qtotal),
+            'labels': a._labels,
+            'qdata': self._node(a._qdata),
+            'qdata_sorted': bool(a._qdata_sorted),
+            'block_shapes': [list(t.shape) for t in a._data],
+            'buffer': self._ndarray_node(buffer),
+        }
+
+    def _shared_node(self, obj):
+        """Node referencing the class instance `obj` in `_shared`, which is saved only once."""
+        key = id(obj)
+        if key in self._memo:
+            return {'__t__': 'ref', 'index': self._memo[key]}
+        index = len(self._shared)
+        self._memo[key] = index
+        self._keep_alive.append(obj)
+        self._shared.append(None)  # placeholder: the state might reference `obj`
+        cls = type(obj)
+        getstate = getattr(cls, '__getstate__', None)
+        if not cls.__module__.startswith('tenpy.') or hasattr(cls, '__slots__'):
+            node = None  # we don't know how to create instances of classes outside tenpy
+        elif getstate is not None and getstate is not getattr(object, '__getstate__', None):
+            node = {'state': self._node(obj.__getstate__()), 'setstate': True}
+        elif hasattr(obj, '__dict__'):
+            node = {'state': self._node(obj.__dict__), 'setstate': False}
+        else:
+            node = None
+        if node is None:
+            node = self._pickle_node(obj)
+            self._shared[index] = node
+            return {'__t__': 'ref', 'index': index}
+        node['__t__'] = 'object'
+        node['class'] = [cls.__module__, cls.__qualname__]
+        self._shared[index] = node
+        return {'__t__': 'ref', 'index': index}
+
+
+class Loader:
+    """Read objects from a file written by :class:`Saver`.
+
+    Parameters
+    ----------
+    filename : str
+        The file to read.
+    mmap_threshold : int | None
+        Numpy arrays (including the blocks of Arrays) with at least that many bytes are memory
+        mapped (copy-on-write) instead of being read into RAM. ``None`` disables memory mapping.
+
+    Attributes
+    ----------
+    filename : str
+        The file to read.
+    mmap_threshold : int | None
+        See above.
+    index : dict
+        The index of the file.
+    _f : file
+        The opened file.
+    _mmap : :class:`numpy.memmap` | None
+        The whole file memory-mapped as bytes, created when first needed.
+    _memo : dict
+        Maps the index of the shared objects to the already loaded instances.
+    """
+
+    def __init__(self, filename, mmap_threshold=None):
+        from ..linalg import np_conserved as npc  # (import here to avoid circular imports)
+        self._Array = npc.Array
+        self.filename = filename
+        self.mmap_threshold = mmap_threshold
+        self._f = f = open(filename, 'rb')
+        if f.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError("{0!r} is not a file written by tenpy.tools.io".format(filename))
+        f.seek(-8, 2)
+        end = f.tell()
+        pos, = struct.unpack('<Q', f.read(8))
+        f.seek(pos)
+        self.index = json.loads(f.read(end - pos).decode('utf-8'))
+        if self.index['format_version'] > FORMAT_VERSION:
+            raise ValueError("File format version {0:d} is not supported".format(
+                self.index['format_version']))
+        self._mmap = None
+        self._memo = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close the file. Memory-mapped arrays stay valid."""
+        self._f.close()
+
+    def load(self, path=''):
+        """Load the saved object or a part of it.
+
+        Parameters
+        ----------
+        path : str
+            Path to the part of the object to be loaded, separated by ``'/'``.
+            Each part is an index for lists and tuples, a key (converted to str) for dictionaries
+            or the attribute name for class instances saved with their ``__dict__``.
+            For example, ``'_B/3'`` loads only the tensor on site 3 of a saved
+            :class:`~tenpy.networks.mps.MPS`. An empty path loads the whole object.
+
+        Returns
+        -------
+        obj :
+            The (part of the) saved object.
+        """
+        node = self.index['root']
+        for key in path.split('/'):
+            if key == '':
+                continue
+            node = self._find_child(node, key)
+        return self._load(node)
+
+    def _find_child(self, node, key):
+        while isinstance(node, dict) and node.get('__t__') == 'ref':
+            node = self.index['shared'][node['index']]
+        t = node.get('__t__') if isinstance(node, dict) else None
+        if t in ['list', 'tuple']:
+            return node['items'][int(key)]
+        if t == 'dict':
+            for k, v in zip(node['keys'], node['values']):
+                if str(k) == key:
+                    return v
+        if t == 'object' and not node['setstate']:
+            return self._find_child(node['state'], key)
+        raise KeyError("Can't find {0!r} in the saved object".format(key))
+
+    def _load(self, node):
+        if not isinstance(node, dict):
+            return node  # None, bool, int, float, str
+        t = node['__t__']
+        if t == 'ndarray':
+            return self._load_ndarray(node)
+        if t == 'list':
+            return [self._load(n) for n in node['items']]
+        if t == 'tuple':
+            return tuple([self._load(n) for n in node['items']])
+        if t == 'dict':
+            return dict(zip([self._load(k) for k in node['keys']],
+                            [self._load(v) for v in node['values']]))
+        if t == 'npc.Array':
+            return self._load_Array(node)
+        if t == 'ref':
+            return self._load_shared(node['index'])
+        if t == 'complex':
+            return complex(node['real'], node['imag'])
+        if t == 'npscalar':
+            return np.dtype(node['dtype']).type(self._load(node['value']))
+        if t == 'pickle':
+            return pickle.loads(self._load_ndarray(node['data']).tobytes())
+        raise ValueError("unknown node type " + repr(t))
+
+    def _load_ndarray(self, node):
+        dtype = np.dtype(node['dtype'])
+        shape = tuple(node['shape'])
+        pos = node['pos']
+        count = int(np.prod(shape))
+        nbytes = count * dtype.itemsize
+        if self.mmap_threshold is not None and nbytes >= self.mmap_threshold and nbytes > 0:
+            if self._mmap is None:
+                self._mmap = np.memmap(self.filename, dtype=np.uint8, mode='c')
+            return np.asarray(self._mmap[pos:pos + nbytes]).view(dtype).reshape(shape)
+        self._f.seek(pos)
+        return np.fromfile(self._f, dtype, count).reshape(shape)
+
+    def _load_Array(self, node):
+        res = self._Array.__new__(self._Array)
+        res.legs = [self._load(leg) for leg in node['legs']]
+        res.chinfo = res.legs[0].chinfo
+        res._set_shape()
+        res.dtype = np.dtype(node['dtype'])
+        res.qtotal = self._load(node['qtotal'])
+        res._labels = list(node['labels'])
+        res._qdata = self._load(node['qdata'])
+        res._qdata_sorted = node['qdata_sorted']
+        buffer = self._load(node['buffer'])
+        sizes = [int(np.prod(shape)) for shape in node['block_shapes']]
+        offsets = np.zeros(len(sizes) + 1, np.intp)
+        np.cumsum(sizes, out=offsets[1:])
+        blocks = [
+            buffer[i0:i1].reshape(shape)
+            for shape, i0, i1 in zip(node['block_shapes'], offsets[:-1], offsets[1:])
+        ]
+        res._data = blocks
+        res._buffer = (buffer, offsets, tuple(blocks))
+        return res
+
+    def _load_shared(self, index):
+        if index in self._memo:
+            return self._memo[index]
+        node = self.index['shared'][index]
+        if node['__t__'] == 'pickle':
+            obj = self._memo[index] = self._load(node)
+            return obj
+        module, qualname = node['class']
+        cls = importlib.import_module(module)
+        for name in qualname.split('.'):
+            cls = getattr(cls, name)
+        obj = self._memo[index] = cls.__new__(cls)  # before loading the state: allow cycles
+        state = self._load(node['state'])
+        if node['setstate'] and hasattr(obj, '__setstate__'):
+            obj.__setstate__(state)
+        else:
+            obj.__dict__.update(state)
+        return obj
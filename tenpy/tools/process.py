@@ -12,19 +12,40 @@ Alternatively, this module provides :func:`omp_get_nthreads` and :func:`omp_set_
 which give their best to get and set the number of threads at runtime,
 while still being failsave if the shared OpenMP library is not found.  In the latter case,
 you might also try the equivalent :func:`mkl_get_nthreads` and :func:`mkl_set_nthreads`.
+
+Apart from the threads used inside BLAS/LAPACK, we can also distribute independent charge blocks
+(e.g. in :func:`~tenpy.linalg.np_conserved.tensordot` or :func:`~tenpy.linalg.np_conserved.svd`)
+on a thread pool, see :func:`set_block_nthreads`. This is usually faster if there are many small
+blocks, for which BLAS can't make use of multiple threads anyways.
+Given the estimated cost of each block, :func:`split_block_threads` decides how the available
+threads are split between the block level and the BLAS level.
 """
 # Copyright 2018 TeNPy Developers
 
 import warnings
 import ctypes
+import heapq
+import os
+import threading
 from ctypes.util import find_library
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
 
 __all__ = [
-    'memory_usage', 'omp_get_nthreads', 'omp_set_nthreads', 'mkl_get_nthreads', 'mkl_set_nthreads'
+    'memory_usage', 'omp_get_nthreads', 'omp_set_nthreads', 'mkl_get_nthreads', 'mkl_set_nthreads',
+    'set_block_nthreads', 'get_block_nthreads', 'split_block_threads', 'parallel_map_blocks'
 ]
 
 _omp_lib = None
 _mkl_lib = None
+_omp_nthreads = None  # last value given to :func:`omp_set_nthreads`
+_block_nthreads = 1
+_block_pool = None
+_block_thread_state = threading.local()  # ``.active`` is True in the threads of `_block_pool`
+
+#: Estimated cost (in flops) of a single block below which BLAS/LAPACK don't profit from threads.
+BLAS_THREADING_MIN_WORK = 2**21
 
 
 def memory_usage():
@@ -116,6 +137,8 @@ def omp_set_nthreads(n):
     success : bool
         whether the shared library was found and set.
     """
+    global _omp_nthreads
+    _omp_nthreads = int(n)
     omp = load_omp_library()
     if omp is not None:
         omp.omp_set_num_threads(int(n))
@@ -168,3 +191,140 @@ def mkl_set_nthreads(n):
         except OSError:
             warnings.warn("MKL library not found: can't set nthreads")
     return False
+
+
+def set_block_nthreads(n=None):
+    """Set the number of threads used to handle independent charge blocks in parallel.
+
+    Parameters
+    ----------
+    n : int | None
+        The total number of threads available for a block-wise operation; ``1`` (the default
+        when importing tenpy) disables the thread pool. ``None`` defaults to the value last given
+        to :func:`omp_set_nthreads`, or to the number of CPU cores if that was never called.
+        Within a parallel block-wise operation, these threads are split between the block and
+        the BLAS level by :func:`split_block_threads`.
+
+    Returns
+    -------
+    n : int
+        The number of threads which will be used.
+    """
+    global _block_nthreads, _block_pool
+    if n is None:
+        n = _omp_nthreads if _omp_nthreads is not None else os.cpu_count()
+    n = max(int(n), 1)
+    if n != _block_nthreads and _block_pool is not None:
+        _block_pool.shutdown(wait=True)
+        _block_pool = None
+    _block_nthreads = n
+    return n
+
+
+def get_block_nthreads():
+    """Return the number of threads for block-wise operations set by :func:`set_block_nthreads`.
+    """
+    return _block_nthreads
+
+
+def split_block_threads(work, nthreads=None, min_blas_work=BLAS_THREADING_MIN_WORK):
+    """Automatic policy how to split threads between the block and the BLAS level.
+
+    Few large blocks are best handled one after the other with a multi-threaded BLAS,
+    while many small blocks should rather be distributed on different threads.
+    We use as many block-level threads as the largest block fits into the total `work`,
+    and give the remaining threads to BLAS.
+
+    Parameters
+    ----------
+    work : array_like
+        The estimated cost (e.g. number of flops) for each of the independent blocks.
+    nthreads : int | None
+        The total number of available threads. Defaults to :func:`get_block_nthreads`.
+    min_blas_work : float
+        Blocks with smaller `work` don't profit from a multi-threaded BLAS.
+
+    Returns
+    -------
+    n_block : int
+        The number of threads to distribute the blocks on.
+    n_blas : int
+        The number of threads each call to BLAS/LAPACK may use.
+    """
+    if nthreads is None:
+        nthreads = _block_nthreads
+    nthreads = max(int(nthreads), 1)
+    work = np.asarray(work, dtype=np.float64)
+    if nthreads == 1 or len(work) <= 1:
+        return 1, nthreads
+    largest = np.max(work)
+    if largest < min_blas_work:
+        n_block = min(nthreads, len(work))
+    else:
+        n_block = int(np.sum(work) // largest)
+    n_block = max(min(n_block, nthreads, len(work)), 1)
+    return n_block, max(nthreads // n_block, 1)
+
+
+def parallel_map_blocks(func, args, work=None):
+    """Evaluate ``[func(*a) for a in args]``, possibly distributed over several threads.
+
+    This is useful if `func` spends most of its time in numpy/scipy functions which release the
+    GIL, e.g. matrix products or decompositions of independent charge blocks.
+    If :func:`get_block_nthreads` is larger than 1, the threads are split between the block and
+    the BLAS level with :func:`split_block_threads`, and the blocks are distributed
+    (largest first) on the block-level threads.
+
+    Parameters
+    ----------
+    func : callable
+        The function to be called; needs to be thread-safe.
+    args : list of tuple
+        The arguments for each call of `func`.
+    work : array_like | None
+        The estimated cost of each call, used for the thread split and load balancing.
+        ``None`` means equal costs.
+        Nested calls (from within `func`) are evaluated serially in the calling thread,
+        such that e.g. independent bonds can be distributed on the threads,
+        while the charge blocks within each bond are handled one after the other.
+
+    Returns
+    -------
+    results : list
+        The return values of `func` for each of the `args`, in the same order.
+    """
+    global _block_pool
+    n = len(args)
+    if _block_nthreads <= 1 or n <= 1 or getattr(_block_thread_state, 'active', False):
+        return [func(*a) for a in args]
+    if work is None:
+        work = np.ones(n)
+    work = np.asarray(work, dtype=np.float64)
+    n_block, n_blas = split_block_threads(work)
+    if n_block <= 1:
+        return [func(*a) for a in args]
+    # greedy load balancing: assign the next largest block to the thread with least work
+    chunks = [[] for _ in range(n_block)]
+    load = [(0., t) for t in range(n_block)]
+    for i in np.argsort(-work, kind='stable'):
+        w, t = heapq.heappop(load)
+        chunks[t].append(i)
+        heapq.heappush(load, (w + work[i], t))
+    results = [None] * n
+
+    def run_chunk(chunk):
+        if _omp_lib is not None:  # only affects the OpenMP settings of the calling thread
+            _omp_lib.omp_set_num_threads(n_blas)
+        _block_thread_state.active = True  # the pool would deadlock on nested calls
+        try:
+            for i in chunk:
+                results[i] = func(*args[i])
+        finally:
+            _block_thread_state.active = False
+
+    if _block_pool is None:
+        _block_pool = ThreadPoolExecutor(max_workers=_block_nthreads)
+    futures = [_block_pool.submit(run_chunk, chunk) for chunk in chunks]
+    for fut in futures:
+        fut.result()  # re-raises exceptions
+    return results
@@ -0,0 +1,103 @@
+"""Benchmark the update of the environments in :class:`~tenpy.networks.mpo.MPOEnvironment`.
+
+Call this file with ``python env_update_mpo.py`` to compare the time and peak memory
+of :meth:`~tenpy.networks.mpo.MPOEnvironment._contract_LP` with the previous implementation,
+which always contracted the `ket` first and made a (deep) copy for conjugating the `bra`.
+"""
+# Copyright 2018 TeNPy Developers
+
+import timeit
+import tracemalloc
+
+import numpy as np
+
+import tenpy.linalg.np_conserved as npc
+from tenpy.models.spins import SpinChain
+from tenpy.networks.mps import MPS
+from tenpy.networks.mpo import MPOEnvironment
+from tenpy.algorithms.tebd import RandomUnitaryEvolution
+from tenpy.tools import optimization
+
+
+def random_MPS(M, chi, N_steps=10):
+    L = M.lat.N_sites
+    psi = MPS.from_product_state(M.lat.mps_sites(), [0, 1] * (L // 2), bc='finite')
+    if chi > 1:
+        RandomUnitaryEvolution(psi, {'N_steps': N_steps, 'trunc_params': {'chi_max': chi}}).run()
+        psi.canonical_form()
+    return psi
+
+
+def setup_benchmark(mod_q=[1], legs=20, size=20, ket_size=None, **kwargs):
+    """Setup an MPOEnvironment for a spin-1/2 chain.
+
+    Mapping of parameters:
+        size -> chi of the `bra`
+        ket_size -> chi of the `ket`; ``None`` means ``ket = bra``.
+        legs -> L = number of sites
+        mod_q -> conserve
+    """
+    L = legs
+    conserve = 'Sz' if len(mod_q) > 0 else None
+    M = SpinChain({'L': L, 'Jz': 1.1, 'hz': 0.1, 'conserve': conserve, 'verbose': 0})
+    bra = random_MPS(M, size)
+    ket = bra if ket_size is None else random_MPS(M, ket_size)
+    env = MPOEnvironment(bra, M.H_MPO, ket)
+    optimization.set_level(3)
+    return env
+
+
+def benchmark(data):
+    """Contract the LP through the whole chain."""
+    env = data
+    LP = env.get_LP(0)
+    for i in range(env.L - 1):
+        LP = env._contract_LP(i, LP)
+
+
+def _contract_LP_old(env, i, LP):
+    """The previous implementation of :meth:`MPOEnvironment._contract_LP`."""
+    LP = npc.tensordot(LP, env.ket.get_B(i, form='A'), axes=('vR', 'vL'))
+    LP = npc.tensordot(env.H.get_W(i), LP, axes=(['p*', 'wL'], ['p', 'wR']))
+    LP = npc.tensordot(env.bra.get_B(i, form='A').conj(), LP, axes=(['p*', 'vL*'], ['p', 'vR*']))
+    return LP
+
+
+def benchmark_old(data):
+    """Same as :func:`benchmark`, but with the previous implementation."""
+    env = data
+    LP = env.get_LP(0)
+    for i in range(env.L - 1):
+        LP = _contract_LP_old(env, i, LP)
+
+
+def _peak_memory(func, data):
+    tracemalloc.start()
+    func(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def compare(sizes=[20, 50, 100], ket_size=None, legs=20, repeat=3):
+    """Print a table comparing time and peak memory of `benchmark_old` and `benchmark`."""
+    print("L={L:d}, ket_size={ket_size!r}".format(L=legs, ket_size=ket_size))
+    print("size  t_old     t_new     mem_old   mem_new")
+    for size in sizes:
+        np.random.seed(0)
+        env = setup_benchmark(legs=legs, size=size, ket_size=ket_size)
+        benchmark(env)  # choose the contraction orders
+        t_old = min(timeit.repeat(lambda: benchmark_old(env), number=1, repeat=repeat))
+        t_new = min(timeit.repeat(lambda: benchmark(env), number=1, repeat=repeat))
+        mem_old = _peak_memory(benchmark_old, env)
+        mem_new = _peak_memory(benchmark, env)
+        print("{s: 4d}  {t0:.2e}  {t1:.2e}  {m0:.2e}  {m1:.2e}".format(s=size,
+                                                                     t0=t_old,
+                                                                     t1=t_new,
+                                                                     m0=mem_old,
+                                                                     m1=mem_new))
+
+
+if __name__ == "__main__":
+    compare(ket_size=None)
+    compare(ket_size=4)
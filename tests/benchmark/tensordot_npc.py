@@ -3,6 +3,7 @@ import tenpy.linalg.np_conserved as npc
 
 import tenpy.tools.optimization as optimization
 import itertools as it
+import timeit
 
 
 def rand_permutation(n):
@@ -95,3 +96,50 @@ def setup_benchmark(mod_q=[1],
 def benchmark(data):
     a, b, axes = data
     npc.tensordot(a, b, axes)
+
+
+def benchmark_batched(data):
+    a, b, axes = data
+    npc.tensordot(a, b, axes, batched=True)
+
+
+def setup_benchmark_many_sectors(sectors=100, block_size=2, legs=2, mod_q=[1], dtype=np.float):
+    """Returns ``a, b, axes`` for legs with many small charge sectors of equal size.
+
+    This is the typical situation in which ``npc.tensordot(a, b, axes, batched=True)`` pays off:
+    legs of total size ``sectors * block_size`` with a different charge for each sector."""
+    chinfo = npc.ChargeInfo(mod_q)
+    slices = np.arange(0, sectors * block_size + 1, block_size)
+    qs = chinfo.make_valid(np.arange(sectors)[:, np.newaxis] - sectors // 2)
+    leg = npc.LegCharge.from_qind(chinfo, slices, qs)
+    legs_ab = [leg] * legs + [leg.conj()] * legs
+    a = npc.Array.from_func(np.random.random, legs_ab, dtype, shape_kw='size')
+    b = npc.Array.from_func(np.random.random, legs_ab, dtype, shape_kw='size')
+    axes = [list(range(legs, 2 * legs)), list(range(legs))]
+    optimization.set_level(3)
+    return a, b, axes
+
+
+def compare_batched(sectors=[10, 20, 30], block_size=1, legs=2, mod_q=[1], repeat=5):
+    """Compare the default and the batched tensordot for legs with many charge sectors.
+
+    Call this file with ``python tensordot_npc.py`` to print tables of the timings."""
+    print("block_size={bs:d}, legs={legs:d}, mod_q={mod_q!r}".format(bs=block_size,
+                                                                      legs=legs,
+                                                                      mod_q=mod_q))
+    print("sectors  default   batched   speedup")
+    for n_sectors in sectors:
+        np.random.seed(0)
+        data = setup_benchmark_many_sectors(n_sectors, block_size, legs, mod_q)
+        t_default = min(timeit.repeat(lambda: benchmark(data), number=1, repeat=repeat))
+        t_batched = min(timeit.repeat(lambda: benchmark_batched(data), number=1, repeat=repeat))
+        print("{n: 7d}  {t0:.2e}  {t1:.2e}  {speedup:.2f}".format(n=n_sectors,
+                                                                  t0=t_default,
+                                                                  t1=t_batched,
+                                                                  speedup=t_default / t_batched))
+
+
+if __name__ == "__main__":
+    compare_batched(sectors=[10, 20, 30], block_size=1, legs=2)
+    compare_batched(sectors=[10, 20, 30], block_size=2, legs=2)
+    compare_batched(sectors=[10, 20], block_size=4, legs=2)
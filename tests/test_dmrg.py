@@ -4,9 +4,11 @@
 import itertools as it
 import tenpy.linalg.np_conserved as npc
 from tenpy.models.tf_ising import TFIChain
-from tenpy.algorithms import dmrg
+from tenpy.algorithms import dmrg, mps_sweeps
 from tenpy.algorithms.exact_diag import ExactDiag
 from tenpy.networks import mps
+from tenpy.networks.mpo import MPOEnvironment
+from tenpy import tools
 import pytest
 import numpy as np
 from scipy import integrate
@@ -171,6 +173,196 @@ def test_dmrg_excited(eps=1.e-12):
     assert abs(abs(ov) - 1.) < eps  # unique groundstate: finite size gap!
 
 
+@pytest.mark.parametrize("combine, block_size", [(True, 1), (False, 2)])
+def test_dmrg_davidson(combine, block_size, L=6, g=1.3):
+    model_params = dict(L=L, J=1., g=g, bc_MPS='finite', conserve='parity', verbose=0)
+    M = TFIChain(model_params)
+    ED = ExactDiag(M)
+    ED.build_full_H_from_mpo()
+    ED.full_diagonalization()
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0] * L, bc='finite')
+    dmrg_pars = {
+        'combine': combine,
+        'lanczos_params': {
+            'method': 'davidson',
+            'block_size': block_size
+        },
+        'max_E_err': 1.e-12,
+    }
+    eng = dmrg.TwoSiteDMRGEngine(psi, M, dmrg_pars)
+    E, psi = eng.run()
+    assert abs((E - ED.E[0]) / ED.E[0]) < 1.e-12
+    ov = npc.inner(ED.V.take_slice(0, 'ps*'), ED.mps_to_full(psi), do_conj=True)
+    assert abs(abs(ov) - 1.) < 1.e-10
+
+
+@pytest.mark.parametrize("combine", [True, False])
+def test_dmrg_controlled_expansion(combine, L=6, g=1.3):
+    model_params = dict(L=L, J=1., g=g, bc_MPS='finite', conserve='parity', verbose=0)
+    M = TFIChain(model_params)
+    ED = ExactDiag(M)
+    ED.build_full_H_from_mpo()
+    ED.full_diagonalization()
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0] * L, bc='finite')
+    dmrg_pars = {
+        'combine': combine,
+        'active_sites': 1,
+        'mixer': 'ControlledExpansionMixer',
+        'mixer_params': {
+            'amplitude': 1.e-3,
+            'decay': 1.5,
+            'disable_after': 10,
+            'expand_per_sector': 2
+        },
+        'max_E_err': 1.e-12,
+    }
+    res = dmrg.run(psi, M, dmrg_pars)
+    assert max(psi.chi) > 1  # the expansion increased the bond dimension
+    assert abs((res['E'] - np.min(ED.E)) / np.min(ED.E)) < 1.e-10
+    ov = npc.inner(ED.groundstate(), ED.mps_to_full(psi), do_conj=True)
+    assert abs(abs(ov) - 1.) < 1.e-8
+
+
+@pytest.mark.parametrize("n, mixer", [(1, True), (2, None)])
+def test_dmrg_combine_auto(n, mixer, L=6, g=1.3):
+    model_params = dict(L=L, J=1., g=g, bc_MPS='finite', conserve='parity', verbose=0)
+    M = TFIChain(model_params)
+    ED = ExactDiag(M)
+    ED.build_full_H_from_mpo()
+    ED.full_diagonalization()
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0] * L, bc='finite')
+    dmrg_pars = {'combine': 'auto', 'active_sites': n, 'mixer': mixer, 'max_E_err': 1.e-12}
+    res = dmrg.run(psi, M, dmrg_pars)
+    assert abs((res['E'] - np.min(ED.E)) / np.min(ED.E)) < 1.e-10
+    stats = res['bond_statistics']
+    assert len(stats['combine']) == len(stats['time_update']) == len(stats['i0'])
+    assert all([c in [True, False] for c in stats['combine']])
+    assert all([t >= 0. for t in stats['time_update']])
+
+
+@pytest.mark.parametrize("EffectiveH", [mps_sweeps.OneSiteH, mps_sweeps.TwoSiteH])
+def test_effective_H_combine_costs(EffectiveH, L=4, g=1.2):
+    model_params = dict(L=L, J=1., g=g, bc_MPS='finite', conserve='parity', verbose=0)
+    M = TFIChain(model_params)
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0] * L, bc='finite')
+    dmrg.run(psi, M, {'N_sweeps_check': 1, 'max_sweeps': 1, 'verbose': 0})
+    env = MPOEnvironment(psi, M.H_MPO, psi)
+    i0 = 1
+    eff_H = EffectiveH(env, i0, False, True)
+    if EffectiveH.length == 1:
+        theta = psi.get_theta(i0, 1).replace_label('p0', 'p')
+    else:
+        theta = psi.get_theta(i0, 2)
+    costs = eff_H.combine_costs(theta)
+    assert costs[False][0] == 0 and costs[False][2] == 0
+    assert costs[False][1] > 0
+    flops_init, flops_matvec, memory = costs[True]
+    assert flops_init > 0 and flops_matvec > 0
+    eff_H.combine_Heff()
+    assert memory >= eff_H.LHeff.size + eff_H.RHeff.size  # estimate includes all allowed blocks
+
+
+@pytest.mark.parametrize("EffectiveH, combine", [(mps_sweeps.OneSiteH, False),
+                                                 (mps_sweeps.OneSiteH, True),
+                                                 (mps_sweeps.TwoSiteH, False),
+                                                 (mps_sweeps.TwoSiteH, True)])
+def test_effective_H_diag(EffectiveH, combine, L=4, g=1.2):
+    model_params = dict(L=L, J=1., g=g, bc_MPS='finite', conserve='parity', verbose=0)
+    M = TFIChain(model_params)
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0] * L, bc='finite')
+    dmrg.run(psi, M, {'N_sweeps_check': 1, 'max_sweeps': 1, 'verbose': 0})
+    env = MPOEnvironment(psi, M.H_MPO, psi)
+    i0 = 1
+    eff_H = EffectiveH(env, i0, combine, True)
+    if EffectiveH.length == 1:
+        theta = psi.get_theta(i0, 1).replace_label('p0', 'p')
+        if combine:
+            theta = theta.combine_legs(['vL', 'p'], pipes=eff_H.pipeL)
+    else:
+        theta = psi.get_theta(i0, 2)
+        if combine:
+            theta = theta.combine_legs([['vL', 'p0'], ['p1', 'vR']],
+                                       pipes=[eff_H.pipeL, eff_H.pipeR])
+    diag = eff_H.diag(theta.qtotal)
+    diag.itranspose(theta.get_leg_labels())
+    diag_flat = diag.to_ndarray()
+    mask = npc.Array.from_func(np.ones, theta.legs, qtotal=theta.qtotal).to_ndarray()
+    for idx in zip(*np.nonzero(mask)):
+        e = np.zeros(mask.shape)
+        e[idx] = 1.
+        e = npc.Array.from_ndarray(e, theta.legs, qtotal=theta.qtotal)
+        e.iset_leg_labels(theta.get_leg_labels())
+        assert abs(eff_H.matvec(e).to_ndarray()[idx] - diag_flat[idx]) < 1.e-14
+
+
+def test_dmrg_env_storage(tmpdir, L=8, g=1.2):
+    model_params = dict(L=L, J=1., g=g, bc_MPS='finite', conserve='parity', verbose=0)
+    M = TFIChain(model_params)
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0] * L, bc='finite')
+    psi2 = psi.copy()
+    dmrg_pars = {'max_E_err': 1.e-12, 'verbose': 0}
+    E = dmrg.run(psi, M, dmrg_pars)['E']
+    storage = {'directory': str(tmpdir), 'max_memory': 1}  # keep only one tensor in RAM
+    dmrg_pars = {'max_E_err': 1.e-12, 'verbose': 0, 'env_storage': storage}
+    eng = dmrg.TwoSiteDMRGEngine(psi2, M, dmrg_pars)
+    E2, psi2 = eng.run()
+    assert len(eng.env._LP.in_memory()) == 1
+    assert abs(E - E2) < 1.e-12
+
+
+def test_dmrg_checkpoint(tmpdir, L=6, g=1.3):
+    model_params = dict(L=L, J=1., g=g, bc_MPS='finite', conserve='parity', verbose=0)
+    M = TFIChain(model_params)
+    ED = ExactDiag(M)
+    ED.build_full_H_from_mpo()
+    ED.full_diagonalization()
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0] * L, bc='finite')
+    filename = str(tmpdir.join('checkpoint.tenpy'))
+    dmrg_pars = {
+        'N_sweeps_check': 1,
+        'max_sweeps': 2,
+        'mixer': True,
+        'max_E_err': 1.e-12,
+        'checkpoint_file': filename,
+        'verbose': 0,
+    }
+    eng = dmrg.TwoSiteDMRGEngine(psi, M, dmrg_pars)
+    eng.run()
+    eng2 = dmrg.TwoSiteDMRGEngine.from_checkpoint(filename)
+    assert eng2.sweeps == 2
+    assert len(eng2.sweep_stats['E']) == 2
+    assert eng2.mixer is not None
+    assert eng2.env.bra is eng2.psi
+    assert eng2.engine_params['lanczos_params'] is eng2.lanczos_params
+    eng2.engine_params['max_sweeps'] = 100
+    E, psi2 = eng2.run()
+    assert eng2.sweeps > 2
+    assert abs((E - ED.E[0]) / ED.E[0]) < 1.e-12
+    eng3 = dmrg.DMRGEngine.from_checkpoint(filename)
+    assert eng3.sweeps > 2  # saved during the resumed run
+
+
+def test_dmrg_parallel_segments(L=12, g=1.3):
+    model_params = dict(L=L, J=1., g=g, bc_MPS='finite', conserve='parity', verbose=0)
+    M = TFIChain(model_params)
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0] * L, bc='finite')
+    psi2 = psi.copy()
+    dmrg_pars = {'max_E_err': 1.e-12, 'verbose': 0}
+    E = dmrg.run(psi, M, dmrg_pars)['E']
+    old_nthreads = tools.process.get_block_nthreads()
+    tools.process.set_block_nthreads(3)
+    try:
+        dmrg_pars = {'max_E_err': 1.e-12, 'verbose': 0, 'n_segments': 3}
+        eng = dmrg.ParallelTwoSiteDMRGEngine(psi2, M, dmrg_pars)
+        assert eng.segments == [(0, 4), (4, 8), (8, 12)]
+        E2, psi2 = eng.run()
+    finally:
+        tools.process.set_block_nthreads(old_nthreads)
+    assert abs((E2 - E) / E) < 1.e-10
+    assert abs(abs(psi.overlap(psi2)) - 1.) < 1.e-8
+    assert np.linalg.norm(psi2.norm_test()) < 1.e-5
+
+
 def test_chi_list():
     assert dmrg.chi_list(3) == {0: 3}
     assert dmrg.chi_list(12, 12, 5) == {0: 12}
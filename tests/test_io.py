@@ -0,0 +1,64 @@
+"""A collection of tests for :module:`tenpy.tools.io`."""
+# Copyright 2018 TeNPy Developers
+
+import numpy as np
+import numpy.testing as npt
+import tenpy.linalg.np_conserved as npc
+from tenpy.tools import io
+from tenpy.models.xxz_chain import XXZChain
+from tenpy.networks import mps
+from tenpy.networks.mpo import MPOEnvironment
+from random_test import gen_random_legcharge, random_Array
+
+import pytest
+
+
+def test_save_load_Array(tmpdir):
+    chinfo = npc.ChargeInfo([1, 2], ['a', 'b'])
+    legs = [gen_random_legcharge(chinfo, s) for s in [5, 6, 7]]
+    a = random_Array((5, 6, 7), chinfo, sort=True)
+    a.iset_leg_labels(['x', 'y', None])
+    b = a.combine_legs([0, 1])
+    data = {'a': a, 'b': b, 'legs': legs, (1, 2): [1.j, np.float32(2.), 'c', None]}
+    filename = str(tmpdir.join('data.tenpy'))
+    io.save(data, filename)
+    for mmap_threshold in [None, 0]:
+        loaded = io.load(filename, mmap_threshold=mmap_threshold)
+        assert loaded[(1, 2)] == data[(1, 2)]
+        a2 = loaded['a']
+        a2.test_sanity()
+        assert a2.get_leg_labels() == ['x', 'y', None]
+        assert npc.norm(a2 - a) == 0.
+        assert a2._get_buffer() is not None  # loaded as packed Array
+        b2 = loaded['b']
+        b2.test_sanity()
+        assert npc.norm(b2 - b) == 0.
+        assert b2.chinfo is a2.chinfo  # shared objects are deduplicated
+        npt.assert_equal(b2.split_legs(0).to_ndarray(), a.to_ndarray())
+        for leg, leg2 in zip(legs, loaded['legs']):
+            leg.test_equal(leg2)
+        a2 *= 2.  # in place, even if memory mapped
+        assert npc.norm(a2 - 2. * a) == 0.
+    assert npc.norm(io.load(filename, 'a') - a) == 0.
+
+
+def test_save_load_MPS_env(tmpdir):
+    M = XXZChain({'L': 4, 'Jxx': 1., 'Jz': 1.3, 'hz': 0.1, 'bc_MPS': 'finite', 'verbose': 0})
+    psi = mps.MPS.from_product_state(M.lat.mps_sites(), [0, 1] * 2, bc='finite')
+    env = MPOEnvironment(psi, M.H_MPO, psi)
+    env.get_LP(3)
+    env.get_RP(0)
+    filename = str(tmpdir.join('env.tenpy'))
+    io.save([env, psi, M.H_MPO], filename)
+    env2, psi2, H2 = io.load(filename)
+    psi2.test_sanity()
+    H2.test_sanity()
+    assert env2.bra is env2.ket is psi2
+    assert env2.H is H2
+    assert abs(psi2.overlap(psi) - 1.) < 1.e-14
+    assert abs(H2.expectation_value(psi2) - M.H_MPO.expectation_value(psi)) < 1.e-14
+    for i in range(4):
+        assert npc.norm(env2.get_LP(i) - env.get_LP(i)) < 1.e-14
+    # lazy loading of a single tensor
+    B2 = io.load(filename, '1/_B/2', mmap_threshold=0)
+    assert npc.norm(B2 - psi.get_B(2)) == 0.
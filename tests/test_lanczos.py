@@ -105,3 +105,69 @@ def test_lanczos_evolve(n, N_cache, tol=5.e-15):
         ov /= np.linalg.norm(psi_final_flat)
         print("<psi1|psi1_flat>/norm=", ov)
         assert (abs(1. - abs(ov)) < tol)
+
+
+@pytest.mark.parametrize('n, N_max', [(10, 20), (20, 4), (1, 4)])
+def test_lanczos_evolve_adaptive(n, N_max, tol=1.e-12):
+    leg = gen_random_legcharge(ch, n)
+    H = npc.Array.from_func_square(rmat.GUE, leg) - npc.diag(1., leg)
+    H_flat = H.to_ndarray()
+    qtotal = leg.to_qflat()[0]
+    psi_init = npc.Array.from_func(np.random.random, [leg], qtotal=qtotal)
+    psi_init /= npc.norm(psi_init)
+    psi_init_flat = psi_init.to_ndarray()
+    for delta in [-0.01j, 0.1j, 2.j, -0.5]:
+        params = {'verbose': 1, 'N_max': N_max, 'adaptive': True}
+        lanc = lanczos.LanczosEvolution(H, psi_init, params)
+        psi_final_flat = expm(H_flat * delta).dot(psi_init_flat)
+        psi_final, N = lanc.run(delta)
+        assert lanc.N_matvec >= N
+        err = np.linalg.norm(psi_final.to_ndarray() - psi_final_flat)
+        err /= np.linalg.norm(psi_final_flat)
+        print("N={0:d}, n_substeps={1:d}, err={2:.3e}".format(N, lanc.n_substeps, err))
+        assert err < tol
+        if N_max < n and abs(delta) > 1.:
+            assert lanc.n_substeps > 1
+    # for small time steps, the error estimate requires fewer matvecs than the fixed criterion
+    if N_max > n > 1:
+        lanc_fixed = lanczos.LanczosEvolution(H, psi_init, {'N_max': N_max})
+        lanc_adaptive = lanczos.LanczosEvolution(H, psi_init, {'N_max': N_max, 'adaptive': True})
+        lanc_fixed.run(-0.01j)
+        lanc_adaptive.run(-0.01j)
+        assert lanc_adaptive.N_matvec < lanc_fixed.N_matvec
+
+
+class _DiagOperator(sparse.NpcLinearOperator):
+    """Hermitian matrix providing its diagonal to precondition Davidson."""
+
+    def __init__(self, H):
+        self.H = H
+
+    def matvec(self, vec):
+        return npc.tensordot(self.H, vec, axes=1)
+
+    def diag(self, qtotal):
+        leg = self.H.legs[0]
+        D = npc.Array.from_ndarray(np.diag(self.H.to_ndarray()), [leg], qtotal=qtotal,
+                                   cutoff=np.inf)
+        return D
+
+
+@pytest.mark.parametrize('n, N_cache, block_size, precondition', [(10, 20, 1, False),
+                                                                   (20, 6, 1, True),
+                                                                   (20, 8, 2, True),
+                                                                   (4, 6, 3, False)])
+def test_davidson_gs(n, N_cache, block_size, precondition, tol=5.e-14):
+    leg = gen_random_legcharge(ch, n)
+    H = npc.Array.from_func_square(rmat.GUE, leg)
+    H_flat = H.to_ndarray()
+    E_flat, psi_flat = np.linalg.eigh(H_flat)
+    E0_flat, psi0_flat = E_flat[0], psi_flat[:, 0]
+    qtotal = npc.detect_qtotal(psi0_flat, [leg])
+    H_Op = _DiagOperator(H) if precondition else H
+    psi_init = npc.Array.from_func(np.random.random, [leg], qtotal=qtotal)
+    params = {'N_cache': N_cache, 'block_size': block_size, 'N_max': 50}
+    E0, psi0, N = lanczos.davidson(H_Op, psi_init, params)
+    assert abs(E0 - E0_flat) < tol * abs(E0_flat)
+    ov = np.inner(psi0.to_ndarray().conj(), psi0_flat)
+    assert abs(1. - abs(ov)) < tol
@@ -65,6 +65,36 @@ def test_MPOGraph():
             print("build MPO")
             g_mpo = g.build_MPO()
             g_mpo.test_sanity()
+            # compare with the MPO constructed from the grids
+            grids = g._build_grids()
+            legs, Ws_qtotal = g._calc_legcharges(None)
+            IdL = [st.get('IdL', None) for st in g._ordered_states]
+            IdR = [st.get('IdR', None) for st in g._ordered_states]
+            grid_mpo = mpo.MPO.from_grids(g.sites, grids, bc, IdL, IdR, Ws_qtotal, legs)
+            for i in range(L):
+                assert npc.norm(g_mpo.get_W(i) - grid_mpo.get_W(i)) < 1.e-14
+            assert g.build_stats['chi'] == g_mpo.chi
+            assert g.build_stats['n_W_reused'] >= 0
+
+
+def test_MPOGraph_reuse_W():
+    L = 8
+    ot = OnsiteTerms(L)
+    ct = CouplingTerms(L)
+    for i in range(L):
+        ot.add_onsite_term(0.1, i, 'Sz')
+        if i + 1 < L:
+            ct.add_coupling_term(1., i, i + 1, 'Sz', 'Sz')
+        if i + 2 < L:
+            ct.add_coupling_term(0.5, i, i + 2, 'Sp', 'Sm')
+            ct.add_coupling_term(0.5, i, i + 2, 'Sm', 'Sp')
+    g = mpo.MPOGraph.from_terms(ot, ct, [spin_half] * L, 'finite')
+    H = g.build_MPO()
+    H.test_sanity()
+    # the Ws in the bulk are identical: W[3], W[4], W[5] are reused from W[2]
+    assert g.build_stats['n_W_reused'] == 3
+    for i in [3, 4, 5]:
+        assert npc.norm(H.get_W(i) - H.get_W(2)) < 1.e-14
 
 
 def test_MPOGraph_term_conversion():
@@ -179,6 +209,35 @@ def test_MPOEnvironment():
         E_old = E
 
 
+def test_MPOEnvironment_contraction_order():
+    from tenpy.algorithms.tebd import RandomUnitaryEvolution
+    L = 6
+    M = XXZChain(dict(L=L, Jxx=1., Jz=1.1, hz=0.1, bc_MPS='finite'))
+    ket = mps.MPS.from_product_state(M.lat.mps_sites(), [0, 1] * (L // 2), bc='finite')
+    bra = ket.copy()
+    RandomUnitaryEvolution(bra, {'N_steps': 4, 'trunc_params': {'chi_max': 8}}).run()
+    bra.canonical_form()
+    envs = {}
+    for order in ['ket', 'bra', 'auto']:
+        env = mpo.MPOEnvironment(bra, M.H_MPO, ket)
+        env.contraction_order = order
+        envs[order] = env
+        env.get_LP(L - 1)
+        env.get_RP(0)
+    # bond dimensions of `bra` and `ket` differ, so both orders should be useful
+    chosen = set([order for key, order in envs['auto']._contraction_orders.values()])
+    assert chosen == set(['ket', 'bra'])
+    for order in ['bra', 'auto']:
+        for i in range(L):
+            LP = envs[order].get_LP(i)
+            LP.test_sanity()
+            assert LP.get_leg_labels() == ['vR*', 'wR', 'vR']
+            assert npc.norm(LP - envs['ket'].get_LP(i)) < 1.e-12
+            RP = envs[order].get_RP(i)
+            RP.test_sanity()
+            assert npc.norm(RP - envs['ket'].get_RP(i)) < 1.e-12
+
+
 def test_MPO_hermitian():
     s = spin_half
     ot = OnsiteTerms(4)
@@ -261,3 +320,21 @@ def test_MPO_expectation_value():
         3 * 0. - 0.25 * 0.1**(5 - 2 - 1)) / 3.
     print("ev = ", ev, "desired", desired_ev)
     assert abs(ev - desired_ev) < 1.e-14
+    ev_power = exp_dec_H.expectation_value(psi1, method='power')
+    assert abs(ev_power - desired_ev) < 1.e-14
+
+
+def test_MPO_expectation_value_long_decay():
+    from tenpy.algorithms.tebd import RandomUnitaryEvolution
+    s = spin_half
+    L = 2
+    psi = mps.MPS.from_product_state([s] * L, ['up', 'down'], bc='infinite')
+    RandomUnitaryEvolution(psi, {'N_steps': 4, 'trunc_params': {'chi_max': 8}}).run()
+    psi.canonical_form()
+    grid = [[s.Id, s.Sp, s.Sm, s.Sz, None], [None, 0.95 * s.Id, None, None, 0.5 * s.Sm],
+            [None, None, 0.95 * s.Id, None, 0.5 * s.Sp], [None, None, None, 0.9 * s.Id, s.Sz],
+            [None, None, None, None, s.Id]]
+    H = mpo.MPO.from_grids([s] * L, [grid] * L, bc='infinite', IdL=0, IdR=4)
+    ev = H.expectation_value(psi)
+    ev_power = H.expectation_value(psi, tol=1.e-14, max_range=1000, method='power')
+    assert abs(ev - ev_power) < 1.e-9
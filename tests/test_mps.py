@@ -12,6 +12,7 @@ from tenpy.networks import mps, site
 from tenpy.networks.terms import TermList
 from random_test import rand_permutation, random_MPS
 import tenpy.linalg.np_conserved as npc
+from tenpy.linalg import sparse
 
 import pytest
 
@@ -121,6 +122,11 @@ def test_singlet_mps():
         k = coord.index((i, j))
         mutinf[k] -= 2.  # S(i)+S(j)-S(ij) = (1+1-0)*log(2)
     npt.assert_array_almost_equal(mutinf, 0., decimal=14)
+    coord, rhos = psi.get_rho_two_site(max_range=3)
+    assert len(coord) == len(rhos)
+    for (i, j), rho_ij in zip(coord, rhos):
+        rho_seg = psi.get_rho_segment([i, j]).itranspose(['p0', 'p1', 'p0*', 'p1*'])
+        npt.assert_array_almost_equal(rho_ij.to_ndarray(), rho_seg.to_ndarray(), decimal=14)
     product_state = [None] * L
     for i, j in pairs:
         product_state[i] = u
@@ -159,6 +165,24 @@ def test_charge_fluctuations():
     npt.assert_array_almost_equal(charge_variance, [[0., 1., 1., 2., 1., 0., 0.]], decimal=14)
 
 
+def test_correlation_functions():
+    from tenpy.algorithms.tebd import RandomUnitaryEvolution
+    L = 6
+    spin_half = site.SpinHalfSite(conserve='Sz')
+    psi = mps.MPS.from_product_state([spin_half] * L, ['up', 'down'] * (L // 2), bc='finite')
+    RandomUnitaryEvolution(psi, {'N_steps': 4, 'trunc_params': {'chi_max': 8}}).run()
+    psi.canonical_form()
+    op_pairs = [('Sz', 'Sz'), ('Sp', 'Sm'), ('Sm', 'Sp'), ('Sz', 'Sm'), ('Sp', 'Sm')]
+    sites1 = [0, 2, 3, 5]
+    for opstr, str_on_first in [(None, True), ('Sigmaz', True), ('Sigmaz', False)]:
+        C_list = psi.correlation_functions(op_pairs, sites1, None, opstr, str_on_first)
+        assert len(C_list) == len(op_pairs)
+        for (ops1, ops2), C in zip(op_pairs, C_list):
+            C_ex = psi.correlation_function(ops1, ops2, sites1, None, opstr, str_on_first)
+            assert C.shape == C_ex.shape
+            npt.assert_allclose(C, C_ex, atol=1.e-13)
+
+
 def test_mps_swap():
     L = 6
     pairs = [(0, 3), (1, 5), (2, 4)]
@@ -207,6 +231,34 @@ def test_TransferMatrix(chi=4, d=2):
     w0_full /= np.sum(w0_full)  # fixes norm & phase
     w0 /= np.sum(w0)
     npt.assert_allclose(w0, w0_full)
+    # the flat matvec with a fixed block layout agrees with the conversion through the pipe
+    flat_linop = TM.flat_linop
+    x = np.random.random(flat_linop.shape[0])
+    y = sparse.FlatLinearOperator._matvec(flat_linop, x)
+    npt.assert_allclose(flat_linop._matvec(x), y)
+    assert TM._plan_cache.stats()['hits'] > 0
+    # warm start
+    eta2, w2 = TM.eigenvectors(3, v0=w[0])
+    npt.assert_allclose(eta2[0], eta[0])
+    psi.canonical_form()
+    xi = psi.correlation_length()
+    assert len(psi._transfermatrix_guess) == 1
+    npt.assert_allclose(psi.correlation_length(), xi)
+
+
+def test_correlation_function_long_range():
+    psi = random_MPS(2, 2, 4, bc='infinite')
+    leg = psi.sites[0].leg
+    op1 = npc.Array.from_ndarray(np.random.random((2, 2)), [leg, leg.conj()])
+    op2 = npc.Array.from_ndarray(np.random.random((2, 2)), [leg, leg.conj()])
+    JW = npc.diag([1., -1.], leg)
+    for op in [op1, op2, JW]:
+        op.iset_leg_labels(['p', 'p*'])
+    distances = np.arange(1, 200, 7)
+    for opstr, num_ev in [(None, 3), (JW, 3), (None, 16)]:
+        C = psi.correlation_function_long_range(op1, op2, 1, distances, opstr, num_ev)
+        C_ex = psi.correlation_function(op1, op2, [1], 1 + distances, opstr)[0, :]
+        npt.assert_allclose(C, C_ex, atol=1.e-8)
 
 
 def test_compute_K():
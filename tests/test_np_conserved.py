@@ -6,6 +6,7 @@ import numpy as np
 import numpy.testing as npt
 import itertools as it
 from tenpy.tools.misc import inverse_permutation
+from tenpy.tools import process
 import warnings
 
 from random_test import gen_random_legcharge, random_Array
@@ -560,6 +561,29 @@ def test_npc_tensordot_extra():
     assert abs(np.linalg.norm(theta_flat) - npc.norm(Utheta)) < 1.e-10
 
 
+def test_npc_tensordot_batched():
+    for sort in [True, False]:
+        a = random_Array((10, 12, 15), chinfo3, qtotal=[0], sort=sort)
+        legs_b = [l.conj() for l in a.legs[::-1]]
+        b = npc.Array.from_func(np.random.random, legs_b, qtotal=[1], shape_kw='size')
+        b = b * (1 + 1.j)
+        for axes in [1, ([1, 2], [1, 0])]:
+            c = npc.tensordot(a, b, axes=axes, batched=True)
+            c.test_sanity()
+            c0 = npc.tensordot(a, b, axes=axes)
+            assert c.stored_blocks == c0.stored_blocks
+            npt.assert_array_almost_equal_nulp(c.to_ndarray(), c0.to_ndarray(), sum(a.shape))
+        b2 = b[:, :, 0]
+        d = npc.tensordot(a, b2, axes=([2, 1], [0, 1]), batched=True)
+        d.test_sanity()
+        d0 = npc.tensordot(a, b2, axes=([2, 1], [0, 1]))
+        npt.assert_array_almost_equal_nulp(d.to_ndarray(), d0.to_ndarray(), sum(a.shape))
+        d = npc.tensordot(b2, a, axes=([0, 1], [2, 1]), batched=True)
+        d.test_sanity()
+        d0 = npc.tensordot(b2, a, axes=([0, 1], [2, 1]))
+        npt.assert_array_almost_equal_nulp(d.to_ndarray(), d0.to_ndarray(), sum(a.shape))
+
+
 def test_npc_inner():
     for sort in [True, False]:
         print("sort =", sort)
@@ -646,6 +670,27 @@ def test_npc_svd():
     npt.assert_array_almost_equal_nulp(recalc.to_ndarray(), Aflat, tol_NULP)
 
 
+def test_npc_svd_keep_max():
+    A = random_Array((30, 40), chinfo3, sort=True)
+    S_all = np.sort(npc.svd(A, compute_uv=False))[::-1]
+    old_nthreads = process.get_block_nthreads()
+    try:
+        for nthreads in [1, 3]:
+            process.set_block_nthreads(nthreads)
+            for keep_max in [1, 5, 12, 100]:
+                U, S, VH = npc.svd(A, inner_labels=['vR', 'vL'], keep_max=keep_max)
+                U.test_sanity()
+                VH.test_sanity()
+                assert len(S) == min(keep_max, len(S_all))
+                npt.assert_allclose(np.sort(S)[::-1], S_all[:len(S)], rtol=1.e-12)
+                # compare with the truncated full svd
+                recalc = npc.tensordot(U.scale_axis(S, 'vR'), VH, axes=['vR', 'vL'])
+                err = npc.norm(A - recalc)
+                assert abs(err - np.linalg.norm(S_all[len(S):])) < 1.e-12
+    finally:
+        process.set_block_nthreads(old_nthreads)
+
+
 def test_npc_pinv():
     m, n = (10, 20)
     A = random_Array((m, n), chinfo3)
@@ -827,3 +872,124 @@ def test_pickle():
     b2flat = b2.to_ndarray()
     npt.assert_array_equal(aflat, a2flat)
     npt.assert_array_equal(bflat, b2flat)
+
+
+def test_npc_tensordot_plan_cache():
+    a = random_Array((10, 12, 15), chinfo3, qtotal=[0], sort=False)
+    legs_b = [l.conj() for l in a.legs[::-1]]
+    b = npc.Array.from_func(np.random.random, legs_b, qtotal=[1], shape_kw='size')
+    a2 = a.copy()
+    a2._data = [np.random.random(T.shape) for T in a._data]  # same charge structure as `a`
+    axes_list = [1, ([1, 2], [1, 0])]
+    expected = [[npc.tensordot(x, b, axes=axes) for x in [a, a2]] for axes in axes_list]
+    cache = npc.tensordot_plan_cache
+    cache.enable(max_size=2)
+    try:
+        for axes, c0s in zip(axes_list, expected):
+            for x, c0 in zip([a, a2, a], c0s + c0s[:1]):
+                c = npc.tensordot(x, b, axes=axes)
+                c.test_sanity()
+                npt.assert_array_almost_equal_nulp(c.to_ndarray(), c0.to_ndarray(), 100)
+        assert cache.stats()['misses'] == 2 and cache.stats()['hits'] == 4
+        assert len(cache) == 2
+        cache.enable(max_size=1)  # drops the least recently used plan
+        assert len(cache) == 1
+        npc.tensordot(a, b, axes=axes_list[-1])
+        assert cache.stats()['hits'] == 5
+    finally:
+        cache.disable()
+    assert len(cache) == 0
+
+
+def test_npc_tensordot_cost():
+    a = random_Array((10, 12, 15), chinfo3, qtotal=[0], sort=False)
+    legs_b = [l.conj() for l in a.legs[::-1]]
+    b = npc.Array.from_func(np.random.random, legs_b, qtotal=[1], shape_kw='size')
+    a.iset_leg_labels(['a', 'b', 'c'])
+    b.iset_leg_labels(['c*', 'b*', 'a*'])
+    axes_list = [1, (['b', 'c'], ['b*', 'c*'])]
+    dense_flops_list = [10 * 12 * 15 * 12 * 10, 10 * 12 * 15 * 10]
+    for axes, dense_flops in zip(axes_list, dense_flops_list):
+        flops, c_struct = npc.tensordot_cost(a, b, axes=axes)
+        c = npc.tensordot(a, b, axes=axes)
+        c_struct.test_sanity()
+        assert c_struct.get_leg_labels() == c.get_leg_labels()
+        assert c_struct.size == c.size
+        assert npc.norm(c_struct) == 0.
+        assert set(map(tuple, c_struct._qdata)) == set(map(tuple, c._qdata))
+        assert 0 < flops <= dense_flops
+    # trivial charges: cost of the dense matrix product
+    a_triv = npc.Array.from_ndarray_trivial(np.ones((3, 4, 5)))
+    b_triv = npc.Array.from_ndarray_trivial(np.ones((5, 6)))
+    flops, c_struct = npc.tensordot_cost(a_triv, b_triv, axes=1)
+    assert flops == 3 * 4 * 5 * 6
+    assert c_struct.shape == (3, 4, 6)
+
+
+def test_npc_Array_pack_data():
+    a = random_Array((10, 12, 15), chinfo3, qtotal=[1], sort=True)
+    a = a.astype(np.complex128)
+    b = a.copy()
+    b._data = [np.random.random(T.shape) + 1.j for T in a._data]
+    aflat, bflat = a.to_ndarray(), b.to_ndarray()
+    a.ipack_data()
+    b.ipack_data()
+    a.test_sanity()
+    assert a._get_buffer() is not None
+    npt.assert_equal(a.to_ndarray(), aflat)
+    c = a.copy()
+    assert c._get_buffer() is not None and c._get_buffer() is not a._get_buffer()
+    assert abs(npc.norm(a) - np.linalg.norm(aflat)) < 1.e-12
+    assert abs(npc.inner(a, b, do_conj=True) - np.vdot(aflat, bflat)) < 1.e-12
+    c.iadd_prefactor_other(0.5j, b)
+    npt.assert_array_almost_equal_nulp(c.to_ndarray(), aflat + 0.5j * bflat, 10)
+    c.iscale_prefactor(2.)
+    npt.assert_array_almost_equal_nulp(c.to_ndarray(), 2. * aflat + 1.j * bflat, 10)
+    assert c._get_buffer() is not None
+    npt.assert_equal(a.to_ndarray(), aflat)  # `a` unchanged
+    # replacing blocks invalidates the packing
+    c.itranspose([2, 1, 0])
+    assert c._get_buffer() is None
+    c.itranspose([2, 1, 0])
+    c.iadd_prefactor_other(-1., a)
+    npt.assert_array_almost_equal_nulp(c.to_ndarray(), aflat + 1.j * bflat, 10)
+
+
+def test_eigvalsh_batch():
+    hs = []
+    for size in [5, 5, 8, 3]:
+        l = gen_random_legcharge(chinfo3, size)
+        h = npc.Array.from_func(np.random.random, [l, l.conj()], shape_kw='size')
+        hs.append(h + h.conj().itranspose())
+    W_list = npc.eigvalsh_batch(hs)
+    assert len(W_list) == len(hs)
+    for h, W in zip(hs, W_list):
+        npt.assert_allclose(W, npc.eigvalsh(h), atol=1.e-13)
+
+
+def test_npc_block_threads():
+    a = random_Array((20, 15, 10), chinfo3, sort=True)
+    legs_b = [l.conj() for l in a.legs[::-1]]
+    b = npc.Array.from_func(np.random.random, legs_b, shape_kw='size')
+    h = npc.Array.from_func(np.random.random, [a.legs[0], a.legs[0].conj()], shape_kw='size')
+    h = h + h.conj().transpose()
+    c0 = npc.tensordot(a, b, axes=([1, 2], [1, 0]))
+    U0, S0, VH0 = npc.svd(c0)
+    w0, v0 = npc.eigh(h)
+    w0_vals = npc.eigvalsh(h)
+    old_nthreads = process.get_block_nthreads()
+    try:
+        process.set_block_nthreads(3)
+        c = npc.tensordot(a, b, axes=([1, 2], [1, 0]))
+        c.test_sanity()
+        assert c.stored_blocks > 1
+        npt.assert_equal(c.to_ndarray(), c0.to_ndarray())
+        U, S, VH = npc.svd(c)
+        npt.assert_equal(S, S0)
+        npt.assert_equal(U.to_ndarray(), U0.to_ndarray())
+        w, v = npc.eigh(h)
+        npt.assert_equal(w, w0)
+        npt.assert_equal(v.to_ndarray(), v0.to_ndarray())
+        npt.assert_equal(npc.eigvalsh(h), w0_vals)
+    finally:
+        process.set_block_nthreads(old_nthreads)
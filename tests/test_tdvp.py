@@ -8,6 +8,7 @@ import tenpy.networks.mps as mps
 import tenpy.networks.site as site
 from tenpy.algorithms import tdvp
 from tenpy.algorithms import tebd
+import pytest
 import sys
 import tdvp_numpy
 import tenpy.networks.mpo
@@ -156,3 +157,86 @@ def test_tdvp():
         psit_.append(B)
     assert np.abs(np.abs(overlap(psit_, psit_compare)) - 1.0) < 1e-13
     print("one site TDVP works")
+
+
+def _full_chi_MPS(M, L, chi):
+    psi = MPS.from_product_state(M.lat.mps_sites(), [0, 1] * (L // 2), bc='finite')
+    tebd.RandomUnitaryEvolution(psi, {'N_steps': 10, 'trunc_params': {'chi_max': chi}}).run()
+    psi.canonical_form()
+    return psi
+
+
+@pytest.mark.parametrize('combine', [False, True, 'auto'])
+def test_tdvp_engines_finite(combine, L=6, dt=0.01, N_steps=10):
+    M = tenpy.models.spins.SpinChain({'L': L, 'Jz': 1.3, 'hz': 0.2, 'verbose': 0})
+    # compare two-site TDVP with TEBD starting from a product state
+    psi = MPS.from_product_state(M.lat.mps_sites(), [0, 1] * (L // 2), bc='finite')
+    psi_tdvp = psi.copy()
+    trunc_params = {'chi_max': 50, 'svd_min': 1.e-10, 'trunc_cut': None}
+    tebd_params = {'dt': dt, 'order': 2, 'N_steps': N_steps, 'trunc_params': trunc_params}
+    tebd.Engine(psi, M, tebd_params).run()
+    tdvp_params = {'dt': dt, 'N_steps': N_steps, 'trunc_params': trunc_params, 'combine': combine}
+    eng = tdvp.TwoSiteTDVPEngine(psi_tdvp, M, tdvp_params)
+    eng.run()
+    assert abs(eng.evolved_time - N_steps * dt) < 1.e-14
+    assert len(eng.sweep_stats['N_matvec']) == N_steps
+    assert eng.N_matvec == sum(eng.update_stats['N_lanczos']) > 0
+    psi_tdvp.test_sanity()
+    ov = psi.overlap(psi_tdvp)
+    print("1 - |<psi_TEBD|psi_TDVP>| =", 1. - abs(ov))
+    assert abs(1. - abs(ov)) < 1.e-10
+    # with full bond dimension, single-site and two-site TDVP are both exact
+    psi1 = _full_chi_MPS(M, L, 2**(L // 2))
+    psi2 = psi1.copy()
+    tdvp_params = {'dt': dt, 'N_steps': N_steps, 'combine': combine}
+    tdvp.SingleSiteTDVPEngine(psi1, M, tdvp_params).run()
+    tdvp_params = {'dt': dt, 'N_steps': N_steps, 'combine': combine}
+    tdvp.TwoSiteTDVPEngine(psi2, M, tdvp_params).run()
+    psi1.test_sanity()
+    assert tuple(psi1.chi) == tuple(psi2.chi)
+    ov = psi1.overlap(psi2)
+    print("1 - |<psi_1site|psi_2site>| =", 1. - abs(ov))
+    assert abs(1. - abs(ov)) < 1.e-10
+
+
+def test_tdvp_engine_infinite(g=0.5):
+    # real time evolution of the ground state should only change the phase
+    M = tenpy.models.spins.SpinChain({
+        'L': 2,
+        'Jx': 0.,
+        'Jy': 0.,
+        'Jz': -4.,
+        'hx': 2. * g,
+        'bc_MPS': 'infinite',
+        'conserve': None,
+        'verbose': 0
+    })
+    psi = MPS.from_product_state(M.lat.mps_sites(), [[1, -1.], [1, -1.]], bc='infinite')
+    tebd_params = {
+        'dt': 0.01,
+        'order': 2,
+        'delta_tau_list': [0.1, 1.e-4, 1.e-8],
+        'max_error_E': 1.e-9,
+        'trunc_params': {
+            'chi_max': 30,
+            'trunc_cut': 1.e-13
+        }
+    }
+    tebd.Engine(psi, M, tebd_params).run_GS()
+    E_old = np.average(M.bond_energies(psi))
+    S_old = np.average(psi.entanglement_entropy())
+    tdvp_params = {
+        'dt': 0.01,
+        'N_steps': 10,
+        'start_env': 10,
+        'trunc_params': {
+            'chi_max': 30,
+            'trunc_cut': 1.e-13
+        }
+    }
+    tdvp.TwoSiteTDVPEngine(psi, M, tdvp_params).run()
+    psi.canonical_form()
+    E_new = np.average(M.bond_energies(psi))
+    S_new = np.average(psi.entanglement_entropy())
+    assert abs(E_old - E_new) < 1.e-6
+    assert abs(S_old - S_new) < 1.e-5
@@ -9,6 +9,7 @@ from tenpy.models.spins import SpinChain
 import tenpy.algorithms.tebd as tebd
 from tenpy.networks.site import SpinHalfSite
 from tenpy.algorithms.exact_diag import ExactDiag
+from tenpy import tools
 import pytest
 
 from test_dmrg import e0_tranverse_ising
@@ -111,3 +112,32 @@ def test_RandomUnitaryEvolution():
     eng.run()
     print(eng.psi.chi)
     assert tuple(eng.psi.chi) == (16, 8)
+
+
+@pytest.mark.parametrize("bc_MPS", ['finite', 'infinite'])
+def test_tebd_layer_update(bc_MPS):
+    L = 8
+    spin_half = SpinHalfSite(conserve='Sz')
+    psi = MPS.from_product_state([spin_half] * L, [0, 1] * (L // 2), bc=bc_MPS)
+    old_nthreads = tools.process.get_block_nthreads()
+    tools.process.set_block_nthreads(3)
+    psis = []
+    errs = []
+    try:
+        for batch, parallel in [(False, False), (True, False), (False, True), (True, True)]:
+            np.random.seed(3)
+            TEBD_params = dict(N_steps=3,
+                               trunc_params={'chi_max': 6},
+                               batch_truncation=batch,
+                               parallel_bonds=parallel)
+            eng = tebd.RandomUnitaryEvolution(psi.copy(), TEBD_params)
+            eng.run()
+            eng.psi.test_sanity()
+            psis.append(eng.psi)
+            errs.append([err.eps for err in eng._trunc_err_bonds])
+    finally:
+        tools.process.set_block_nthreads(old_nthreads)
+    for psi2, errs2 in zip(psis[1:], errs[1:]):
+        assert tuple(psis[0].chi) == tuple(psi2.chi)
+        assert abs(abs(psis[0].overlap(psi2)) - 1.) < 1.e-12
+        npt.assert_allclose(errs2, errs[0], atol=1.e-14)
@@ -6,6 +6,7 @@ import numpy.testing as npt
 import itertools as it
 import tenpy.tools as tools
 import warnings
+import os
 
 
 def test_inverse_permutation(N=10):
@@ -98,6 +99,25 @@ def test_mkl(n=2):
             print("test_mkl failed to import the shared MKL libaray.")
 
 
+def test_block_threads():
+    assert tools.process.split_block_threads([10, 10, 10], 1) == (1, 1)
+    assert tools.process.split_block_threads([10] * 10, 4) == (4, 1)
+    assert tools.process.split_block_threads([1.e8, 1.e8], 4) == (2, 2)
+    assert tools.process.split_block_threads([1.e9, 1.e3, 1.e3], 4) == (1, 4)
+    old_nthreads = tools.process.get_block_nthreads()
+    try:
+        assert tools.process.set_block_nthreads(3) == 3
+        args = [(i, i + 1) for i in range(10)]
+        res = tools.process.parallel_map_blocks(lambda x, y: x * y, args, work=range(10))
+        assert res == [x * y for x, y in args]
+        # nested calls are evaluated serially instead of waiting for the occupied pool
+        nested = lambda x, y: sum(tools.process.parallel_map_blocks(lambda z: z * y, [(x, )] * 4))
+        res = tools.process.parallel_map_blocks(nested, args)
+        assert res == [4 * x * y for x, y in args]
+    finally:
+        tools.process.set_block_nthreads(old_nthreads)
+
+
 def test_optimization():
     level_now = tools.optimization.get_level()
     level_change = "none" if level_now == 1 else "default"
@@ -107,3 +127,25 @@ def test_optimization():
     with tools.optimization.temporary_level(level_change):
         assert tools.optimization.get_level() == level_change
     assert tools.optimization.get_level() == level_now
+
+
+def test_out_of_core_list(tmpdir):
+    data = [np.random.random(100) for _ in range(5)]  # 800 bytes each
+    ooc = tools.cache.OutOfCoreList(6, {'directory': str(tmpdir), 'max_memory': 2000})
+    assert len(ooc) == 6
+    for i, a in enumerate(data):
+        ooc[i] = a
+    assert ooc.in_memory() == [3, 4]
+    assert ooc[5] is None
+    npt.assert_equal(ooc[0], data[0])
+    assert ooc.in_memory() == [4, 0]
+    ooc.prefetch(1)
+    npt.assert_equal(ooc[1], data[1])
+    ooc[2] = None
+    assert ooc[2] is None
+    assert [a is not None for a in ooc] == [True, True, False, True, True, False]
+    for i in [0, 1, 3, 4]:
+        npt.assert_equal(ooc[i], data[i])
+    directory = ooc.directory
+    ooc.close()
+    assert not os.path.exists(directory)
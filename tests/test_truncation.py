@@ -4,6 +4,7 @@
 import numpy as np
 import numpy.testing as npt
 
+import tenpy.linalg.np_conserved as npc
 from tenpy.algorithms import truncation
 
 
@@ -32,3 +33,45 @@ def test_truncate():
     assert (pars['chi_min'] <= np.sum(mask) <= pars['chi_max'])
     assert (np.all(S[~mask] < pars['svd_min']))
     assert (np.all(S[mask] >= pars['svd_min']))
+
+
+def test_svd_theta_randomized():
+    chinfo = npc.ChargeInfo([1], ['charge'])
+    legL = npc.LegCharge.from_qflat(chinfo, np.random.randint(-2, 3, size=100))
+    legR = npc.LegCharge.from_qflat(chinfo, np.random.randint(-2, 3, size=120)).conj()
+    theta = npc.Array.from_func(np.random.standard_normal, [legL, legR], shape_kw='size')
+    theta.iset_leg_labels(['vL', 'vR'])
+    # give theta exponentially decaying singular values
+    U, S, VH = npc.svd(theta, inner_labels=['vR', 'vL'])
+    S = np.exp(-np.arange(len(S)))[np.argsort(np.argsort(-S))]
+    theta = npc.tensordot(U.scale_axis(S, 'vR'), VH, axes=['vR', 'vL'])
+    pars = {'chi_max': 6, 'svd_min': 1.e-14, 'trunc_cut': None}
+    U, S, VH, err, renorm = truncation.svd_theta(theta, pars)
+    pars['svd_method'] = 'randomized'
+    pars['svd_oversampling'] = 4
+    U2, S2, VH2, err2, renorm2 = truncation.svd_theta(theta, pars)
+    assert len(S2) == len(S) == 6
+    npt.assert_allclose(np.sort(S2), np.sort(S), rtol=1.e-10)
+    assert abs(renorm2 - renorm) < 1.e-12
+    assert abs(err2.eps - err.eps) < 1.e-12
+    theta_trunc = npc.tensordot(U.scale_axis(S, 'vR'), VH, axes=['vR', 'vL'])
+    theta_trunc2 = npc.tensordot(U2.scale_axis(S2, 'vR'), VH2, axes=['vR', 'vL'])
+    assert npc.norm(theta_trunc2 - theta_trunc) < 1.e-10
+
+
+def test_truncate_batch():
+    lengths = [15, 1, 9, 20]
+    S_list = [np.exp(-np.arange(n) - 0.1 * np.random.rand(n)) for n in lengths]
+    S_list[2][3:5] = S_list[2][2] * (1. - 1.e-6)  # (nearly) degenerate values
+    for S in S_list:
+        np.random.shuffle(S)
+    for pars in [{}, {'chi_max': 8, 'chi_min': 2},
+                 {'chi_max': 18, 'chi_min': 5, 'trunc_cut': 0.0005**2, 'symmetry_tol': 1.1},
+                 {'chi_max': 12, 'svd_min': 0.005}]:
+        masks, norms_new, errs = truncation.truncate_batch(S_list, pars.copy())
+        assert len(masks) == len(errs) == len(S_list)
+        for S, mask, norm_new, err in zip(S_list, masks, norms_new, errs):
+            mask2, norm_new2, err2 = truncation.truncate(S, pars.copy())
+            npt.assert_equal(mask, mask2)
+            assert abs(norm_new - norm_new2) < 1.e-14
+            assert abs(err.eps - err2.eps) < 1.e-14